@@ -7,4 +7,5 @@ admin.site.register(Animal)
 admin.site.register(Breed)
 admin.site.register(Color)
 admin.site.register(Species)
-admin.site.register(Application)
\ No newline at end of file
+admin.site.register(Application)
+admin.site.register(ImageJob)
\ No newline at end of file
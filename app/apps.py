@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     name = 'app'
+
+    def ready(self):
+        # connect signal receivers (search index, caches) once the app registry is loaded
+        from . import signals
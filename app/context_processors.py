@@ -1,16 +1,10 @@
-# models
-from .models import Application
+# tools
+from .utils import get_pending_app_count
 
 def pending_app_count(request):
-    count = 0
     if request.user.is_staff:
-
-        pending_apps = Application.objects.filter(approved=None)
-        if len(pending_apps) > 0:
-            for app in pending_apps:
-                count += 1
-
-        return {'pending_app_count': count}
+        # served from the cache; signals on Application keep it current
+        return {'pending_app_count': get_pending_app_count()}
 
     # MUST RETURN EMPTY DICITONARY IF BODY OF FUNCTION ISN'T RUNNING
     return {}
\ No newline at end of file
@@ -2,12 +2,18 @@ from django.contrib.auth.models import User
 from django import forms
 # models
 from app.models import *
+# animal photos
+from app.images import UPLOAD_MAX_PIXELS, UploadTooLarge, downscale_master
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.validators import FileExtensionValidator
+from PIL import Image
 # crispy
 import itertools
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Submit, ButtonHolder
 # tools
 import datetime
+import posixpath
 
 class UserForm(forms.ModelForm):
     """
@@ -174,6 +180,62 @@ class EditProfileVolunteerForm(forms.ModelForm):
         fields = ('phone_number', 'street_address', 'city', 'state', 'zipcode',)
 
 
+class BoundedImageField(forms.ImageField):
+    """
+        This image field keeps the memory used by a photo upload bounded, whatever the photo's size. The format and dimensions are read from the image header only, so uploads over UPLOAD_MAX_PIXELS are refused before any pixels are decoded. Photos larger than the stored master are decoded at reduced scale and replaced with a downscaled master (see images.downscale_master).
+    """
+
+    default_error_messages = {
+        'too_many_pixels': 'This photo is %(width)s x %(height)s pixels. Please upload a photo of at most %(megapixels)s megapixels.',
+        'too_large_to_decode': 'This photo is too large to process. Please save it as a JPEG or reduce its size and try again.',
+    }
+
+    def to_python(self, data):
+        # FileField.to_python only checks the upload's name and size; forms.ImageField.to_python would read an in-memory upload into a second buffer
+        uploaded_file = forms.FileField.to_python(self, data)
+        if uploaded_file is None:
+            return None
+
+        opened_by_path = hasattr(uploaded_file, 'temporary_file_path')
+        try:
+            # Image.open reads the header and leaves the pixels alone
+            image = Image.open(uploaded_file.temporary_file_path() if opened_by_path else uploaded_file)
+        except Exception:
+            raise forms.ValidationError(self.error_messages['invalid_image'], code='invalid_image')
+
+        try:
+            width, height = image.size
+            if width * height > UPLOAD_MAX_PIXELS:
+                raise forms.ValidationError(
+                    self.error_messages['too_many_pixels'],
+                    code='too_many_pixels',
+                    params={'width': width, 'height': height, 'megapixels': UPLOAD_MAX_PIXELS // 1000000},
+                )
+
+            try:
+                master = downscale_master(image)
+            except UploadTooLarge:
+                raise forms.ValidationError(self.error_messages['too_large_to_decode'], code='too_large_to_decode')
+            except Exception:
+                raise forms.ValidationError(self.error_messages['invalid_image'], code='invalid_image')
+
+            image_format = image.format
+        finally:
+            # Pillow closes whatever file it reads from, so only the one it opened by path
+            if opened_by_path:
+                image.close()
+
+        if master is not None:
+            stem = posixpath.splitext(posixpath.basename(uploaded_file.name))[0]
+            uploaded_file = SimpleUploadedFile(f'{stem}.jpg', master, content_type='image/jpeg')
+        else:
+            uploaded_file.content_type = Image.MIME.get(image_format)
+            if hasattr(uploaded_file, 'seek') and callable(uploaded_file.seek):
+                uploaded_file.seek(0)
+
+        return uploaded_file
+
+
 class AnimalForm(forms.ModelForm):
     """
         This form class is used for new animal arrivals to the shelter. It includes most fields from the Animal model. Arrival date defaults to the current date.
@@ -217,6 +279,9 @@ class AnimalForm(forms.ModelForm):
     class Meta:
         model = Animal
         fields = ('name','age','species','breed','color','sex','image','description','arrival_date','staff',)
+        field_classes = {
+            'image': BoundedImageField,
+        }
         widgets = {
             'arrival_date': forms.DateInput(attrs={"type": "date"}),
             'age': forms.DateInput(attrs={"type": "date"})
@@ -227,6 +292,27 @@ class AnimalForm(forms.ModelForm):
         }
 
 
+class BulkIntakeForm(forms.Form):
+    """
+        This form class is used to admit many animals at once from a CSV file, with their photos in an optional zip file.
+    """
+
+    csv_file = forms.FileField(label='Animals (CSV)', validators=[FileExtensionValidator(['csv'])])
+    images = forms.FileField(label='Photos (zip, optional)', required=False, validators=[FileExtensionValidator(['zip'])])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_tag = False
+        self.helper.layout = Layout(
+            Row(
+                Column('csv_file', css_class='form-group col-md-6 mb-0'),
+                Column('images', css_class='form-group col-md-6 mb-0'),
+                css_class='form-row mb-n2'
+            ),
+        )
+
+
 class ApplicationForm(forms.ModelForm):
     text = forms.CharField(widget=forms.Textarea, label='',)
 
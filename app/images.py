@@ -0,0 +1,275 @@
+# tools
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+import base64
+import io
+import math
+import posixpath
+
+# derived copies of every uploaded animal image: size name -> longest edge in pixels
+# thumb: list views (shown at 100px), card: available pets grid (310px), detail: animal detail page (up to 500px)
+DERIVATIVE_SIZES = {
+    'thumb': 100,
+    'card': 400,
+    'detail': 800,
+}
+
+# derived images are stored beside the uploads, e.g. media/derived/kiwi_tree_card.jpg
+DERIVATIVE_DIRECTORY = 'media/derived'
+
+DERIVATIVE_QUALITY = 82
+
+# low-quality placeholder stored on the animal and inlined into cards while the real image loads
+PLACEHOLDER_PREVIEW_SIZE = 16
+PLACEHOLDER_PREVIEW_QUALITY = 60
+
+# uploads are checked against this from their header alone, before any pixels are decoded (IMAGE_UPLOAD_MAX_PIXELS in settings overrides it)
+UPLOAD_MAX_PIXELS = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 64 * 1000 * 1000)
+# most pixels decoded at once while downscaling an upload; JPEGs are decoded at 1/2, 1/4 or 1/8 scale to stay under it
+UPLOAD_MAX_DECODED_PIXELS = getattr(settings, 'IMAGE_UPLOAD_MAX_DECODED_PIXELS', 16 * 1000 * 1000)
+# longest edge of the stored master; larger uploads are downscaled to it (it still covers the largest resize endpoint size)
+MASTER_MAX_EDGE = getattr(settings, 'IMAGE_MASTER_MAX_EDGE', 2048)
+MASTER_QUALITY = 90
+
+# EXIF orientation tag -> transpose operations that turn the pixels upright (phone photos are often stored sideways)
+EXIF_ORIENTATION_TAG = 274
+EXIF_TRANSPOSE = {
+    2: (Image.FLIP_LEFT_RIGHT,),
+    3: (Image.ROTATE_180,),
+    4: (Image.FLIP_TOP_BOTTOM,),
+    5: (Image.ROTATE_90, Image.FLIP_TOP_BOTTOM),
+    6: (Image.ROTATE_270,),
+    7: (Image.ROTATE_270, Image.FLIP_TOP_BOTTOM),
+    8: (Image.ROTATE_90,),
+}
+
+
+def derivative_name(image_name, size):
+    """
+        This function builds the storage name of one derived size of an image.
+
+        args: image_name (e.g. 'media/kiwi_tree.jpg'), size (key of DERIVATIVE_SIZES)
+
+        returns: storage name (e.g. 'media/derived/kiwi_tree_card.jpg')
+    """
+
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    return f'{DERIVATIVE_DIRECTORY}/{stem}_{size}.jpg'
+
+
+def has_derivatives(image_field):
+    """
+        This function reports whether an image gets derived sizes. The shared placeholder (and an empty field) is already small and is served as is.
+
+        args: image_field (Animal.image)
+
+        returns: bool
+    """
+
+    return bool(image_field) and image_field.name != image_field.field.default
+
+
+def _upright(image):
+    """
+        This helper function applies the EXIF orientation of a photo to its pixels, since the orientation tag is dropped when the derived JPEGs are written.
+    """
+
+    try:
+        orientation = (image._getexif() or dict()).get(EXIF_ORIENTATION_TAG)
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        orientation = None
+
+    for operation in EXIF_TRANSPOSE.get(orientation, ()):
+        image = image.transpose(operation)
+
+    return image
+
+
+def load_image(storage, name):
+    """
+        This function reads a stored image, turns it upright, and converts it to RGB, ready to be scaled.
+
+        args: storage, name
+
+        returns: PIL image (raises OSError if the file is missing or isn't an image)
+    """
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+
+    image = _upright(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    return image
+
+
+class UploadTooLarge(ValueError):
+    """
+        Raised when an upload would need more than UPLOAD_MAX_DECODED_PIXELS decoded at once.
+    """
+
+
+def downscale_master(image, max_edge=MASTER_MAX_EDGE, max_decoded_pixels=UPLOAD_MAX_DECODED_PIXELS):
+    """
+        This function turns an upload larger than the stored master into the master: it decodes the image at reduced scale where the format allows it (JPEG), turns it upright, and scales it down to max_edge. Uploads that already fit are left alone.
+
+        args: image (PIL image opened with Image.open, i.e. only its header has been read), max_edge, max_decoded_pixels
+
+        returns: JPEG bytes of the master, or None if the upload can be stored as it is (raises UploadTooLarge, or OSError if the pixels can't be read)
+    """
+
+    if max(image.size) <= max_edge:
+        return None
+
+    # lets the JPEG decoder skip detail the master won't keep (a no-op for other formats); draft() needs the master's exact proportions
+    scale = max_edge / max(image.size)
+    image.draft('RGB', tuple(math.ceil(edge * scale) for edge in image.size))
+    width, height = image.size
+    if width * height > max_decoded_pixels:
+        raise UploadTooLarge(f'{width} x {height} pixels can\'t be decoded within {max_decoded_pixels} pixels')
+
+    image.load()
+    image = _upright(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=MASTER_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def render_resized(image, width, height):
+    """
+        This function scales an image down (never up) to fit a width x height box, keeping its proportions, and encodes it as a progressive JPEG.
+
+        args: image (PIL image, RGB), width, height
+
+        returns: JPEG bytes
+    """
+
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.LANCZOS)
+
+    output = io.BytesIO()
+    resized.save(output, 'JPEG', quality=DERIVATIVE_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def render_derivative(image, longest_edge):
+    """
+        This function scales an image down (never up) so its longest edge fits and encodes it as a progressive JPEG.
+
+        args: image (PIL image, RGB), longest_edge
+
+        returns: JPEG bytes
+    """
+
+    return render_resized(image, longest_edge, longest_edge)
+
+
+def dominant_color(image):
+    """
+        This function finds the most common color of an image (after reducing it to a small palette, so near-identical shades count together).
+
+        args: image (PIL image, RGB)
+
+        returns: hex color (e.g. '#c87828')
+    """
+
+    sample = image.copy()
+    sample.thumbnail((64, 64))
+    palette_image = sample.quantize(colors=5)
+    palette = palette_image.getpalette()
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def preview_data_uri(image):
+    """
+        This function encodes a tiny (PLACEHOLDER_PREVIEW_SIZE px) JPEG of an image as a data URI, small enough to inline in every card.
+
+        args: image (PIL image, RGB)
+
+        returns: data URI string (a few hundred bytes)
+    """
+
+    preview = image.copy()
+    preview.thumbnail((PLACEHOLDER_PREVIEW_SIZE, PLACEHOLDER_PREVIEW_SIZE), Image.LANCZOS)
+
+    output = io.BytesIO()
+    preview.save(output, 'JPEG', quality=PLACEHOLDER_PREVIEW_QUALITY)
+    return 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+
+
+def image_placeholders(image):
+    """
+        returns: dict of the Animal placeholder fields for an image (placeholder_color, placeholder_preview)
+    """
+
+    return {
+        'placeholder_color': dominant_color(image),
+        'placeholder_preview': preview_data_uri(image),
+    }
+
+
+def write_derivatives(image_field, image):
+    """
+        This function writes every size in DERIVATIVE_SIZES of a loaded image to the image's storage, replacing any earlier copies.
+
+        returns: dict of size -> storage name
+    """
+
+    storage = image_field.storage
+
+    names = dict()
+    for size, longest_edge in DERIVATIVE_SIZES.items():
+        name = derivative_name(image_field.name, size)
+        storage.delete(name)
+        names[size] = storage.save(name, ContentFile(render_derivative(image, longest_edge)))
+
+    return names
+
+
+def process_image(image_field):
+    """
+        This function does all the work for a new upload, reading it only once: it writes the derived sizes and computes the low-quality placeholder.
+
+        args: image_field (Animal.image)
+
+        returns: dict of the Animal placeholder fields (raises OSError if the upload is missing or isn't an image)
+    """
+
+    image = load_image(image_field.storage, image_field.name)
+    write_derivatives(image_field, image)
+    return image_placeholders(image)
+
+
+def update_animal_derivatives(animal):
+    """
+        This function generates the derived sizes and placeholder of an animal's image and marks them ready, so templates start serving them.
+
+        args: animal (instance)
+
+        returns: True if the animal's derived images are ready, else False (the full-size image is served meanwhile)
+    """
+
+    if not has_derivatives(animal.image):
+        return False
+
+    try:
+        placeholders = process_image(animal.image)
+    except OSError:
+        return False
+
+    for field, value in placeholders.items():
+        setattr(animal, field, value)
+    animal.derivatives_ready = True
+    # saving (rather than update()) lets the catalog cache drop pages holding the old flag
+    animal.save(update_fields=['derivatives_ready', *placeholders])
+    return True
@@ -0,0 +1,231 @@
+# database
+from django.db import connections
+# templates
+from django.template.backends.django import DjangoTemplates
+# tools
+from django.conf import settings
+from django.utils import timezone
+import collections
+import contextlib
+import json
+import logging
+import re
+import threading
+import time
+
+# one JSON object per request (see LOGGING in settings)
+logger = logging.getLogger('app.request_metrics')
+# views over their query budget; kept apart so the warnings propagate to the usual handlers instead of the metrics file
+budget_logger = logging.getLogger('app.query_budget')
+
+# duplicate query signatures included in each log line, most repeated first
+LOGGED_DUPLICATES = 5
+
+# literals and parameter lists that vary between otherwise identical queries
+NUMBER_LITERAL = re.compile(r'\b\d+\b')
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+PARAMETER_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+
+# metrics of the request being handled on this thread (None outside a request)
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+        Raised (when QUERY_BUDGET_ACTION is 'raise', as the test runners set it) by a request that made more queries than its view's budget in QUERY_BUDGETS.
+    """
+
+
+def query_signature(sql):
+    """
+        This function reduces a query to its shape, so the same query run for every row of a loop (an N+1) counts as one signature.
+
+        args: sql (as sent to the database, with %s placeholders)
+
+        returns: normalized SQL string
+    """
+
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('N', sql)
+    return PARAMETER_LIST.sub('(...)', sql)
+
+
+class RequestMetrics:
+    """
+        Collects the database and template timings of one request. An instance is installed as a database execute wrapper (connection.execute_wrapper) for the length of the request.
+
+        Methods:
+            __call__
+            time_template
+            duplicates
+            as_record
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.signatures = collections.Counter()
+        self.template_seconds = 0.0
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.signatures[query_signature(sql)] += 1
+
+    @contextlib.contextmanager
+    def time_template(self):
+        """
+            This method times a template render. Templates rendered while another one renders (includes, crispy forms) are part of the outer render and aren't counted twice.
+        """
+
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if self._template_depth == 0:
+                self.template_seconds += time.perf_counter() - started
+
+    def duplicates(self):
+        """
+            returns: list of (signature, times run) for queries run more than once, most repeated first
+        """
+
+        return [(signature, count) for signature, count in self.signatures.most_common() if count > 1]
+
+    def as_record(self, request, response, total_seconds):
+        """
+            returns: dict ready to be logged as one JSON line
+        """
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        # what's left once the queries and the template are taken out: the view's own Python (and the middleware's)
+        view_seconds = max(total_seconds - self.sql_seconds - self.template_seconds, 0.0)
+
+        return {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': self.queries,
+            'duplicate_queries': sum(count - 1 for _, count in self.duplicates()),
+            'sql_ms': round(self.sql_seconds * 1000, 2),
+            'template_ms': round(self.template_seconds * 1000, 2),
+            'view_ms': round(view_seconds * 1000, 2),
+            'total_ms': round(total_seconds * 1000, 2),
+            'duplicates': [{'sql': signature[:300], 'count': count} for signature, count in self.duplicates()[:LOGGED_DUPLICATES]],
+        }
+
+
+def current_metrics():
+    """
+        returns: RequestMetrics of the request being handled on this thread, or None
+    """
+
+    return getattr(_local, 'metrics', None)
+
+
+def server_timing(record):
+    """
+        This function formats a request's timings as a Server-Timing header, which browsers show in their network panel.
+
+        args: record (RequestMetrics.as_record)
+
+        returns: header value
+    """
+
+    return ', '.join((
+        f'sql;dur={record["sql_ms"]};desc="{record["queries"]} queries, {record["duplicate_queries"]} duplicates"',
+        f'template;dur={record["template_ms"]}',
+        f'view;dur={record["view_ms"]}',
+        f'total;dur={record["total_ms"]}',
+    ))
+
+
+def query_budget(view_name):
+    """
+        args: view_name (e.g. 'app:pets')
+
+        returns: most queries the view may make (QUERY_BUDGETS in settings), or None if it has no budget
+    """
+
+    if view_name is None:
+        return None
+    return getattr(settings, 'QUERY_BUDGETS', dict()).get(view_name)
+
+
+class RequestMetricsMiddleware:
+    """
+        Records, for every request, the number of SQL queries and their total time, repeated query signatures, template render time, and the time left for the view itself. The numbers are sent back in a Server-Timing header and logged as one JSON line to the 'app.request_metrics' logger.
+
+        A view listed in QUERY_BUDGETS that makes more queries than its budget is logged as a warning to the 'app.query_budget' logger, or raises QueryBudgetExceeded when QUERY_BUDGET_ACTION is 'raise' (set by the test runners), so a regression fails the test that triggered it.
+
+        Place it first in MIDDLEWARE so the session and user lookups are counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        started = time.perf_counter()
+
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+
+        record = metrics.as_record(request, response, time.perf_counter() - started)
+        response['Server-Timing'] = server_timing(record)
+        logger.info(json.dumps(record))
+
+        budget = query_budget(record['view'])
+        if budget is not None and record['queries'] > budget:
+            message = f'{record["view"]} made {record["queries"]} queries (budget {budget}) for {request.method} {request.path}'
+            if getattr(settings, 'QUERY_BUDGET_ACTION', 'log') == 'raise':
+                raise QueryBudgetExceeded(message + ''.join(f'\n  {count} x {sql}' for sql, count in metrics.duplicates()))
+            budget_logger.warning(message)
+
+        return response
+
+
+class TimedTemplate:
+    """
+        Wraps a backend template so its render time is added to the current request's metrics.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return self.template.render(context, request)
+        with metrics.time_template():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+        The regular Django template backend, with every template it hands out timed (see TimedTemplate).
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
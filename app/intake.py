@@ -0,0 +1,249 @@
+# models
+from .models import Animal, Breed, Color, ImageJob, Species, determine_age_group
+# lookup tables and search index
+from .lookups import breed_lookup, color_lookup, species_lookup
+from .search import index_animals_after
+# photos
+from .forms import BoundedImageField
+# tools
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import DatabaseError, DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .utils import bump_catalog_version
+import csv
+import datetime
+import itertools
+import os
+import posixpath
+import shutil
+import tempfile
+import zipfile
+
+# CSV header row: every column is required except arrival_date (defaults to now) and image (a file name in the image folder or zip)
+INTAKE_COLUMNS = ('name', 'age', 'sex', 'species', 'breed', 'color', 'description', 'arrival_date', 'image')
+INTAKE_REQUIRED_COLUMNS = ('name', 'age', 'sex', 'species', 'breed', 'color', 'description')
+
+# rows parsed, looked up and inserted at a time, so a CSV of any length is never held in memory
+INTAKE_CHUNK_SIZE = 500
+
+# (model, name field, lookup table) for each name column
+NAME_COLUMNS = {
+    'species': (Species, 'species', species_lookup),
+    'breed': (Breed, 'breed', breed_lookup),
+    'color': (Color, 'color', color_lookup),
+}
+
+
+class ImageFolder:
+    """
+        Finds intake photos by file name in a directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def open(self, filename):
+        """
+            returns: File, or None if there is no such photo
+        """
+
+        path = os.path.join(self.directory, filename)
+        return File(open(path, 'rb'), name=filename) if os.path.isfile(path) else None
+
+    def close(self):
+        pass
+
+
+class ImageZip:
+    """
+        Finds intake photos by file name in a zip file (in any folder inside it). Only the zip's directory is read up front; each photo is extracted to a temporary file when its row is imported.
+    """
+
+    def __init__(self, file):
+        self.zip_file = zipfile.ZipFile(file)
+        self.members = {posixpath.basename(info.filename): info for info in self.zip_file.infolist() if not info.is_dir()}
+
+    def open(self, filename):
+        """
+            returns: File (a seekable temporary copy), or None if there is no such photo
+        """
+
+        info = self.members.get(filename)
+        if info is None:
+            return None
+
+        extracted = tempfile.TemporaryFile()
+        with self.zip_file.open(info) as member:
+            shutil.copyfileobj(member, extracted)
+        extracted.seek(0)
+        return File(extracted, name=filename)
+
+    def close(self):
+        self.zip_file.close()
+
+
+def open_image_source(source):
+    """
+        args: source (None, a directory path, or a zip file path / file object)
+
+        returns: ImageFolder, ImageZip, or None
+    """
+
+    if source is None:
+        return None
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageFolder(source)
+    return ImageZip(source)
+
+
+def _clean_row(row, staff, images):
+    """
+        This helper function validates one CSV row and stores its photo.
+
+        returns: tuple (Animal instance without species/breed/color, dict of name column -> name); raises ValidationError with the row's problems
+    """
+
+    missing = [column for column in INTAKE_REQUIRED_COLUMNS if not (row.get(column) or '').strip()]
+    if missing:
+        raise ValidationError(f'missing {", ".join(missing)}')
+
+    names = {column: row[column].strip().lower() for column in NAME_COLUMNS}
+
+    age = parse_date(row['age'].strip())
+    if age is None:
+        raise ValidationError(f'age {row["age"]!r} is not a date (YYYY-MM-DD)')
+
+    arrival_date = timezone.now()
+    if (row.get('arrival_date') or '').strip():
+        arrival_day = parse_date(row['arrival_date'].strip())
+        if arrival_day is None:
+            raise ValidationError(f'arrival_date {row["arrival_date"]!r} is not a date (YYYY-MM-DD)')
+        arrival_date = timezone.make_aware(datetime.datetime.combine(arrival_day, datetime.time.min))
+
+    animal = Animal(
+        name=row['name'].strip(),
+        age=age,
+        age_group=determine_age_group(age),
+        sex=row['sex'].strip().upper(),
+        description=row['description'].strip(),
+        arrival_date=arrival_date,
+        staff=staff,
+    )
+    try:
+        # the related rows are resolved per chunk, and full_clean would look each one up
+        animal.full_clean(exclude=['species', 'breed', 'color', 'staff', 'image'])
+    except ValidationError as error:
+        raise ValidationError([f'{field}: {message}' for field, messages in error.message_dict.items() for message in messages])
+
+    filename = (row.get('image') or '').strip()
+    if filename:
+        source = images.open(filename) if images is not None and filename == posixpath.basename(filename) else None
+        if source is None:
+            raise ValidationError(f'image {filename!r} was not found')
+        try:
+            # the same checks and downscaling as a photo uploaded through the new arrival form
+            photo = BoundedImageField().clean(source)
+            animal.image.save(photo.name, photo, save=False)
+        except ValidationError as error:
+            raise ValidationError(f'image {filename!r}: {" ".join(error.messages)}')
+        finally:
+            source.close()
+
+    return animal, names
+
+
+def resolve_names(column, names, using=DEFAULT_DB_ALIAS):
+    """
+        This function maps species, breed or color names to their pks with one query, creating the names that don't exist yet with one more.
+
+        args: column ('species', 'breed' or 'color'), names (set of lowercase names)
+
+        returns: tuple (dict of name -> pk, number of rows created)
+    """
+
+    model, field, lookup_table = NAME_COLUMNS[column]
+
+    pks = dict()
+    # names aren't unique, so the lowest pk wins (as in lookups.py)
+    for pk, name in model.objects.using(using).filter(**{f'{field}__in': names}).order_by('-pk').values_list('pk', field):
+        pks[name] = pk
+
+    missing = names - set(pks)
+    if missing:
+        model.objects.using(using).bulk_create([model(**{field: name}) for name in sorted(missing)])
+        # bulk_create sends no signals and (on SQLite) sets no pks, so read them back and tell every process to reload the table
+        pks.update(model.objects.using(using).filter(**{f'{field}__in': missing}).values_list(field, 'pk'))
+        lookup_table.invalidate()
+
+    return pks, len(missing)
+
+
+def import_animals(csv_file, staff, images=None, chunk_size=INTAKE_CHUNK_SIZE, using=DEFAULT_DB_ALIAS):
+    """
+        This function admits every animal in a CSV file (see INTAKE_COLUMNS). The file is read INTAKE_CHUNK_SIZE rows at a time: each chunk's species, breed and color names are resolved in one batch and its animals are inserted with bulk_create. A row with a problem is reported and skipped without stopping the rest of the import. Photos are stored straight away and queued for the image worker.
+
+        args: csv_file (text file object), staff (CustomUser recorded as the admitting staff member), images (None, or a directory path / zip file with the photos named in the image column), chunk_size
+
+        returns: tuple (number of animals created, number of species/breeds/colors created, list of (CSV line number, error message))
+    """
+
+    reader = csv.DictReader(csv_file)
+    missing_columns = [column for column in INTAKE_REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing_columns:
+        return 0, 0, [(1, f'the header row is missing {", ".join(missing_columns)}')]
+
+    images = open_image_source(images)
+    created = 0
+    names_created = 0
+    errors = list()
+
+    # DictReader counts physical lines, so this is the line a row ends on (a quoted field may span several)
+    numbered_rows = ((reader.line_num, row) for row in reader)
+
+    try:
+        while True:
+            rows = list(itertools.islice(numbered_rows, chunk_size))
+            if not rows:
+                break
+
+            cleaned = list()
+            for line, row in rows:
+                try:
+                    cleaned.append((line, *_clean_row(row, staff, images)))
+                except ValidationError as error:
+                    errors.append((line, '; '.join(error.messages)))
+
+            if not cleaned:
+                continue
+
+            for column in NAME_COLUMNS:
+                pks, new_names = resolve_names(column, {names[column] for _, _, names in cleaned}, using)
+                names_created += new_names
+                for _, animal, names in cleaned:
+                    setattr(animal, f'{column}_id', pks[names[column]])
+
+            animals = [animal for _, animal, _ in cleaned]
+            try:
+                with transaction.atomic(using=using):
+                    last_pk = Animal.objects.using(using).aggregate(last_pk=Max('pk'))['last_pk'] or 0
+                    Animal.objects.using(using).bulk_create(animals)
+                    # bulk_create sends no post_save signals: index the new rows and queue their photos here
+                    index_animals_after(last_pk, using)
+                    new_photos = Animal.objects.using(using).filter(pk__gt=last_pk, derivatives_ready=False).exclude(image=Animal._meta.get_field('image').default).exclude(image='')
+                    ImageJob.objects.using(using).bulk_create([ImageJob(animal_id=pk) for pk in new_photos.values_list('pk', flat=True)])
+            except DatabaseError as error:
+                errors.extend((line, f'not saved: {error}') for line, _, _ in cleaned)
+                continue
+
+            created += len(animals)
+    finally:
+        if images is not None:
+            images.close()
+
+    if created or names_created:
+        bump_catalog_version(using)
+
+    return created, names_created, errors
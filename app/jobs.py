@@ -0,0 +1,138 @@
+# models
+from .models import Animal, ImageJob
+# derived image sizes
+from .images import has_derivatives, process_image
+# tools
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F
+from django.utils import timezone
+from .utils import bump_catalog_version
+import datetime
+
+# attempts before a job is marked failed (run_image_worker --retry-failed puts failed jobs back in the queue)
+IMAGE_JOB_MAX_ATTEMPTS = getattr(settings, 'IMAGE_JOB_MAX_ATTEMPTS', 5)
+
+# seconds a failed job waits before its first retry; doubles with every further failure
+RETRY_BACKOFF_SECONDS = 30
+
+# a job left running this long belongs to a worker that died, and is handed out again
+STALE_JOB_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def enqueue_image_job(animal):
+    """
+        This function queues the generation of an animal's derived image sizes and returns straight away. A pending job that already exists for the animal is reused, since the job reads the animal's current image when it runs.
+
+        args: animal (instance)
+
+        returns: ImageJob instance, or None if the image needs no derived sizes (e.g. the placeholder)
+    """
+
+    if not has_derivatives(animal.image):
+        return None
+
+    job = ImageJob.objects.filter(animal=animal, status='pending').first()
+    return job if job is not None else ImageJob.objects.create(animal=animal)
+
+
+def claim_image_jobs(limit):
+    """
+        This function hands up to `limit` due jobs to the calling worker. Each job is claimed with a conditional UPDATE (status still 'pending'), so two workers polling at once never run the same job.
+
+        args: limit
+
+        returns: list of claimed job ids
+    """
+
+    now = timezone.now()
+    ImageJob.objects.filter(status='running', started_at__lt=now - STALE_JOB_TIMEOUT).update(status='pending')
+
+    due = ImageJob.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'pk').values_list('pk', flat=True)[:limit]
+    claimed = list()
+
+    for job_id in list(due):
+        if ImageJob.objects.filter(pk=job_id, status='pending').update(status='running', started_at=now, attempts=F('attempts') + 1) == 1:
+            claimed.append(job_id)
+
+    return claimed
+
+
+def run_image_job(job_id, max_attempts=IMAGE_JOB_MAX_ATTEMPTS):
+    """
+        This function runs one claimed job: it writes the derived sizes, stores the low-quality placeholder, and marks the animal's image ready. A failed job goes back in the queue with exponential backoff until it has used max_attempts.
+
+        args: job_id, max_attempts
+
+        returns: True if the derived sizes were written, else False
+    """
+
+    job = ImageJob.objects.select_related('animal').filter(pk=job_id).first()
+
+    # the animal (and its jobs) was deleted after the job was claimed
+    if job is None:
+        return False
+
+    image_name = job.animal.image.name
+
+    try:
+        placeholders = process_image(job.animal.image)
+    except Exception as error:
+        ImageJob.objects.filter(pk=job_id).update(
+            status='failed' if job.attempts >= max_attempts else 'pending',
+            run_after=timezone.now() + datetime.timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** max(job.attempts - 1, 0)),
+            last_error=f'{type(error).__name__}: {error}'[:500],
+        )
+        return False
+
+    # only the image that was processed is marked ready (staff may have uploaded another one meanwhile)
+    if Animal.objects.filter(pk=job.animal_id, image=image_name).update(derivatives_ready=True, **placeholders) > 0:
+        # update() skips the save signals, so drop cached result pages here
+        bump_catalog_version()
+
+    ImageJob.objects.filter(pk=job_id).update(status='done', last_error=None)
+    return True
+
+
+def _run_image_job_in_thread(job_id, max_attempts):
+    """
+        This helper function runs a job on a pool thread and closes the thread's database connection afterwards.
+    """
+
+    try:
+        return run_image_job(job_id, max_attempts)
+    finally:
+        connection.close()
+
+
+def run_image_jobs(executor=None, limit=None, pool='thread', max_attempts=IMAGE_JOB_MAX_ATTEMPTS):
+    """
+        This function claims the jobs that are due and runs them, either on a thread/process pool executor or (without one) inline.
+
+        args: executor (concurrent.futures executor or None), limit (max jobs to claim, default all), pool ('thread' or 'process'), max_attempts
+
+        returns: tuple (number of jobs run, number that succeeded)
+    """
+
+    job_ids = claim_image_jobs(limit if limit is not None else ImageJob.objects.count())
+
+    if executor is None:
+        results = [run_image_job(job_id, max_attempts) for job_id in job_ids]
+    elif pool == 'process':
+        # worker processes are forked from this one and must not share its database connection
+        connections.close_all()
+        results = list(executor.map(run_image_job, job_ids, [max_attempts] * len(job_ids)))
+    else:
+        results = list(executor.map(_run_image_job_in_thread, job_ids, [max_attempts] * len(job_ids)))
+
+    return len(results), results.count(True)
+
+
+def retry_failed_image_jobs():
+    """
+        This function puts every failed job back in the queue with a fresh set of attempts.
+
+        returns: number of jobs re-queued
+    """
+
+    return ImageJob.objects.filter(status='failed').update(status='pending', attempts=0, run_after=timezone.now())
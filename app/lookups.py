@@ -0,0 +1,128 @@
+# models
+from .models import Breed, Color, Species
+# tools
+from django.conf import settings
+from django.core.cache import caches
+import datetime
+import threading
+
+
+class LookupTable:
+    """
+        Holds every row of a small lookup table (Species, Breed, Color) in process memory and serves lookups by pk and by name without touching the database.
+
+        Each table has a version stamp in the shared catalog cache. Saving or deleting a row changes the stamp (see signals.py), and every process reloads its copy the next time it sees a new stamp. Rows handed out are shared between requests, so treat them as read-only.
+
+        A key that isn't found reloads the table once, in case the row was inserted without a save signal. A key that is still missing is remembered until the stamp changes, so repeating a bad lookup (e.g. ?animal_species=fish) doesn't reload the table on every request.
+
+        Methods:
+            get
+            get_by_name
+            all
+            invalidate
+    """
+
+    def __init__(self, model, name_field):
+        self.model = model
+        self.name_field = name_field
+        self.version_key = f'lookup_version:{model._meta.label_lower}'
+        self._version = None
+        self._by_pk = dict()
+        self._by_name = dict()
+        # (field, key) pairs known to be missing from the loaded version
+        self._missing = set()
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        return caches[getattr(settings, 'CATALOG_CACHE', 'default')]
+
+    def _current_version(self):
+        cache = self._cache()
+        version = cache.get(self.version_key)
+
+        if version is None:
+            cache.add(self.version_key, int(datetime.datetime.now().timestamp() * 1000), timeout=None)
+            version = cache.get(self.version_key)
+
+        return version
+
+    def _load(self, version):
+        rows = list(self.model.objects.order_by('pk'))
+        by_name = dict()
+        # names aren't unique, so the lowest pk wins (matching the row the fixtures create first)
+        for row in reversed(rows):
+            by_name[getattr(row, self.name_field)] = row
+
+        with self._lock:
+            self._by_pk = {row.pk: row for row in rows}
+            self._by_name = by_name
+            self._missing = set()
+            self._version = version
+
+    def _refresh(self):
+        version = self._current_version()
+        if version != self._version:
+            self._load(version)
+
+    def _reload_on_miss(self, field, key):
+        missing = (field, key)
+
+        if missing not in self._missing:
+            # a row inserted without a save signal (e.g. bulk_create) won't have changed the version yet
+            self._load(self._current_version())
+            row = getattr(self, f'_by_{field}').get(key)
+            if row is not None:
+                return row
+            with self._lock:
+                self._missing.add(missing)
+
+        raise self.model.DoesNotExist(f'{self.model.__name__} matching {key!r} does not exist.')
+
+    def get(self, pk):
+        """
+            args: pk (int or numeric string, e.g. a POSTed select value)
+
+            returns: model instance (raises Model.DoesNotExist if there is no such row)
+        """
+
+        self._refresh()
+        pk = int(pk)
+        row = self._by_pk.get(pk)
+        return row if row is not None else self._reload_on_miss('pk', pk)
+
+    def get_by_name(self, name):
+        """
+            args: name (e.g. 'cat')
+
+            returns: model instance (raises Model.DoesNotExist if there is no such row)
+        """
+
+        self._refresh()
+        row = self._by_name.get(name)
+        return row if row is not None else self._reload_on_miss('name', name)
+
+    def all(self):
+        """
+            returns: list of every row, ordered by pk
+        """
+
+        self._refresh()
+        return list(self._by_pk.values())
+
+    def invalidate(self):
+        """
+            Changes the version stamp so every process reloads the table on its next lookup.
+        """
+
+        cache = self._cache()
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            self._current_version()
+        # this process reloads straight away even if the stamp was missing
+        self._version = None
+
+
+species_lookup = LookupTable(Species, 'species')
+breed_lookup = LookupTable(Breed, 'breed')
+color_lookup = LookupTable(Color, 'color')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+# models
+from app.models import Animal
+# low-quality placeholders
+from app.images import image_placeholders, load_image
+# tools
+from app.utils import bump_catalog_version
+
+
+class Command(BaseCommand):
+    """
+        Stores the dominant color and tiny preview of animal images processed before placeholders existed. Only the uploaded image is read; the derived sizes are left alone. Pass --all to recompute every placeholder, for instance after changing images.PLACEHOLDER_PREVIEW_SIZE.
+
+        usage: python manage.py backfill_image_placeholders [--all]
+    """
+
+    help = 'Computes the low-quality placeholders of animal images that have none.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute placeholders that already exist.')
+
+    def handle(self, *args, **options):
+        animals = Animal.objects.filter(derivatives_ready=True)
+        if not options['all']:
+            animals = animals.filter(placeholder_color='')
+        filled = 0
+        failed = 0
+
+        for animal in animals.only('pk', 'name', 'image').iterator():
+            try:
+                placeholders = image_placeholders(load_image(animal.image.storage, animal.image.name))
+            except OSError:
+                failed += 1
+                self.stderr.write(f'Could not read the image of {animal.name} ({animal.image.name}).')
+                continue
+
+            # only fill in the image that was read (staff may have uploaded another one meanwhile)
+            filled += Animal.objects.filter(pk=animal.pk, image=animal.image.name).update(**placeholders)
+
+        if filled:
+            # update() skips the save signals, so drop cached result pages here
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Stored placeholders for {filled} animals ({failed} failed).'))
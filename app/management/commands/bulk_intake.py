@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+# models
+from app.models import CustomUser
+# bulk intake
+from app.intake import INTAKE_CHUNK_SIZE, INTAKE_COLUMNS, import_animals
+# tools
+import zipfile
+
+
+class Command(BaseCommand):
+    """
+        Admits every animal listed in a CSV file, e.g. for a transfer or a hoarding case. Photos named in the image column are taken from a folder or zip file and queued for the image worker. Rows with problems are listed and skipped; the rest are imported.
+
+        usage: python manage.py bulk_intake animals.csv --staff brendan@email.com [--images photos/ | --images photos.zip] [--chunk-size 500]
+    """
+
+    help = f'Admits the animals in a CSV file with the columns {", ".join(INTAKE_COLUMNS)}.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV file with a header row.')
+        parser.add_argument('--staff', required=True, help='Email of the staff member admitting the animals.')
+        parser.add_argument('--images', help='Folder or zip file holding the photos named in the image column.')
+        parser.add_argument('--chunk-size', type=int, default=INTAKE_CHUNK_SIZE, help=f'Rows inserted per batch (default {INTAKE_CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        staff = CustomUser.objects.filter(email=options['staff'], is_staff=True).first()
+        if staff is None:
+            raise CommandError(f'{options["staff"]} is not a staff member.')
+
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                created, names_created, errors = import_animals(csv_file, staff, images=options['images'], chunk_size=options['chunk_size'])
+        except (OSError, zipfile.BadZipFile) as error:
+            raise CommandError(str(error))
+
+        for line, message in errors:
+            self.stderr.write(f'line {line}: {message}')
+
+        self.stdout.write(self.style.SUCCESS(f'Admitted {created} animals ({names_created} new species/breeds/colors, {len(errors)} rows skipped).'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+# models
+from app.models import Animal
+# derived image sizes
+from app.images import update_animal_derivatives
+
+
+class Command(BaseCommand):
+    """
+        Writes the thumb/card/detail sizes of animal images that don't have them yet (e.g. after loading fixtures). Pass --all to regenerate every image, for instance after changing images.DERIVATIVE_SIZES.
+
+        usage: python manage.py generate_image_derivatives [--all]
+    """
+
+    help = 'Generates the derived (thumb/card/detail) sizes of animal images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate derived sizes that already exist.')
+
+    def handle(self, *args, **options):
+        animals = Animal.objects.all() if options['all'] else Animal.objects.filter(derivatives_ready=False)
+        generated = 0
+        failed = 0
+
+        for animal in animals.exclude(image=Animal._meta.get_field('image').default).exclude(image='').iterator():
+            if update_animal_derivatives(animal):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Could not read the image of {animal.name} ({animal.image.name}).')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated derived images for {generated} animals ({failed} failed).'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+# search index
+from app.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+        Repopulates the animal search index from the Animal table. Run after loaddata (fixture loads skip the save signals that normally keep the index current).
+
+        usage: python manage.py rebuild_search_index
+    """
+
+    help = 'Rebuilds the full-text search index for unadopted animals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild.')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} unadopted animals.'))
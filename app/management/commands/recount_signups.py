@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+# tools
+from app.utils import recount_signups
+
+
+class Command(BaseCommand):
+    """
+        Resets each volunteering activity's stored signup count from its signups. Run after loaddata (fixtures don't go through the signup path that maintains the count).
+
+        usage: python manage.py recount_signups
+    """
+
+    help = 'Recomputes Activity.signup_count from ActivityVolunteer rows.'
+
+    def handle(self, *args, **options):
+        updated = recount_signups()
+        self.stdout.write(self.style.SUCCESS(f'Updated the signup count of {updated} activities.'))
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+# background jobs
+from app.jobs import run_image_jobs, retry_failed_image_jobs, IMAGE_JOB_MAX_ATTEMPTS
+# tools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+class Command(BaseCommand):
+    """
+        Generates the derived image sizes queued by new_arrival and animal_edit. Runs until stopped (e.g. under systemd or supervisor) and polls the ImageJob table for due jobs. Failed jobs are retried with exponential backoff.
+
+        usage: python manage.py run_image_worker [--workers 4] [--pool thread|process] [--once] [--retry-failed]
+    """
+
+    help = 'Processes queued image jobs on a thread or process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMAGE_WORKERS', 2), help='Number of jobs processed at once.')
+        parser.add_argument('--pool', choices=sorted(POOLS), default=getattr(settings, 'IMAGE_WORKER_POOL', 'thread'), help='Run jobs on threads or on separate processes (for CPU-heavy uploads).')
+        parser.add_argument('--max-attempts', type=int, default=IMAGE_JOB_MAX_ATTEMPTS, help='Attempts before a job is marked failed.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when no jobs are due.')
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are due instead of polling.')
+        parser.add_argument('--retry-failed', action='store_true', help='Put failed jobs back in the queue before starting.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Re-queued {retry_failed_image_jobs()} failed jobs.')
+
+        run = 0
+        succeeded = 0
+
+        with POOLS[options['pool']](max_workers=options['workers']) as executor:
+            try:
+                while True:
+                    batch_run, batch_succeeded = run_image_jobs(executor, limit=options['workers'], pool=options['pool'], max_attempts=options['max_attempts'])
+                    run += batch_run
+                    succeeded += batch_succeeded
+
+                    if batch_run == 0:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {run} image jobs ({succeeded} succeeded, {run - succeeded} failed or waiting to retry).'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+# models
+from app.models import CustomUser
+# synthetic data
+from app.seeding import SEED_CHUNK_SIZE, seed_email_domain, seed_scale
+# tools
+import time
+
+
+class Command(BaseCommand):
+    """
+        Fills the database with synthetic users, volunteers, animals, adoption applications, volunteering activities, and signups at a chosen scale, e.g. to reproduce production performance locally. The fixtures in db.json are far too small for that. The same --seed always generates the same data, and each seed can be loaded once (its users' emails end in @seed<N>.example.com). Every generated user's password is --password.
+
+        usage: python manage.py seed_scale --animals 50000 --applications 500000 --users 10000 [--activities 2000] [--seed 0] [--chunk-size 5000]
+    """
+
+    help = 'Generates realistic synthetic data at a chosen scale, deterministically from a seed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users (one in 200 is staff) with their volunteer contact details (default 1000).')
+        parser.add_argument('--animals', type=int, default=1000, help='Animals, most of them already adopted (default 1000).')
+        parser.add_argument('--applications', type=int, default=10000, help='Adoption applications (default 10000).')
+        parser.add_argument('--activities', type=int, default=100, help='Volunteering activities, each with its signups (default 100).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0).')
+        parser.add_argument('--password', default='password', help='Password of every generated user (default "password").')
+        parser.add_argument('--chunk-size', type=int, default=SEED_CHUNK_SIZE, help=f'Rows inserted per batch (default {SEED_CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['animals'], options['applications'], options['activities']) < 0 or options['chunk_size'] < 1:
+            raise CommandError('Counts must be zero or more, and --chunk-size at least 1.')
+
+        domain = seed_email_domain(options['seed'])
+        if CustomUser.objects.filter(email__endswith=f'@{domain}').exists():
+            raise CommandError(f'Seed {options["seed"]} has already been loaded (users @{domain} exist). Pick another --seed.')
+
+        started = time.perf_counter()
+        created = seed_scale(
+            users=options['users'],
+            animals=options['animals'],
+            applications=options['applications'],
+            activities=options['activities'],
+            seed=options['seed'],
+            password=options['password'],
+            chunk_size=options['chunk_size'],
+            progress=self.stdout.write,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Created {sum(created.values())} rows in {time.perf_counter() - started:.1f}s.'))
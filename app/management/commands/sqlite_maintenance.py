@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+# database tuning
+from app.sqlite import CHECKPOINT_MODES, checkpoint_and_optimize
+# tools
+from django.db import connections
+
+
+class Command(BaseCommand):
+    """
+        Checkpoints the SQLite write-ahead log into the database file (truncating it, so it doesn't keep growing between quiet periods) and runs PRAGMA optimize so the query planner's statistics stay current. Schedule it, e.g. nightly with cron, and run it after a bulk import or seed_scale.
+
+        usage: python manage.py sqlite_maintenance [--mode truncate] [--skip-optimize] [--database default]
+    """
+
+    help = 'Checkpoints the SQLite WAL file and refreshes query planner statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=CHECKPOINT_MODES, default='truncate', help='wal_checkpoint mode (default truncate).')
+        parser.add_argument('--skip-optimize', action='store_true', help="Only checkpoint, don't run PRAGMA optimize.")
+        parser.add_argument('--database', default='default', help='Database alias to maintain.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'{options["database"]} is not an SQLite database.')
+
+        busy, log_pages, checkpointed = checkpoint_and_optimize(connection, options['mode'], optimize=not options['skip_optimize'])
+
+        if log_pages < 0:
+            self.stdout.write('The database is not in WAL mode, so there was nothing to checkpoint.')
+        elif busy:
+            self.stdout.write(self.style.WARNING(f'Checkpointed {checkpointed} of {log_pages} WAL pages; readers or a writer kept the rest, run again later.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Checkpointed {checkpointed} of {log_pages} WAL pages.'))
+        if not options['skip_optimize']:
+            self.stdout.write(self.style.SUCCESS('Refreshed query planner statistics.'))
@@ -0,0 +1,149 @@
+from django.core.management.base import BaseCommand
+# models
+from app.models import Animal
+# storage
+from app.images import DERIVATIVE_DIRECTORY, DERIVATIVE_SIZES
+from app.storage import FORMAT_EXTENSIONS, walk_files
+from django.core.files.storage import default_storage
+# tools
+import itertools
+import os
+import posixpath
+import re
+import time
+
+# directory that holds the animal uploads (Animal.image upload_to) and, below it, their derived sizes
+UPLOAD_DIRECTORY = Animal._meta.get_field('image').upload_to.rstrip('/')
+
+# files changed this recently are left alone: they may belong to an upload whose animal hasn't been saved yet
+GRACE_HOURS = 24
+
+# file names looked up per query (sqlite allows at most 999 parameters)
+BATCH_SIZE = 500
+
+# e.g. media/derived/3fa2...e9_card.jpg -> stem '3fa2...e9'
+DERIVED_FILE = re.compile(r'^(?P<stem>.+)_(?:' + '|'.join(DERIVATIVE_SIZES) + r')\.jpg$')
+CONTENT_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+# extensions a derived file's upload is looked up with: the ones ContentAddressedStorage names uploads with, and their upper-case forms for uploads named before it (e.g. media/kiwi_tree.JPG)
+UPLOAD_EXTENSIONS = sorted({*FORMAT_EXTENSIONS.values(), '.jpeg'})
+
+
+def source_prefix(stem):
+    """
+        args: stem of a derived file's upload (e.g. '3fa2...e9' or 'kiwi_tree')
+
+        returns: the start of that upload's storage name, up to its extension (e.g. 'media/3f/a2/3fa2...e9.')
+    """
+
+    if CONTENT_HASH.match(stem):
+        return f'{UPLOAD_DIRECTORY}/{stem[:2]}/{stem[2:4]}/{stem}.'
+    return f'{UPLOAD_DIRECTORY}/{stem}.'
+
+
+def upload_names(stem):
+    """
+        args: stem of a derived file's upload
+
+        returns: list of the storage names that upload can have, one per extension in UPLOAD_EXTENSIONS
+    """
+
+    extensions = [extension[1:] for extension in UPLOAD_EXTENSIONS]
+    # content-addressed names always have lower-case extensions
+    if not CONTENT_HASH.match(stem):
+        extensions += [extension.upper() for extension in extensions]
+    return [source_prefix(stem) + extension for extension in extensions]
+
+
+def image_stem(image_name):
+    return posixpath.splitext(posixpath.basename(image_name))[0]
+
+
+class Command(BaseCommand):
+    """
+        Deletes uploaded images that no animal references any more, along with derived sizes whose upload is gone (e.g. after an animal was deleted or an edit failed halfway). The upload directory is streamed one directory at a time and file names are looked up BATCH_SIZE at a time, so memory use stays flat however many files there are. Files changed within the grace period, and the placeholder, are never deleted.
+
+        usage: python manage.py sweep_orphaned_media [--dry-run] [--grace-hours 24] [--batch-size 500]
+    """
+
+    help = 'Reports or deletes uploaded images that no animal references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the orphaned files without deleting them.')
+        parser.add_argument('--grace-hours', type=float, default=GRACE_HOURS, help=f'Leave files changed within this many hours alone (default {GRACE_HOURS}).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'File names looked up per query (default {BATCH_SIZE}).')
+
+    def candidates(self, cutoff):
+        """
+            This method lists the files old enough to be swept, as (storage name, size in bytes).
+        """
+
+        placeholder = Animal._meta.get_field('image').default
+
+        for name, file_stat in walk_files(default_storage, UPLOAD_DIRECTORY):
+            if name != placeholder and file_stat.st_mtime < cutoff:
+                yield name, file_stat.st_size
+
+    def unreferenced(self, batch):
+        """
+            This method looks a batch of files up by exact name, so every query is an index search on Animal.image: one query for the uploads, and one per BATCH_SIZE names a derived size's upload can have.
+
+            args: batch (list of (storage name, size))
+
+            returns: list of the (storage name, size) pairs that no animal uses
+        """
+
+        uploads = [name for name, _ in batch if not name.startswith(DERIVATIVE_DIRECTORY + '/')]
+        referenced = set(Animal.objects.filter(image__in=uploads).values_list('image', flat=True)) if uploads else set()
+
+        derived_stems = dict()
+        for name, _ in batch:
+            if name.startswith(DERIVATIVE_DIRECTORY + '/'):
+                match = DERIVED_FILE.match(posixpath.basename(name))
+                # anything else in the derived directory wasn't written by images.py
+                derived_stems[name] = match.group('stem') if match else None
+
+        names = [name for stem in sorted(set(filter(None, derived_stems.values()))) for name in upload_names(stem)]
+        referenced_stems = set()
+        for start in range(0, len(names), BATCH_SIZE):
+            referenced_stems.update(image_stem(image) for image in Animal.objects.filter(image__in=names[start:start + BATCH_SIZE]).values_list('image', flat=True))
+
+        orphans = list()
+        for name, size in batch:
+            if name in derived_stems:
+                if derived_stems[name] not in referenced_stems:
+                    orphans.append((name, size))
+            elif name not in referenced:
+                orphans.append((name, size))
+
+        return orphans
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['grace_hours'] * 3600
+        dry_run = options['dry_run']
+        candidates = self.candidates(cutoff)
+        orphaned = 0
+        orphaned_bytes = 0
+
+        while True:
+            batch = list(itertools.islice(candidates, options['batch_size']))
+            if not batch:
+                break
+
+            for name, size in self.unreferenced(batch):
+                if not dry_run:
+                    try:
+                        # a re-upload of identical content touches the file (see ContentAddressedStorage.save)
+                        if os.stat(default_storage.path(name)).st_mtime >= cutoff:
+                            continue
+                        os.remove(default_storage.path(name))
+                    except FileNotFoundError:
+                        continue
+
+                orphaned += 1
+                orphaned_bytes += size
+                if dry_run or options['verbosity'] > 1:
+                    self.stdout.write(name)
+
+        action = 'Found' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{action} {orphaned} orphaned files ({orphaned_bytes / 1024 / 1024:.1f} MB).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+# tools
+from app.utils import update_age_groups
+
+
+class Command(BaseCommand):
+    """
+        Moves unadopted animals into their current age group (young/adult/senior). Schedule once a day, e.g. from cron shortly after midnight.
+
+        usage: python manage.py update_age_groups
+    """
+
+    help = 'Rolls unadopted animals forward across the young/adult/senior age boundaries.'
+
+    def handle(self, *args, **options):
+        moved = update_age_groups()
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} animals to a new age group.'))
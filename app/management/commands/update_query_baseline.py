@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+# query counts
+from app.query_counts import QUERY_BASELINE_PATH, QUERY_COUNT_SIZES, compare_query_counts, load_query_baseline, measure_query_counts, write_query_baseline
+# tools
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+import os
+
+
+class Command(BaseCommand):
+    """
+        Measures the number of queries every named route makes (as an anonymous user, a volunteer, and a staff member) and writes them to the baseline checked by app/tests/test_query_counts.py. Run it after a change that adds or removes queries on purpose, and commit the baseline with the change.
+
+        The routes are requested against a scratch test database seeded at each size in QUERY_COUNT_SIZES; db.sqlite3 is never touched. The baseline is only written if every route makes the same number of queries at every size.
+
+        usage: python manage.py update_query_baseline
+    """
+
+    help = 'Regenerates the per-route query count baseline (app/tests/query_baseline.json).'
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            measurements = [(rows, *measure_query_counts(rows)) for rows in QUERY_COUNT_SIZES]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        smallest_rows, smallest, _ = measurements[0]
+        growing = list()
+        for rows, counts, sent in measurements[1:]:
+            growing.extend(f'{smallest_rows} -> {rows} rows: {difference}' for difference in compare_query_counts(smallest, counts, sent))
+        if growing:
+            raise CommandError('These routes make more queries as the data grows, so no baseline was written:\n' + '\n'.join(growing))
+
+        _, counts, _ = measurements[-1]
+        previous = load_query_baseline() if os.path.exists(QUERY_BASELINE_PATH) else dict()
+        for difference in compare_query_counts(previous, counts):
+            self.stdout.write(difference)
+
+        write_query_baseline(counts)
+        self.stdout.write(self.style.SUCCESS(f'Wrote the query counts of {len(counts)} routes to {QUERY_BASELINE_PATH}.'))
@@ -7,6 +7,13 @@ from django.contrib.auth.models import AbstractUser
 from django.utils.translation import ugettext_lazy
 from .managers import CustomUserManager
 from django.conf import settings # used with foreign keys related to custom user model
+# tools
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+import datetime
+# derived image sizes
+from .images import DERIVATIVE_SIZES, derivative_name, has_derivatives
 
 
 class CustomUser(AbstractUser):
@@ -135,6 +142,36 @@ class Color(models.Model):
         return f"{self.color}"
 
 
+AGE_GROUP_CHOICES = (
+    ('young','young'),
+    ('adult','adult'),
+    ('senior','senior'),
+)
+
+def determine_age_group(birthday, today=None):
+    """
+        This function places an estimated birthday in an age group: young (under 2 years), adult (2 to 8 years), or senior (8 years and older).
+
+        args: birthday (date or 'YYYY-MM-DD' string), today (defaults to the current date)
+
+        returns: 'young', 'adult', 'senior', or None if there is no birthday
+    """
+
+    if isinstance(birthday, str):
+        birthday = parse_date(birthday)
+    if birthday is None:
+        return None
+
+    today = today or datetime.date.today()
+
+    if birthday >= today - relativedelta(years=2):
+        return 'young'
+    elif birthday <= today - relativedelta(years=8):
+        return 'senior'
+    else:
+        return 'adult'
+
+
 class Animal(models.Model):
     """Defines an animal at the animal shelter.
 
@@ -152,11 +189,67 @@ class Animal(models.Model):
         ('F', 'Female'),
     )
     sex = models.CharField(max_length=1, choices=SEX_CHOICES)
-    image = models.ImageField(upload_to='media/', default="media/placeholder.jpg", blank=True)
+    # indexed for sweep_orphaned_media, which looks animals up by file name
+    image = models.ImageField(upload_to='media/', default="media/placeholder.jpg", blank=True, db_index=True)
     description = models.CharField(max_length=500)
     arrival_date = models.DateTimeField(default=None, null=True, blank=False)
     date_adopted = models.DateTimeField(default=None, null=True, blank=True)
     staff = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, limit_choices_to={'is_staff': True}, default=None, null=True, blank=False)
+    # derived from age on save and rolled forward daily by the update_age_groups command
+    age_group = models.CharField(max_length=6, choices=AGE_GROUP_CHOICES, default=None, null=True, blank=True, editable=False)
+    # set once the thumb/card/detail copies of the image exist (see images.py)
+    derivatives_ready = models.BooleanField(default=False, editable=False)
+    # dominant color and a 16px base64 JPEG of the image, inlined into cards while the image lazy-loads (see images.image_placeholders)
+    placeholder_color = models.CharField(max_length=7, default='', blank=True, editable=False)
+    placeholder_preview = models.TextField(default='', blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # serves the available pets age filter (date_adopted IS NULL AND age_group = ...)
+            models.Index(fields=['date_adopted', 'age_group'], name='app_animal_adopted_age_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.age_group = determine_age_group(self.age)
+        super().save(*args, **kwargs)
+
+    def derivative_url(self, size):
+        """Returns the url of one derived size of the image (see images.DERIVATIVE_SIZES). The placeholder stands in while an upload waits for the image worker."""
+
+        if not has_derivatives(self.image):
+            return self.image.url
+        if not self.derivatives_ready:
+            return self.image.storage.url(self.image.field.default)
+        return self.image.storage.url(derivative_name(self.image.name, size))
+
+    @property
+    def thumb_image_url(self):
+        return self.derivative_url('thumb')
+
+    @property
+    def card_image_url(self):
+        return self.derivative_url('card')
+
+    @property
+    def detail_image_url(self):
+        return self.derivative_url('detail')
+
+    @property
+    def image_srcset(self):
+        """Returns a srcset attribute value listing every derived size, or an empty string until they exist"""
+
+        if not (self.derivatives_ready and has_derivatives(self.image)):
+            return ''
+        return ', '.join(f'{self.derivative_url(size)} {width}w' for size, width in DERIVATIVE_SIZES.items())
+
+    @property
+    def placeholder_style(self):
+        """Returns an inline style showing the image's placeholder (dominant color under a blurred preview) until the image itself loads, or an empty string if there is none"""
+
+        if not (self.derivatives_ready and self.placeholder_color):
+            return ''
+        preview = f' url({self.placeholder_preview}) center / cover no-repeat' if self.placeholder_preview else ''
+        return f'background: {self.placeholder_color}{preview};'
 
     def __str__(self):
         return f"Name: {self.name} Age: {self.age} Species: {self.species} Sex: {self.sex}"
@@ -202,11 +295,12 @@ class Activity(models.Model):
     max_attendance = models.PositiveSmallIntegerField(default=None, null=True, blank=False)
     activity_type = models.CharField(max_length=7, choices=ACTIVITY_CHOICES, default=None, null=True, blank=False)
     cancelled = models.BooleanField(default=None, null=True)
+    # number of ActivityVolunteer rows, maintained atomically by utils.sign_up_volunteer / cancel_volunteer_signup
+    signup_count = models.PositiveSmallIntegerField(default=0, editable=False)
 
     @property
     def spots_remaining(self):
-        volunteers_signed_up = ActivityVolunteer.objects.filter(activity=self).count()
-        return self.max_attendance - volunteers_signed_up
+        return self.max_attendance - self.signup_count
 
     def __str__(self):
         return f"Name: {self.activity} Staff: {self.staff}"
@@ -220,5 +314,41 @@ class ActivityVolunteer(models.Model):
     volunteer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, default=None, null=True, blank=True)
     activity = models.ForeignKey(Activity, on_delete=models.CASCADE, default=None, null=True, blank=True)
 
+    class Meta:
+        # a volunteer can only sign up once per activity (also guards against double clicks)
+        unique_together = ('activity', 'volunteer')
+
+    def __str__(self):
+        return f"Volunteer: {self.volunteer} Activity: {self.activity}"
+
+
+IMAGE_JOB_STATUS_CHOICES = (
+    ('pending','pending'),
+    ('running','running'),
+    ('done','done'),
+    ('failed','failed'),
+)
+
+class ImageJob(models.Model):
+    """Defines a queued request to generate the derived image sizes of an animal. Jobs are created by new_arrival/animal_edit and processed by the run_image_worker command (see jobs.py).
+
+        Returns: __str__ animal, status, attempts
+    """
+
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE)
+    status = models.CharField(max_length=7, choices=IMAGE_JOB_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # a failed job waits (with exponential backoff) before it is retried
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(default=None, null=True, blank=True)
+    last_error = models.CharField(max_length=500, default=None, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # serves the worker's poll for due jobs (status = 'pending' AND run_after <= now)
+            models.Index(fields=['status', 'run_after'], name='app_imagejob_due_idx'),
+        ]
+
     def __str__(self):
-        return f"Volunteer: {self.volunteer} Activity: {self.activity}"
\ No newline at end of file
+        return f"Animal: {self.animal_id} Status: {self.status} Attempts: {self.attempts}"
@@ -0,0 +1,239 @@
+# models
+from .models import Activity, ActivityVolunteer, Animal, Application, Breed, Color, CustomUser, Species, Volunteer, determine_age_group
+# lookup tables and search index
+from .lookups import breed_lookup, color_lookup, species_lookup
+from .search import index_animals_after
+from .utils import invalidate_pending_app_count
+# request metrics
+from .instrumentation import query_signature
+# routes
+from . import urls
+# tools
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import collections
+import datetime
+import json
+import os
+
+# checked-in query counts of every route (regenerate with: python manage.py update_query_baseline)
+QUERY_BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'tests', 'query_baseline.json')
+
+# rows per table the routes are measured at; a route's count must be the same at every size
+QUERY_COUNT_SIZES = (10, 1000)
+
+# who requests each route (the volunteer and staff member are logged in)
+QUERY_COUNT_ROLES = ('anonymous', 'volunteer', 'staff')
+
+# querystrings for routes that only do their usual work with one
+ROUTE_QUERYSTRINGS = {
+    'search_pets': '?animal_species=cat&name_query=kiwi',
+}
+
+
+def route_names():
+    """
+        returns: sorted list of every named route in app.urls (e.g. 'app:pets')
+    """
+
+    return sorted(f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns if pattern.name)
+
+
+def route_url(route_name, dataset):
+    """
+        This function builds a URL for a named route, filling its path arguments (animal_id, application_id, activity_id) from the seeded dataset.
+
+        args: route_name, dataset (seed_query_dataset)
+
+        returns: URL string
+    """
+
+    pattern = next(pattern for pattern in urls.urlpatterns if f'{urls.app_name}:{pattern.name}' == route_name)
+    kwargs = {argument: dataset[argument] for argument in pattern.pattern.converters}
+    return reverse(route_name, kwargs=kwargs) + ROUTE_QUERYSTRINGS.get(pattern.name, '')
+
+
+def seed_query_dataset(rows):
+    """
+        This function fills the database with `rows` rows in each of the tables the views list: applicants (with contact details), animals (a tenth of them adopted), applications for one animal (half of them rejected), applications by the volunteer, volunteering activities, and signups for one activity. Everything is inserted with bulk_create.
+
+        args: rows
+
+        returns: dict with the 'volunteer' and 'staff' users and the animal_id, application_id and activity_id the routes are requested with
+    """
+
+    now = timezone.now()
+    staff = CustomUser.objects.create_user(email='staff@critter.test', first_name='Staff', last_name='Member', password=None, is_staff=True)
+    volunteer = CustomUser.objects.create_user(email='volunteer@critter.test', first_name='Volunteer', last_name='Member', password=None)
+
+    CustomUser.objects.bulk_create([
+        CustomUser(email=f'applicant{number}@critter.test', first_name='Applicant', last_name=f'{number}', password='!', date_joined=now)
+        for number in range(rows)
+    ])
+    applicants = list(CustomUser.objects.filter(email__endswith='@critter.test', is_staff=False).exclude(pk=volunteer.pk).order_by('pk'))
+    Volunteer.objects.bulk_create([
+        Volunteer(user=user, street_address='1 Main St', city='Nashville', state='TN', zipcode='37201', phone_number=6155550100)
+        for user in [staff, volunteer, *applicants]
+    ])
+
+    cat = Species.objects.create(species='cat')
+    breed = Breed.objects.create(breed='domestic shorthair')
+    color = Color.objects.create(color='black')
+
+    age = datetime.date.today() - datetime.timedelta(days=3 * 365)
+    Animal.objects.bulk_create([
+        Animal(
+            name=f'Kiwi {number}', age=age, age_group=determine_age_group(age), sex='F', description='Friendly.',
+            species=cat, breed=breed, color=color, staff=staff, arrival_date=now,
+            date_adopted=now if number % 10 == 9 else None,
+        )
+        for number in range(rows)
+    ])
+    animals = list(Animal.objects.filter(date_adopted=None).order_by('pk'))
+    featured = animals[0]
+
+    Application.objects.bulk_create([
+        Application(
+            date_submitted=now, text='We have a big yard.', animal=featured, user=user,
+            approved=False if number % 2 else None, staff=staff if number % 2 else None, reason='Too far away.' if number % 2 else None,
+        )
+        for number, user in enumerate(applicants)
+    ] + [
+        Application(date_submitted=now, text='We have a big yard.', animal=animal, user=volunteer)
+        for animal in animals
+    ])
+    application = Application.objects.filter(animal=featured, approved=None).order_by('pk').first()
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    Activity.objects.bulk_create([
+        Activity(
+            activity=f'Dog walking {number}', description='Walk the dogs.', date=tomorrow + datetime.timedelta(days=number),
+            start_time=datetime.time(9), end_time=datetime.time(11), staff=staff, max_attendance=rows + 1,
+            activity_type='dogs', signup_count=rows + 1 if number == 0 else 1,
+        )
+        for number in range(rows)
+    ])
+    activities = list(Activity.objects.order_by('pk'))
+    ActivityVolunteer.objects.bulk_create(
+        [ActivityVolunteer(activity=activities[0], volunteer=user) for user in applicants]
+        + [ActivityVolunteer(activity=activity, volunteer=volunteer) for activity in activities]
+    )
+
+    # bulk_create sends no post_save signals, so index the animals and drop the pending application count here
+    index_animals_after(0)
+    invalidate_pending_app_count()
+
+    return {
+        'volunteer': volunteer,
+        'staff': staff,
+        'animal_id': featured.pk,
+        'application_id': application.pk,
+        'activity_id': activities[0].pk,
+    }
+
+
+def _reset_caches():
+    # every request is measured cold: no cached result pages, facet counts, or lookup tables
+    for cache in caches.all():
+        cache.clear()
+    for lookup_table in (species_lookup, breed_lookup, color_lookup):
+        lookup_table.invalidate()
+
+
+def measure_route(client, url):
+    """
+        This function requests a URL with empty caches and rolls back whatever the request changed, so every route sees the same data.
+
+        args: client (django.test.Client), url
+
+        returns: tuple (status code, list of the SQL sent)
+    """
+
+    _reset_caches()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        transaction.set_rollback(True)
+
+    return response.status_code, [query['sql'] for query in queries]
+
+
+def measure_query_counts(rows):
+    """
+        This function seeds `rows` rows (see seed_query_dataset), requests every named route as each role in QUERY_COUNT_ROLES, and rolls the seeded rows back.
+
+        args: rows
+
+        returns: dict of route name -> role -> {'status': status code, 'queries': number of queries}, and a matching dict of the queries sent
+    """
+
+    counts = collections.defaultdict(dict)
+    sent = collections.defaultdict(dict)
+
+    # without budgets, so QueryBudgetExceeded (or a warning per request) doesn't interrupt the measurement at the first view over its QUERY_BUDGETS entry
+    with override_settings(QUERY_BUDGETS=dict()), transaction.atomic():
+        dataset = seed_query_dataset(rows)
+
+        for role in QUERY_COUNT_ROLES:
+            for route_name in route_names():
+                client = Client()
+                if role != 'anonymous':
+                    client.force_login(dataset[role])
+
+                status, queries = measure_route(client, route_url(route_name, dataset))
+                counts[route_name][role] = {'status': status, 'queries': len(queries)}
+                sent[route_name][role] = queries
+
+        transaction.set_rollback(True)
+
+    _reset_caches()
+    return dict(counts), dict(sent)
+
+
+def compare_query_counts(expected, actual, sent=None):
+    """
+        This function lists the routes whose status code or number of queries differs between two measurements.
+
+        args: expected, actual (measure_query_counts or the baseline file), sent (optional queries behind `actual`, whose repeated signatures are listed to point at an N+1)
+
+        returns: list of messages, empty if the measurements match
+    """
+
+    differences = list()
+
+    for route_name in sorted(set(expected) | set(actual)):
+        for role in QUERY_COUNT_ROLES:
+            before = expected.get(route_name, dict()).get(role)
+            after = actual.get(route_name, dict()).get(role)
+            if before == after:
+                continue
+
+            differences.append(f'{route_name} as {role}: {before} -> {after}')
+            if sent and after is not None:
+                repeated = collections.Counter(query_signature(sql) for sql in sent[route_name][role])
+                differences.extend(f'    {count} x {signature[:200]}' for signature, count in repeated.most_common() if count > 1)
+
+    return differences
+
+
+def load_query_baseline(path=QUERY_BASELINE_PATH):
+    """
+        returns: the checked-in query counts (see measure_query_counts)
+    """
+
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def write_query_baseline(counts, path=QUERY_BASELINE_PATH):
+    """
+        This function writes query counts as the new baseline, one route per block and sorted so that changes diff cleanly.
+    """
+
+    with open(path, 'w') as baseline_file:
+        json.dump(counts, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
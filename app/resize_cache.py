@@ -0,0 +1,178 @@
+# tools
+from django.conf import settings
+import hashlib
+import os
+import tempfile
+import threading
+
+
+class ResizeCache:
+    """
+        Keeps resized images on disk (one file per key) within a byte budget. Reading an entry refreshes its modification time, and once the budget is exceeded the entries used least recently are deleted first.
+
+        Concurrent requests for the same missing key are coalesced: the first one renders the image while the others wait on a per-key lock and then read its result, so each size is only rendered once per process.
+
+        Methods:
+            path_for
+            get
+            put
+            get_or_create
+            evict
+            clear
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        # None defers to settings, read on use so tests can override them
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._key_locks = dict()
+        self._key_locks_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # running estimate of the bytes on disk (None until the directory is first scanned)
+        self._size = None
+
+    @property
+    def directory(self):
+        return self._directory or getattr(settings, 'RESIZE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'critter_resize_cache'))
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes if self._max_bytes is not None else getattr(settings, 'RESIZE_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+    def path_for(self, key):
+        """
+            args: key (string, e.g. '320x0/media/3f/a2/3fa2...e9.jpg@<mtime>')
+
+            returns: absolute path of the key's cache file (sharded by the key's hash)
+        """
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.jpg')
+
+    def get(self, key):
+        """
+            returns: path of the cached file (marked as just used), or None on a miss
+        """
+
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, content):
+        """
+            This method writes an entry atomically (a reader never sees half a file) and evicts old entries if the budget is exceeded.
+
+            returns: path of the cached file
+        """
+
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as temporary_file:
+            temporary_file.write(content)
+        os.replace(temporary_path, path)
+
+        with self._evict_lock:
+            if self._size is not None:
+                self._size += len(content)
+        if self._size is None or self._size > self.max_bytes:
+            self.evict(keep=path)
+
+        return path
+
+    def get_or_create(self, key, render):
+        """
+            This method returns the cached file for a key, calling render() to produce its bytes on a miss. Only one caller per key renders at a time; the rest wait and reuse its result.
+
+            args: key, render (callable returning bytes)
+
+            returns: path of the cached file
+        """
+
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        with self._key_locks_lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                # another request may have rendered it while this one waited
+                path = self.get(key)
+                if path is None:
+                    path = self.put(key, render())
+            finally:
+                with self._key_locks_lock:
+                    self._key_locks.pop(key, None)
+
+        return path
+
+    def _entries(self):
+        """
+            This helper method lists every cache file as (modification time, size, path) without loading the directory into memory at once.
+        """
+
+        if not os.path.isdir(self.directory):
+            return
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.jpg'):
+                            try:
+                                entry_stat = entry.stat()
+                            except FileNotFoundError:
+                                continue
+                            yield entry_stat.st_mtime, entry_stat.st_size, entry.path
+
+    def evict(self, keep=None):
+        """
+            This method deletes the least recently used entries until the cache fits its budget (other processes may share the directory, so it is rescanned first).
+
+            args: keep (path of an entry that is about to be served and must survive)
+
+            returns: number of entries deleted
+        """
+
+        with self._evict_lock:
+            entries = sorted(self._entries())
+            size = sum(entry_size for _, entry_size, _ in entries)
+            deleted = 0
+
+            for _, entry_size, path in entries:
+                if size <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                deleted += 1
+
+            self._size = size
+            return deleted
+
+    def clear(self):
+        """
+            This method deletes every entry.
+        """
+
+        with self._evict_lock:
+            for _, _, path in list(self._entries()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+
+resize_cache = ResizeCache()
@@ -0,0 +1,18 @@
+# testing
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+        The test runner for `python manage.py test` (TEST_RUNNER in settings). It sets QUERY_BUDGET_ACTION to 'raise' while the tests run, so a view that goes over its query budget fails the test that triggered it instead of only logging a warning. conftest.py does the same under pytest.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_settings = override_settings(QUERY_BUDGET_ACTION='raise')
+        self.query_budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,215 @@
+# database
+from django.db import connections, DEFAULT_DB_ALIAS, OperationalError
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+# models
+from .models import Animal, Breed, Color
+# tools
+import re
+
+# SQLite FTS5 shadow table holding one row per UNADOPTED animal (rowid = Animal.id). Adopted animals are removed from the index, so search cost follows the number of available animals rather than every animal ever admitted.
+SEARCH_TABLE = 'app_animal_search'
+
+# bm25 column weights, in the same order as the table columns: name, description, breed, color
+SEARCH_WEIGHTS = (10.0, 1.0, 3.0, 2.0)
+
+# per-database cache of whether the FTS5 table can be used ({alias: bool})
+_index_available = dict()
+
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS):
+    """
+        This function creates the FTS5 search table if it doesn't exist yet. It is called after migrations run (see signals.py). Databases other than SQLite (or SQLite builds without FTS5) are left alone and searches fall back to a regular name lookup.
+
+        args: using (database alias)
+
+        returns: True if the search table is available, else False
+    """
+
+    connection = connections[using]
+
+    if connection.vendor != 'sqlite':
+        _index_available[using] = False
+        return False
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "name, description, breed, color, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        _index_available[using] = True
+    except OperationalError:
+        _index_available[using] = False
+
+    return _index_available[using]
+
+
+def search_index_available(using=DEFAULT_DB_ALIAS):
+    """
+        This function reports whether the FTS5 search table exists. The answer is looked up once per process and database.
+
+        args: using (database alias)
+
+        returns: bool
+    """
+
+    if using not in _index_available:
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            _index_available[using] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+                _index_available[using] = cursor.fetchone() is not None
+
+    return _index_available[using]
+
+
+def _reindex(where='', params=None, using=DEFAULT_DB_ALIAS):
+    """
+        This helper function removes and re-inserts index rows for every animal matching an optional SQL condition on the animal table (aliased as 'a'). Breed and color names are joined in the same statement so no rows are loaded into Python.
+    """
+
+    animal_table = Animal._meta.db_table
+    breed_table = Breed._meta.db_table
+    color_table = Color._meta.db_table
+    params = list(params or [])
+    condition = f'AND {where}' if where else ''
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT a.id FROM {animal_table} a WHERE 1 = 1 {condition})",
+            params
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, breed, color) "
+            f"SELECT a.id, a.name, a.description, b.breed, c.color FROM {animal_table} a "
+            f"INNER JOIN {breed_table} b ON b.id = a.breed_id "
+            f"INNER JOIN {color_table} c ON c.id = a.color_id "
+            f"WHERE a.date_adopted IS NULL {condition}",
+            params
+        )
+
+
+def index_animal(animal, using=DEFAULT_DB_ALIAS):
+    """
+        This function adds (or refreshes) a single animal in the search index. Adopted animals are removed from the index instead.
+
+        args: animal (instance)
+    """
+
+    if not search_index_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [animal.pk])
+        if animal.date_adopted is None:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, breed, color) VALUES (%s, %s, %s, %s, %s)",
+                [animal.pk, animal.name, animal.description, str(animal.breed), str(animal.color)]
+            )
+
+
+def index_animals_after(animal_id, using=DEFAULT_DB_ALIAS):
+    """
+        This function indexes every animal with a pk above animal_id in one statement. bulk_create sends no post_save signals, so bulk imports index their rows with this afterwards.
+
+        args: animal_id (highest pk before the import, or 0)
+    """
+
+    if not search_index_available(using):
+        return
+
+    _reindex('a.id > %s', [animal_id], using=using)
+
+
+def unindex_animal(animal_id, using=DEFAULT_DB_ALIAS):
+    """
+        This function removes a single animal from the search index.
+
+        args: animal_id
+    """
+
+    if not search_index_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [animal_id])
+
+
+def reindex_related(field_name, related_id, using=DEFAULT_DB_ALIAS):
+    """
+        This function refreshes the index rows for every animal pointing at a renamed breed or color.
+
+        args: field_name ('breed' or 'color'), related_id
+    """
+
+    if not search_index_available(using):
+        return
+
+    _reindex(f'a.{field_name}_id = %s', [related_id], using=using)
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """
+        This function empties the search index and repopulates it from the animal table (used after loaddata or a bulk import).
+
+        returns: number of animals in the index
+    """
+
+    if not ensure_search_index(using):
+        return 0
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    _reindex(using=using)
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match_expression(search_text):
+    """
+        This function converts free text typed into the search box into an FTS5 MATCH expression. Every word becomes a quoted prefix term (so 'kiw' finds 'Kiwi') and all words must match.
+
+        args: search_text
+
+        returns: MATCH expression (string), or None if the text contains no searchable words
+    """
+
+    words = re.findall(r'\w+', search_text or '')
+
+    if len(words) == 0:
+        return None
+
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_animals(queryset, search_text, using=DEFAULT_DB_ALIAS):
+    """
+        This function narrows an Animal queryset to the unadopted animals matching the search text and annotates each with its 'search_rank' (bm25, lower is a better match). Matches in the name count the most, followed by breed, color, and description. The search table is joined in the same statement, so the database filters, orders, and paginates every match without a list of ids passing through Python. bm25 only works in the statement that runs the MATCH, so count matches with a grouped values() query rather than .count(), which wraps the statement in a subquery.
+
+        args: queryset (Animal), search_text, using (database alias)
+
+        returns: queryset, or None if the search index is unavailable (callers fall back to a name lookup)
+    """
+
+    if not search_index_available(using):
+        return None
+
+    match = build_match_expression(search_text)
+
+    if match is None:
+        return queryset.none()
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+
+    # the unary + keeps SQLite from looking index rows up by rowid, so the MATCH always drives the join (bm25 fails otherwise)
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[f'+{SEARCH_TABLE}.rowid = {Animal._meta.db_table}.id', f'{SEARCH_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(search_rank=RawSQL(f'bm25({SEARCH_TABLE}, {weights})', (), output_field=FloatField()))
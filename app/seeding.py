@@ -0,0 +1,268 @@
+# models
+from .models import Activity, ActivityVolunteer, Animal, Application, CustomUser, Volunteer, ACTIVITY_CHOICES, STATE_CHOICES, determine_age_group
+# lookup tables and search index
+from .intake import resolve_names
+from .search import index_animals_after
+# tools
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils import timezone
+from .utils import bump_catalog_version, invalidate_pending_app_count
+import datetime
+import itertools
+import random
+
+# objects built and inserted per bulk_create, so a run of any size holds one chunk in memory
+SEED_CHUNK_SIZE = 5000
+
+# one staff member per this many users (at least one)
+USERS_PER_STAFF = 200
+
+# share of the generated animals that have already been adopted
+ADOPTED_SHARE = 0.6
+
+# share of the generated activities that were cancelled
+CANCELLED_SHARE = 0.05
+
+# (species, weight, breeds) - mostly cats and dogs, like the fixtures
+SPECIES = (
+    ('cat', 45, ('domestic shorthair', 'domestic longhair', 'siamese', 'bengal', 'ragdoll', 'russian blue', 'himalayan', 'abyssinian', 'sphynx', 'bobtail', 'munchkin', 'mix')),
+    ('dog', 45, ('lab', 'golden', 'terrier', 'dachshund', 'basset hound', 'boston terrier', 'cocker spaniel', 'airedale', 'labradoodle', 'schnoodle', 'mini-schnauzer', 'mutt')),
+    ('rabbit', 4, ('n/a', 'unknown', 'mix')),
+    ('guinea pig', 2, ('n/a', 'unknown')),
+    ('bird', 2, ('n/a', 'unknown', 'other')),
+    ('lizard', 1, ('n/a', 'unknown')),
+    ('pig', 1, ('micro', 'n/a')),
+)
+COLORS = ('black', 'white', 'black/white', 'brown', 'calico', 'chocolate', 'gold', 'gray', 'gray/white', 'orange', 'red', 'tabby', 'torti', 'mix', 'multi')
+
+FIRST_NAMES = ('Ava', 'Ben', 'Chloe', 'Dave', 'Ella', 'Finn', 'Grace', 'Henry', 'Isla', 'Jack', 'Kate', 'Liam', 'Maya', 'Noah', 'Olivia', 'Parker', 'Quinn', 'Ruby', 'Sam', 'Tess', 'Uma', 'Vince', 'Will', 'Zoe')
+LAST_NAMES = ('Adams', 'Brooks', 'Carter', 'Diaz', 'Evans', 'Foster', 'Garcia', 'Hughes', 'Jones', 'Kim', 'Lopez', 'McCray', 'Nguyen', 'Owens', 'Patel', 'Reed', 'Smith', 'Turner', 'Walker', 'Young')
+STREETS = ('Main St', 'Broadway', '8th Ave S', 'Church St', 'West End Ave', 'Charlotte Pike', 'Gallatin Pike', 'Nolensville Pike', 'Belmont Blvd', 'Music Row')
+CITIES = ('Nashville', 'Franklin', 'Brentwood', 'Murfreesboro', 'Hendersonville', 'Clarksville')
+ANIMAL_NAMES = ('Kiwi', 'Biscuit', 'Luna', 'Milo', 'Pepper', 'Daisy', 'Oliver', 'Bella', 'Charlie', 'Cleo', 'Rex', 'Mochi', 'Ziggy', 'Hazel', 'Toast', 'Olive', 'Bear', 'Nala', 'Gus', 'Pickles', 'Sadie', 'Winston', 'Juniper', 'Waffles')
+TEMPERAMENTS = ('sweet', 'shy', 'playful', 'curious', 'laid-back', 'energetic', 'gentle', 'talkative', 'independent', 'cuddly')
+HABITS = ('loves people', 'follows you from room to room', 'likes to nap in the sun', 'gets along with other animals', 'enjoys long walks', 'will sleep on your lap', 'needs a quiet home', 'knows a few tricks')
+APPLICATION_TEXTS = (
+    "I'd love to adopt this {species}. We have a fenced yard and plenty of space.",
+    "We lost our last {species} this year and are ready to give another one a home.",
+    "I work from home, so this {species} would have company all day.",
+    "Our kids have wanted a {species} for years and we finally have the room.",
+)
+REJECTION_REASONS = ('Landlord does not allow pets.', 'Another applicant was a better fit.', 'Could not reach the applicant.', 'Home visit did not work out.')
+ACTIVITY_NAMES = {
+    'cats': ('Cat socializing', 'Litter box duty', 'Kitten feeding'),
+    'dogs': ('Dog walking', 'Kennel cleaning', 'Leash training'),
+    'other': ('Small animal care', 'Bird room cleanup'),
+    'multi': ('Adoption event', 'Bath day'),
+    'general': ('Laundry and dishes', 'Donation drive', 'Grand opening setup'),
+}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _insert(model, objects, chunk_size, using):
+    """
+        This helper function inserts a stream of unsaved instances chunk_size at a time.
+
+        returns: pk of the last row before the insert (the new rows come after it) and the number of rows inserted
+    """
+
+    last_pk = model.objects.using(using).aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    inserted = 0
+    for chunk in _chunks(objects, chunk_size):
+        model.objects.using(using).bulk_create(chunk)
+        inserted += len(chunk)
+
+    return last_pk, inserted
+
+
+def seed_email_domain(seed):
+    """
+        returns: the email domain of the users generated from a seed, so a run can be recognized (and isn't repeated)
+    """
+
+    return f'seed{seed}.example.com'
+
+
+def _random_moment(rng, start, end):
+    return start + datetime.timedelta(seconds=rng.uniform(0, (end - start).total_seconds()))
+
+
+def seed_scale(users=1000, animals=1000, applications=10000, activities=100, seed=0, password='password', chunk_size=SEED_CHUNK_SIZE, today=None, using=DEFAULT_DB_ALIAS, progress=None):
+    """
+        This function fills the database with realistic synthetic data at a chosen scale: users (a few of them staff) with their volunteer contact details, animals (ADOPTED_SHARE of them already adopted, each adoption with its approved application), adoption applications (pending, approved, and rejected, with popular animals drawing more of them), and volunteering activities over the past year and the next three months with their signups.
+
+        The same seed and day always produce the same rows. Everything is inserted with chunked bulk_create, and every user gets the same precomputed password hash, so no time is spent hashing per user. Species, breeds, and colors are matched to the existing lookup rows by name and created when missing.
+
+        args: users, animals, applications, activities, seed, password (shared by every generated user), chunk_size, today (dates are generated relative to it; defaults to the current date), progress (optional callable given a line of text after each table)
+
+        returns: dict of model name -> number of rows created
+    """
+
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    now = timezone.make_aware(datetime.datetime.combine(today, datetime.time(12)))
+    domain = seed_email_domain(seed)
+    created = dict()
+
+    def report(model, count):
+        created[model.__name__] = count
+        if progress is not None:
+            progress(f'{model.__name__}: {count} rows')
+
+    # users: one hash for everyone, since hashing 10k passwords would take minutes
+    password_hash = make_password(password)
+    staff_count = max(1, users // USERS_PER_STAFF) if users else 0
+
+    def generate_users():
+        for number in range(users):
+            is_staff = number < staff_count
+            yield CustomUser(
+                email=f'{"staff" if is_staff else "volunteer"}{number}@{domain}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password_hash,
+                is_staff=is_staff,
+                date_joined=_random_moment(rng, now - datetime.timedelta(days=730), now),
+            )
+
+    last_pk, count = _insert(CustomUser, generate_users(), chunk_size, using)
+    report(CustomUser, count)
+    user_rows = list(CustomUser.objects.using(using).filter(pk__gt=last_pk, email__endswith=f'@{domain}').order_by('pk').values_list('pk', 'is_staff'))
+    staff_pks = [pk for pk, is_staff in user_rows if is_staff]
+    volunteer_pks = [pk for pk, is_staff in user_rows if not is_staff] or staff_pks
+
+    def generate_volunteers():
+        for pk, _ in user_rows:
+            yield Volunteer(
+                user_id=pk,
+                street_address=f'{rng.randint(100, 9999)} {rng.choice(STREETS)}',
+                city=rng.choice(CITIES),
+                state='TN' if rng.random() < 0.8 else rng.choice(STATE_CHOICES)[0],
+                zipcode=f'37{rng.randint(0, 999):03d}',
+                phone_number=int(f'615{rng.randint(0, 9999999):07d}'),
+            )
+
+    _, count = _insert(Volunteer, generate_volunteers(), chunk_size, using)
+    report(Volunteer, count)
+
+    # animals
+    species_pks, _ = resolve_names('species', {name for name, _, _ in SPECIES}, using)
+    breed_pks, _ = resolve_names('breed', {breed for _, _, breeds in SPECIES for breed in breeds}, using)
+    color_pks, _ = resolve_names('color', set(COLORS), using)
+    species_weights = [weight for _, weight, _ in SPECIES]
+
+    def generate_animals():
+        for _ in range(animals):
+            species, _, breeds = rng.choices(SPECIES, weights=species_weights)[0]
+            # mostly young animals, a long tail of seniors
+            age = today - datetime.timedelta(days=int(rng.expovariate(1 / 1100)) + 60)
+            arrival_date = _random_moment(rng, now - datetime.timedelta(days=730), now)
+            date_adopted = None
+            if rng.random() < ADOPTED_SHARE:
+                date_adopted = min(arrival_date + datetime.timedelta(days=rng.randint(3, 120), hours=rng.randint(0, 8)), now)
+            name = rng.choice(ANIMAL_NAMES)
+            yield Animal(
+                name=name,
+                age=age,
+                # bulk_create skips Animal.save, which sets age_group
+                age_group=determine_age_group(age, today),
+                species_id=species_pks[species],
+                breed_id=breed_pks[rng.choice(breeds)],
+                color_id=color_pks[rng.choice(COLORS)],
+                sex=rng.choice('MF'),
+                description=f'{name} is a {rng.choice(TEMPERAMENTS)} {species} that {rng.choice(HABITS)} and {rng.choice(HABITS)}.',
+                arrival_date=arrival_date,
+                date_adopted=date_adopted,
+                staff_id=rng.choice(staff_pks) if staff_pks else None,
+            )
+
+    last_animal_pk, count = _insert(Animal, generate_animals(), chunk_size, using)
+    report(Animal, count)
+    # bulk_create sends no post_save signals, so index the new animals here
+    index_animals_after(last_animal_pk, using)
+
+    animal_rows = list(Animal.objects.using(using).filter(pk__gt=last_animal_pk).order_by('pk').values_list('pk', 'arrival_date', 'date_adopted', 'species__species'))
+
+    # applications: a few animals draw most of them
+    if animal_rows and volunteer_pks:
+        popularity = list(itertools.accumulate(rng.paretovariate(1.5) for _ in animal_rows))
+        approved_animals = set()
+
+        def generate_applications():
+            for chosen in _chunks(range(applications), chunk_size):
+                for animal_pk, arrival_date, date_adopted, species in rng.choices(animal_rows, cum_weights=popularity, k=len(chosen)):
+                    application = Application(
+                        text=rng.choice(APPLICATION_TEXTS).format(species=species),
+                        animal_id=animal_pk,
+                        user_id=rng.choice(volunteer_pks),
+                    )
+                    if date_adopted is None:
+                        application.date_submitted = _random_moment(rng, arrival_date, now)
+                        if rng.random() < 0.2:
+                            application.approved, application.reason, application.staff_id = False, rng.choice(REJECTION_REASONS), rng.choice(staff_pks)
+                    else:
+                        application.date_submitted = _random_moment(rng, arrival_date, date_adopted)
+                        # the first application for an adopted animal is the one that was approved, the others were turned down
+                        if animal_pk not in approved_animals:
+                            approved_animals.add(animal_pk)
+                            application.approved, application.staff_id = True, rng.choice(staff_pks)
+                        else:
+                            application.approved, application.reason, application.staff_id = False, 'Another applicant was a better fit.', rng.choice(staff_pks)
+                    yield application
+
+        _, count = _insert(Application, generate_applications(), chunk_size, using)
+        report(Application, count)
+    else:
+        report(Application, 0)
+
+    # volunteering activities and their signups (signup_count is stored with each activity)
+    activity_types = [activity_type for activity_type, _ in ACTIVITY_CHOICES]
+    signup_counts = list()
+
+    def generate_activities():
+        for _ in range(activities):
+            activity_type = rng.choice(activity_types)
+            max_attendance = rng.randint(5, 30)
+            signups = min(rng.randint(0, max_attendance), len(volunteer_pks))
+            signup_counts.append(signups)
+            start_hour = rng.randint(8, 16)
+            yield Activity(
+                activity=rng.choice(ACTIVITY_NAMES[activity_type]),
+                description=f'We need volunteers for {activity_type} work at the shelter. No experience required!',
+                date=today + datetime.timedelta(days=rng.randint(-365, 90)),
+                start_time=datetime.time(start_hour),
+                end_time=datetime.time(start_hour + rng.randint(1, 4)),
+                staff_id=rng.choice(staff_pks) if staff_pks else None,
+                max_attendance=max_attendance,
+                activity_type=activity_type,
+                cancelled=True if rng.random() < CANCELLED_SHARE else None,
+                signup_count=signups,
+            )
+
+    last_pk, count = _insert(Activity, generate_activities(), chunk_size, using)
+    report(Activity, count)
+    activity_pks = Activity.objects.using(using).filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)
+
+    def generate_signups():
+        for activity_pk, signups in zip(activity_pks, signup_counts):
+            for volunteer_pk in rng.sample(volunteer_pks, signups):
+                yield ActivityVolunteer(activity_id=activity_pk, volunteer_id=volunteer_pk)
+
+    _, count = _insert(ActivityVolunteer, generate_signups(), chunk_size, using)
+    report(ActivityVolunteer, count)
+
+    # bulk_create skips the save signals, so drop cached result pages and the pending application count here
+    bump_catalog_version(using)
+    invalidate_pending_app_count(using)
+
+    return created
@@ -0,0 +1,112 @@
+# signals
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+# models
+from .models import Animal, Application, Breed, Color, Species
+# lookup tables and search index
+from .lookups import breed_lookup, color_lookup, species_lookup
+from .search import ensure_search_index, index_animal, reindex_related, unindex_animal
+# database tuning
+from .sqlite import apply_sqlite_pragmas
+# tools
+from .utils import adjust_pending_app_count, bump_catalog_version, ensure_available_name_index, invalidate_pending_app_count
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Applies settings.SQLITE_PRAGMAS (WAL, busy timeout, ...) to every new SQLite connection"""
+
+    apply_sqlite_pragmas(connection)
+
+
+@receiver(post_migrate)
+def create_database_extras(sender, using, **kwargs):
+    """Creates the animal search table and pagination index once the app's tables exist"""
+
+    if sender.name == 'app':
+        ensure_search_index(using)
+        ensure_available_name_index(using)
+
+
+@receiver(post_save, sender=Animal)
+def update_search_index(sender, instance, raw, using, **kwargs):
+    """Keeps the search index in step with a saved animal. Fixture loads (raw) are skipped; run rebuild_search_index afterwards."""
+
+    if not raw:
+        index_animal(instance, using)
+
+
+@receiver(post_delete, sender=Animal)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    """Removes a deleted animal from the search index"""
+
+    unindex_animal(instance.pk, using)
+
+
+@receiver(post_save, sender=Breed)
+@receiver(post_save, sender=Color)
+def refresh_search_index_names(sender, instance, created, raw, using, **kwargs):
+    """Re-indexes animals whose breed or color name changed"""
+
+    if not created and not raw:
+        reindex_related('breed' if sender is Breed else 'color', instance.pk, using)
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+@receiver(post_save, sender=Breed)
+@receiver(post_save, sender=Color)
+def invalidate_catalog_cache(sender, using, **kwargs):
+    """Invalidates cached search results and facet counts once the catalog changes (breed and color names appear on the cards too)"""
+
+    bump_catalog_version(using)
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def invalidate_lookup_tables(sender, using, **kwargs):
+    """Tells every process to reload a changed lookup table, again after commit so no process keeps rows it loaded mid-transaction"""
+
+    lookup_table = {Species: species_lookup, Breed: breed_lookup, Color: color_lookup}[sender]
+    lookup_table.invalidate()
+
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lookup_table.invalidate, using=using)
+
+
+@receiver(post_init, sender=Application)
+def remember_application_status(sender, instance, **kwargs):
+    """Records whether an application was pending when it was loaded, so a later save knows whether the pending count changed"""
+
+    instance._was_pending = instance.pk is not None and instance.approved is None
+
+
+@receiver(post_save, sender=Application)
+def update_pending_app_count(sender, instance, created, raw, using, **kwargs):
+    """Keeps the cached pending application count current after an application is submitted or decided"""
+
+    is_pending = instance.approved is None
+    was_pending = getattr(instance, '_was_pending', False) and not created
+
+    if raw:
+        invalidate_pending_app_count(using)
+    elif is_pending != was_pending:
+        adjust_pending_app_count(1 if is_pending else -1, using)
+
+    instance._was_pending = is_pending
+
+
+@receiver(post_delete, sender=Application)
+def remove_from_pending_app_count(sender, instance, using, **kwargs):
+    """Removes a deleted pending application from the cached count"""
+
+    if getattr(instance, '_was_pending', False):
+        adjust_pending_app_count(-1, using)
@@ -0,0 +1,63 @@
+# tools
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+import re
+
+# pragma names and values are written into the statement, so only plain words and numbers are accepted
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+# checkpoint modes accepted by PRAGMA wal_checkpoint
+CHECKPOINT_MODES = ('passive', 'full', 'restart', 'truncate')
+
+
+def sqlite_pragmas():
+    """
+        returns: list of (name, value) from settings.SQLITE_PRAGMAS, busy_timeout first so the rest wait for a lock instead of failing; raises ImproperlyConfigured for a name or value that isn't a plain word or number
+    """
+
+    pragmas = sorted(getattr(settings, 'SQLITE_PRAGMAS', dict()).items(), key=lambda pragma: pragma[0] != 'busy_timeout')
+
+    for name, value in pragmas:
+        if not PRAGMA_NAME.match(str(name)) or not PRAGMA_VALUE.match(str(value)):
+            raise ImproperlyConfigured(f'SQLITE_PRAGMAS has an invalid entry: {name!r}: {value!r}')
+
+    return pragmas
+
+
+def apply_sqlite_pragmas(connection):
+    """
+        This function applies settings.SQLITE_PRAGMAS to a new SQLite connection. The statements go straight to the DB-API connection, so they aren't counted as the request's queries. journal_mode is stored in the database file, so it's only changed (which needs a moment of exclusive access) when the file isn't in that mode yet.
+
+        args: connection (Django database wrapper)
+    """
+
+    if connection.vendor != 'sqlite':
+        return
+
+    database = connection.connection
+    for name, value in sqlite_pragmas():
+        if name == 'journal_mode' and database.execute('PRAGMA journal_mode').fetchone()[0].lower() in (str(value).lower(), 'memory'):
+            continue
+        database.execute(f'PRAGMA {name} = {value}')
+
+
+def checkpoint_and_optimize(connection, mode='truncate', optimize=True):
+    """
+        This function copies the write-ahead log back into the database file (and, with mode 'truncate', empties it), then lets SQLite refresh the statistics its query planner uses where they are out of date. Run it on a schedule, e.g. nightly, and after bulk imports.
+
+        args: connection (Django database wrapper), mode (one of CHECKPOINT_MODES), optimize
+
+        returns: tuple (busy, pages in the log, pages checkpointed); the page counts are -1 when the database isn't in WAL mode
+    """
+
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'mode must be one of {", ".join(CHECKPOINT_MODES)}')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode.upper()})')
+        result = tuple(cursor.fetchone())
+        if optimize:
+            cursor.execute('PRAGMA optimize')
+
+    return result
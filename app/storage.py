@@ -0,0 +1,142 @@
+# storage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+# derived image sizes
+from .images import DERIVATIVE_DIRECTORY
+# tools
+from PIL import Image
+import hashlib
+import os
+import posixpath
+import re
+
+# matches the names ContentAddressedStorage gives uploads, e.g. media/3f/a2/3fa2...e9.jpg
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}\.\w+$')
+
+# extension given to each image format Pillow detects; other formats use the first extension Pillow registers for them
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'GIF': '.gif',
+    'WEBP': '.webp',
+    'TIFF': '.tif',
+}
+
+# derived images are named after the content hash of their upload (see images.derivative_name), so they are content-addressed too
+DERIVED_NAME = re.compile(r'^' + re.escape(DERIVATIVE_DIRECTORY) + r'/[0-9a-f]{64}_\w+\.jpg$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+        Stores every upload under the SHA-256 hash of its content, sharded into two levels of directories (media/3f/a2/3fa2...e9.jpg). The extension comes from the image format Pillow detects rather than the client's file name, so the same photo uploaded as .jpg and .jpeg is stored once. A file's name (and URL) changes whenever its content does, so it can be cached forever.
+
+        Nothing here deletes uploads: a file another upload is about to reuse could vanish under it. sweep_orphaned_media deletes files that no animal has referred to for its grace period instead.
+
+        Files under DERIVATIVE_DIRECTORY keep the exact name they are saved with: their names already derive from the hash of the upload they were made from.
+
+        Methods:
+            content_extension
+            content_name
+            save
+            is_immutable
+    """
+
+    # bytes read at a time while hashing
+    chunk_size = 64 * 1024
+
+    def content_extension(self, name, content):
+        """
+            args: name (requested name), content (File)
+
+            returns: extension for the detected image format (e.g. '.jpg'), or the requested name's lowercased extension when the content isn't an image Pillow recognises
+        """
+
+        # only the header is read; the file belongs to the caller, so it is left open
+        try:
+            image_format = Image.open(content).format
+        except (OSError, SyntaxError, ValueError):
+            image_format = None
+        finally:
+            content.seek(0)
+
+        if image_format in FORMAT_EXTENSIONS:
+            return FORMAT_EXTENSIONS[image_format]
+        extensions = [extension for extension, registered_format in Image.registered_extensions().items() if registered_format == image_format]
+        if extensions:
+            return extensions[0]
+        return posixpath.splitext(name)[1].lower()
+
+    def content_name(self, name, content):
+        """
+            args: name (requested name, e.g. 'media/kiwi.JPG'), content (File, hashed here unless it carries a precomputed sha256)
+
+            returns: content-addressed name in the same directory, with the extension of the detected format (e.g. 'media/3f/a2/3fa2...e9.jpg')
+        """
+
+        # HashingFileUploadHandler hashes uploads while they stream in
+        hexdigest = getattr(content, 'sha256', None)
+        if hexdigest is None:
+            digest = hashlib.sha256()
+            for chunk in content.chunks(self.chunk_size):
+                digest.update(chunk)
+            content.seek(0)
+            hexdigest = digest.hexdigest()
+
+        directory = posixpath.dirname(name)
+        return posixpath.join(directory, hexdigest[:2], hexdigest[2:4], hexdigest + self.content_extension(name, content))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        if name.startswith(DERIVATIVE_DIRECTORY + '/'):
+            return super().save(name, content, max_length=max_length)
+
+        name = self.content_name(name, content)
+
+        # identical content is already stored under this name; touching it keeps sweep_orphaned_media's grace period from deleting it under the new reference
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+
+        return self._save(name, content)
+
+    def is_immutable(self, name):
+        """
+            args: name
+
+            returns: True if the file's content can never change under this name (safe to cache forever)
+        """
+
+        return bool(CONTENT_ADDRESSED_NAME.search(name) or DERIVED_NAME.match(name))
+
+
+def walk_files(storage, directory):
+    """
+        This function lists every file under a storage directory, however deep, one directory at a time (os.scandir), so a tree of hundreds of thousands of files is never held in memory.
+
+        args: storage (FileSystemStorage), directory (storage name, e.g. 'media')
+
+        returns: generator of (storage name, os.stat_result)
+    """
+
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = os.scandir(storage.path(current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = posixpath.join(current, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield name, entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    # deleted while the directory was being read
+                    continue
@@ -0,0 +1,52 @@
+# unittest
+from django.test import TransactionTestCase
+# tools
+import threading
+from django.db import connection
+
+
+class SequenceResetTestCase(TransactionTestCase):
+    """
+        A TransactionTestCase for tests that commit rows, e.g. from several threads. Flushing the tables afterwards leaves SQLite's AUTOINCREMENT counters where they were, and TestCases that run later look rows up by pk, so the counters are reset after every test.
+
+        Methods:
+            tearDown
+    """
+
+    def tearDown(self):
+        super(SequenceResetTestCase, self).tearDown()
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM sqlite_sequence')
+
+
+def run_concurrently(target, arguments):
+    """
+        This function calls target once per tuple of arguments, each call on its own thread, all released at the same moment. Each thread closes its database connection when it's done.
+
+        args: target (function), arguments (list of tuples)
+
+        returns: list of what target returned, in the order the calls finished
+    """
+
+    results = list()
+    results_lock = threading.Lock()
+    start = threading.Barrier(len(arguments))
+
+    def run(*call_arguments):
+        start.wait()
+        try:
+            result = target(*call_arguments)
+            with results_lock:
+                results.append(result)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=call_arguments) for call_arguments in arguments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
@@ -0,0 +1,90 @@
+# unittest
+import unittest
+from app.tests.base import SequenceResetTestCase, run_concurrently
+# models
+from app.models import Animal, Application, Breed, Color, CustomUser, Species
+# tools
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from app.utils import finalize_adoption, get_pending_app_count, ADOPTION_APPROVED, ANIMAL_ALREADY_ADOPTED, APPLICATION_MISSING, COMPETING_APPLICATION_REASON
+
+
+class AdoptionConcurrencyTests(SequenceResetTestCase):
+    """
+        Models:
+            Animal
+            Application
+            Breed
+            Color
+            CustomUser
+            Species
+        Methods:
+            setUp
+            test_concurrent_approvals_adopt_once
+            test_competing_applications_rejected_in_one_update
+            test_application_for_another_animal_is_refused
+    """
+
+    # competing applications for the animal, and the number of staff members approving at once
+    APPLICATIONS = 500
+    STAFF = 20
+
+    def setUp(self):
+        """Creates STAFF staff members and an unadopted animal with APPLICATIONS pending applications (bulk created)"""
+
+        CustomUser.objects.bulk_create([
+            CustomUser(first_name=f'staff{number}', last_name='Test_lastname', email=f'staff{number}@test.com', is_staff=True)
+            for number in range(self.STAFF)
+        ])
+        CustomUser.objects.bulk_create([
+            CustomUser(first_name=f'first{number}', last_name=f'last{number}', email=f'applicant{number}@test.com')
+            for number in range(self.APPLICATIONS)
+        ])
+        self.staff = list(CustomUser.objects.filter(is_staff=True))
+
+        self.animal = Animal.objects.create(name='test_animal_unadopted', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=Breed.objects.create(breed='domestic longhair'), color=Color.objects.create(color='black'), species=Species.objects.create(species='cat'), staff=self.staff[0], arrival_date=timezone.now())
+        Application.objects.bulk_create([
+            Application(text='I want to adopt this animal.', animal=self.animal, user=user, date_submitted=timezone.now())
+            for user in CustomUser.objects.filter(is_staff=False)
+        ])
+        self.applications = list(Application.objects.filter(animal=self.animal).order_by('pk').values_list('pk', flat=True))
+
+    def test_concurrent_approvals_adopt_once(self):
+        """
+            Have every staff member approve a different application at the same moment and confirm that exactly one approval wins and every other application is rejected.
+        """
+
+        def approve(staff_user, application_id):
+            return finalize_adoption(self.animal.id, application_id, staff_user)[0]
+
+        outcomes = run_concurrently(approve, list(zip(self.staff, self.applications)))
+
+        self.assertEqual(outcomes.count(ADOPTION_APPROVED), 1)
+        self.assertEqual(outcomes.count(ANIMAL_ALREADY_ADOPTED), self.STAFF - 1)
+        self.assertIsNotNone(Animal.objects.get(pk=self.animal.id).date_adopted)
+        self.assertEqual(Application.objects.filter(animal=self.animal, approved=True).count(), 1)
+        self.assertEqual(Application.objects.filter(animal=self.animal, approved=False).count(), self.APPLICATIONS - 1)
+        self.assertEqual(get_pending_app_count(), 0)
+
+    def test_competing_applications_rejected_in_one_update(self):
+        """
+            Confirm that approving one of many applications takes the same handful of queries and records the staff member and reason on every rejection.
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            outcome, rejected = finalize_adoption(self.animal.id, self.applications[0], self.staff[0])
+
+        self.assertEqual(outcome, ADOPTION_APPROVED)
+        self.assertEqual(rejected, self.APPLICATIONS - 1)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(Application.objects.filter(approved=False, staff=self.staff[0], reason=COMPETING_APPLICATION_REASON).count(), self.APPLICATIONS - 1)
+
+    def test_application_for_another_animal_is_refused(self):
+        """
+            Confirm that an application that doesn't belong to the animal leaves the animal unadopted.
+        """
+
+        self.assertEqual(finalize_adoption(self.animal.id, 0, self.staff[0]), (APPLICATION_MISSING, 0))
+        self.assertIsNone(Animal.objects.get(pk=self.animal.id).date_adopted)
+        self.assertEqual(Application.objects.filter(approved__isnull=True).count(), self.APPLICATIONS)
@@ -10,7 +10,10 @@ from app.forms import AnimalForm
 # tools
 import datetime
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import make_aware
+from app.utils import get_pending_app_count
 
 class AdminAdoptionsTest(TestCase):
     """
@@ -32,6 +35,8 @@ class AdminAdoptionsTest(TestCase):
             test_unauth_user_cannot_view_list_of_animals
             test_unadopted_vs_adopted_in_list
             test_pending_notification_in_list
+            test_list_of_animals_query_count_is_constant
+            test_list_of_animals_sorted_by_pending_count
             test_staff_user_can_view_specific_applications
             test_auth_user_cannot_view_specific_applications
             test_unauth_user_cannot_view_specific_applications
@@ -184,6 +189,48 @@ class AdminAdoptionsTest(TestCase):
         response = self.client.get(reverse('app:list_applications'))
         self.assertNotIn('1 pending</span>'.encode(), response.content)
 
+    def test_list_of_animals_query_count_is_constant(self):
+        """
+            Validate that the list of animals makes the same number of queries no matter how many animals and applications there are
+        """
+
+        self.client.login(email='test_admin@test.com', password='secret')
+
+        # warm the cached navbar count so only the view's own queries differ
+        get_pending_app_count()
+        with CaptureQueriesContext(connection) as queries_before:
+            self.client.get(reverse('app:list_applications'))
+
+        # add more unadopted animals, each with pending applications
+        animal = Animal.objects.get(pk=1)
+        auth_user = CustomUser.objects.get(email='test_auth@test.com')
+        for number in range(5):
+            new_animal = Animal.objects.create(name=f'test_animal_{number}', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=animal.breed, color=animal.color, species=animal.species, staff=animal.staff, arrival_date='2019-03-18')
+            for _ in range(2):
+                Application.objects.create(text='I want to adopt this animal.', animal=new_animal, user=auth_user, date_submitted=make_aware(datetime.datetime.now()))
+
+        get_pending_app_count()
+        with CaptureQueriesContext(connection) as queries_after:
+            response = self.client.get(reverse('app:list_applications'))
+
+        self.assertEqual(len(queries_before), len(queries_after))
+        self.assertEqual(response.content.count('2 pending</span>'.encode()), 5)
+
+    def test_list_of_animals_sorted_by_pending_count(self):
+        """
+            Validate that ?sort=pending lists the animal with the most pending applications first
+        """
+
+        self.client.login(email='test_admin@test.com', password='secret')
+
+        animal = Animal.objects.get(pk=1)
+        Animal.objects.create(name='a_animal_without_applications', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=animal.breed, color=animal.color, species=animal.species, staff=animal.staff, arrival_date='2019-03-18')
+
+        response = self.client.get(reverse('app:list_applications'), {'sort': 'pending'})
+        names = [listed_animal.name for listed_animal in response.context['animals']]
+        self.assertEqual(names, ['test_animal_unadopted', 'a_animal_without_applications'])
+        self.assertEqual(response.context['animals'][0].pending_count, 1)
+
     def test_staff_user_can_view_specific_applications(self):
         """
             Validate that a staff user can see a specific animal's applications
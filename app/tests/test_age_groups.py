@@ -0,0 +1,104 @@
+# unittest
+import unittest
+from django.test import TestCase
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species, determine_age_group
+# tools
+import datetime
+from dateutil.relativedelta import relativedelta
+from app.utils import establish_query, update_age_groups
+
+
+class AgeGroupTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Methods:
+            setUpClass
+            test_determine_age_group_boundaries
+            test_age_group_assigned_on_save
+            test_update_age_groups_rolls_animals_forward
+            test_age_filter_uses_age_group
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(AgeGroupTests, cls).setUpClass()
+
+        staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        breed = Breed.objects.create(breed='domestic longhair')
+        color = Color.objects.create(color='black')
+        cat = Species.objects.create(species='cat')
+
+        today = datetime.date.today()
+        cls.birthdays = {
+            'young': today - relativedelta(years=1),
+            'adult': today - relativedelta(years=4),
+            'senior': today - relativedelta(years=10),
+        }
+
+        for group, birthday in cls.birthdays.items():
+            Animal.objects.create(
+                name=f'test_{group}',
+                age=birthday,
+                sex='F',
+                description='This is the pet\'s description.',
+                breed=breed,
+                color=color,
+                species=cat,
+                staff=staff,
+                arrival_date='2019-03-18',
+            )
+
+    def test_determine_age_group_boundaries(self):
+        """
+            Confirm the young/adult and adult/senior boundaries, including string dates from forms.
+        """
+
+        today = datetime.date(2020, 6, 1)
+        self.assertEqual(determine_age_group('2018-06-01', today), 'young')
+        self.assertEqual(determine_age_group('2018-05-31', today), 'adult')
+        self.assertEqual(determine_age_group('2012-06-02', today), 'adult')
+        self.assertEqual(determine_age_group('2012-06-01', today), 'senior')
+        self.assertIsNone(determine_age_group(None, today))
+
+    def test_age_group_assigned_on_save(self):
+        """
+            Confirm that saving an animal stores its age group.
+        """
+
+        for group in self.birthdays:
+            self.assertEqual(Animal.objects.get(name=f'test_{group}').age_group, group)
+
+    def test_update_age_groups_rolls_animals_forward(self):
+        """
+            Confirm that the daily update moves an animal that has aged into a new group, and leaves the rest alone.
+        """
+
+        # three years from now the young animal is an adult
+        later = datetime.date.today() + relativedelta(years=3)
+        self.assertEqual(update_age_groups(today=later), 1)
+        self.assertEqual(Animal.objects.get(name='test_young').age_group, 'adult')
+        self.assertEqual(update_age_groups(today=later), 0)
+
+    def test_age_filter_uses_age_group(self):
+        """
+            Confirm that the age filter on the available animals search matches the stored group.
+        """
+
+        for group in self.birthdays:
+            names = [animal.name for animal in establish_query(None, group, None)]
+            self.assertEqual(names, [f'test_{group}'])
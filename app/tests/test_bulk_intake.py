@@ -0,0 +1,225 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, ImageJob, Species, determine_age_group
+# bulk intake
+from app.intake import import_animals
+from app.lookups import breed_lookup
+from app.search import search_animals
+# tools
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+# photos land in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+HEADER = 'name,age,sex,species,breed,color,description,arrival_date,image\n'
+
+
+def make_jpeg():
+    """Returns the bytes of a small solid color JPEG"""
+
+    output = io.BytesIO()
+    Image.new('RGB', (300, 200), (200, 120, 40)).save(output, 'JPEG')
+    return output.getvalue()
+
+
+def make_zip(files):
+    """Returns the bytes of a zip file holding {name: bytes}"""
+
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkIntakeTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            ImageJob
+            Species
+        Templates:
+            bulk_intake.html
+        Views:
+            bulk_intake.py
+        Methods:
+            setUpClass
+            tearDownClass
+            test_rows_are_admitted_in_chunks
+            test_names_are_resolved_and_created
+            test_bad_rows_are_reported_and_skipped
+            test_photos_are_attached_from_folder
+            test_missing_columns_are_refused
+            test_command_admits_animals
+            test_staff_upload_with_zip
+            test_view_requires_staff
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(BulkIntakeTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+        CustomUser.objects.create_user(first_name='Test_firstname', last_name='Test_lastname', email='test@test.com', password='secret')
+        cls.cat = Species.objects.create(species='cat')
+        cls.breed = Breed.objects.create(breed='domestic longhair')
+        cls.color = Color.objects.create(color='black')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(BulkIntakeTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_rows_are_admitted_in_chunks(self):
+        """
+            Confirm that every row is admitted with a fixed number of queries per chunk, whatever the chunk holds, and that the new animals are searchable.
+        """
+
+        rows = ''.join(f'Cat {number},2018-03-18,F,cat,domestic longhair,black,Friendly.,2019-03-18,\n' for number in range(60))
+
+        with CaptureQueriesContext(connection) as queries:
+            created, names_created, errors = import_animals(io.StringIO(HEADER + rows), self.staff, chunk_size=25)
+
+        self.assertEqual((created, names_created, errors), (60, 0, []))
+        # three chunks of: three name lookups, then max pk, insert, index (delete + insert) and photo jobs, plus the savepoint
+        self.assertLessEqual(len(queries), 3 * 12)
+
+        animal = Animal.objects.get(name='Cat 7')
+        self.assertEqual((animal.species, animal.breed, animal.color, animal.staff), (self.cat, self.breed, self.color, self.staff))
+        self.assertEqual(animal.age_group, determine_age_group(animal.age))
+        self.assertIn(animal, search_animals(Animal.objects.all(), 'Cat 7'))
+
+    def test_names_are_resolved_and_created(self):
+        """
+            Confirm that names are matched regardless of case and that names that don't exist yet are created once and reach the lookup tables.
+        """
+
+        rows = 'Rex,2018-03-18,M,Dog,Beagle,Black,Friendly.,,\nMax,2018-03-18,M,dog,beagle,tan,Friendly.,,\n'
+        created, names_created, errors = import_animals(io.StringIO(HEADER + rows), self.staff)
+
+        self.assertEqual((created, names_created, errors), (2, 3, []))
+        self.assertEqual(Species.objects.filter(species='dog').count(), 1)
+        self.assertEqual(Animal.objects.get(name='Rex').color, self.color)
+        self.assertEqual(breed_lookup.get_by_name('beagle'), Breed.objects.get(breed='beagle'))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        """
+            Confirm that rows with problems are reported with their line numbers while the other rows are admitted.
+        """
+
+        rows = (
+            'Good,2018-03-18,F,cat,domestic longhair,black,Friendly.,,\n'
+            'No Age,,F,cat,domestic longhair,black,Friendly.,,\n'
+            'Bad Date,18/03/2018,F,cat,domestic longhair,black,Friendly.,,\n'
+            'Bad Sex,2018-03-18,X,cat,domestic longhair,black,Friendly.,,\n'
+            'A Name Much Too Long,2018-03-18,F,cat,domestic longhair,black,Friendly.,,\n'
+            'No Photo,2018-03-18,F,cat,domestic longhair,black,Friendly.,,missing.jpg\n'
+        )
+        created, _, errors = import_animals(io.StringIO(HEADER + rows), self.staff)
+
+        self.assertEqual(created, 1)
+        self.assertEqual([line for line, _ in errors], [3, 4, 5, 6, 7])
+        self.assertIn('missing age', errors[0][1])
+        self.assertIn('sex:', errors[2][1])
+        self.assertIn('name:', errors[3][1])
+        self.assertIn("'missing.jpg' was not found", errors[4][1])
+
+    def test_photos_are_attached_from_folder(self):
+        """
+            Confirm that photos named in the image column are stored from a folder and queued for the image worker.
+        """
+
+        folder = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(folder, 'kiwi.jpg'), 'wb') as photo:
+                photo.write(make_jpeg())
+
+            rows = 'Kiwi,2018-03-18,F,cat,domestic longhair,black,Friendly.,,kiwi.jpg\nPlain,2018-03-18,F,cat,domestic longhair,black,Friendly.,,\n'
+            created, _, errors = import_animals(io.StringIO(HEADER + rows), self.staff, images=folder)
+        finally:
+            shutil.rmtree(folder)
+
+        self.assertEqual((created, errors), (2, []))
+        kiwi = Animal.objects.get(name='Kiwi')
+        self.assertTrue(kiwi.image.storage.exists(kiwi.image.name))
+        self.assertEqual(list(ImageJob.objects.values_list('animal_id', flat=True)), [kiwi.id])
+        self.assertEqual(Animal.objects.get(name='Plain').image.name, 'media/placeholder.jpg')
+
+    def test_missing_columns_are_refused(self):
+        """
+            Confirm that a CSV whose header lacks required columns admits nothing.
+        """
+
+        created, _, errors = import_animals(io.StringIO('name,age\nKiwi,2018-03-18\n'), self.staff)
+
+        self.assertEqual(created, 0)
+        self.assertIn('sex, species, breed, color', errors[0][1])
+
+    def test_command_admits_animals(self):
+        """
+            Confirm that the bulk_intake command admits the rows of a CSV file and lists skipped rows.
+        """
+
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'animals.csv')
+            with open(path, 'w') as csv_file:
+                csv_file.write(HEADER + 'Kiwi,2018-03-18,F,cat,domestic longhair,black,Friendly.,,\nBad,,F,cat,,,,,\n')
+
+            output, errors = io.StringIO(), io.StringIO()
+            call_command('bulk_intake', path, '--staff', 'test_admin@test.com', stdout=output, stderr=errors)
+        finally:
+            shutil.rmtree(folder)
+
+        self.assertIn('Admitted 1 animals', output.getvalue())
+        self.assertIn('line 3: missing age, breed, color, description', errors.getvalue())
+
+    def test_staff_upload_with_zip(self):
+        """
+            Confirm that a staff member can upload a CSV with a zip of photos and sees the results.
+        """
+
+        self.client.login(email='test_admin@test.com', password='secret')
+        rows = 'Kiwi,2018-03-18,F,cat,domestic longhair,black,Friendly.,,kiwi.jpg\nBad,2018-03-18,F,cat,domestic longhair,black,Friendly.,,nope.jpg\n'
+        response = self.client.post(reverse('app:bulk_intake'), {
+            'csv_file': SimpleUploadedFile('animals.csv', (HEADER + rows).encode()),
+            'images': SimpleUploadedFile('photos.zip', make_zip({'photos/kiwi.jpg': make_jpeg()})),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'1 animals admitted', response.content)
+        self.assertIn(b'Line 3: image &#39;nope.jpg&#39; was not found', response.content)
+        self.assertNotEqual(Animal.objects.get(name='Kiwi').image.name, 'media/placeholder.jpg')
+
+    def test_view_requires_staff(self):
+        """
+            Confirm that only staff members can reach the bulk intake page.
+        """
+
+        self.client.login(email='test@test.com', password='secret')
+        self.assertEqual(self.client.get(reverse('app:bulk_intake')).status_code, 302)
@@ -0,0 +1,103 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# tools
+from app.utils import cached_query, get_catalog_cache, get_catalog_version
+
+
+class CatalogCacheTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Views:
+            available_animals.py
+        Methods:
+            setUpClass
+            setUp
+            test_identical_search_is_served_from_cache
+            test_equivalent_empty_filters_share_a_cache_entry
+            test_saving_an_animal_invalidates_results
+            test_deleting_an_animal_invalidates_results
+            test_saving_a_species_bumps_version
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(CatalogCacheTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        cls.breed = Breed.objects.create(breed='domestic longhair')
+        cls.color = Color.objects.create(color='black')
+        cls.cat = Species.objects.create(species='cat')
+
+        cls.kiwi = Animal.objects.create(name='Kiwi', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=cls.breed, color=cls.color, species=cls.cat, staff=cls.staff, arrival_date='2019-03-18')
+
+    def setUp(self):
+        # cached pages can outlive the rolled-back data of an earlier test
+        get_catalog_cache().clear()
+
+    def test_identical_search_is_served_from_cache(self):
+        """
+            Confirm that repeating a search makes no database queries.
+        """
+
+        self.client.get(reverse('app:search_pets'), {'cat': '', 'animal_species': 'None', 'animal_age': 'None', 'name_query': ''})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('app:search_pets'), {'cat': '', 'animal_species': 'None', 'animal_age': 'None', 'name_query': ''})
+        self.assertIn(b'Kiwi', response.content)
+
+    def test_equivalent_empty_filters_share_a_cache_entry(self):
+        """
+            Confirm that None, 'None', and '' are treated as the same cleared filter.
+        """
+
+        cached_query('cat', None, None)
+        with self.assertNumQueries(0):
+            animals, next_cursor = cached_query('cat', 'None', '')
+        self.assertEqual([animal.name for animal in animals], ['Kiwi'])
+
+    def test_saving_an_animal_invalidates_results(self):
+        """
+            Confirm that a new arrival appears in a previously cached search.
+        """
+
+        cached_query('cat', None, None)
+        Animal.objects.create(name='Mochi', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=self.breed, color=self.color, species=self.cat, staff=self.staff, arrival_date='2019-03-18')
+        animals, next_cursor = cached_query('cat', None, None)
+        self.assertEqual([animal.name for animal in animals], ['Kiwi', 'Mochi'])
+
+    def test_deleting_an_animal_invalidates_results(self):
+        """
+            Confirm that a deleted animal disappears from a previously cached search.
+        """
+
+        cached_query(None, None, None)
+        Animal.objects.get(pk=self.kiwi.id).delete()
+        animals, next_cursor = cached_query(None, None, None)
+        self.assertEqual(animals, [])
+
+    def test_saving_a_species_bumps_version(self):
+        """
+            Confirm that saving a species invalidates cached results.
+        """
+
+        version = get_catalog_version()
+        Species.objects.create(species='dog')
+        self.assertGreater(get_catalog_version(), version)
@@ -0,0 +1,147 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# tools
+import datetime
+from dateutil.relativedelta import relativedelta
+from django.utils.timezone import make_aware
+from app.utils import establish_facets, get_catalog_cache
+
+
+class FacetCountTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Templates:
+            available_animals.html
+        Views:
+            available_animals.py
+        Methods:
+            setUpClass
+            setUp
+            test_counts_without_filters
+            test_species_filter_narrows_age_counts
+            test_age_filter_narrows_species_counts
+            test_search_text_narrows_all_counts
+            test_counts_come_from_one_query_and_are_cached
+            test_saving_an_animal_invalidates_counts
+            test_counts_shown_on_filter_buttons
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(FacetCountTests, cls).setUpClass()
+
+        staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        cls.breed = Breed.objects.create(breed='mixed')
+        cls.color = Color.objects.create(color='black')
+        cls.cat = Species.objects.create(species='cat')
+        dog = Species.objects.create(species='dog')
+        rabbit = Species.objects.create(species='rabbit')
+        cls.staff = staff
+
+        today = datetime.date.today()
+        young = today - relativedelta(years=1)
+        adult = today - relativedelta(years=4)
+        senior = today - relativedelta(years=10)
+
+        # 2 young cats, 1 senior cat, 1 adult dog, 1 young rabbit, and 1 adopted cat that is never counted
+        animals = [
+            ('Kiwi', cls.cat, young, None),
+            ('Mochi', cls.cat, young, None),
+            ('Zelda', cls.cat, senior, None),
+            ('Rex', dog, adult, None),
+            ('Thumper', rabbit, young, None),
+            ('Luna', cls.cat, young, make_aware(datetime.datetime(2019, 3, 20))),
+        ]
+
+        for name, species, birthday, date_adopted in animals:
+            Animal.objects.create(name=name, age=birthday, sex='F', description='This is the pet\'s description.', breed=cls.breed, color=cls.color, species=species, staff=staff, arrival_date='2019-03-18', date_adopted=date_adopted)
+
+    def setUp(self):
+        # cached counts can outlive the rolled-back data of an earlier test
+        get_catalog_cache().clear()
+
+    def test_counts_without_filters(self):
+        """
+            Confirm the species and age counts for all unadopted animals.
+        """
+
+        facets = establish_facets(None, None, None)
+        self.assertEqual(facets['species'], {'cat': 3, 'dog': 1, 'other': 1})
+        self.assertEqual(facets['age'], {'young': 3, 'adult': 1, 'senior': 1})
+
+    def test_species_filter_narrows_age_counts(self):
+        """
+            Confirm that selecting a species narrows the age counts but not the species counts.
+        """
+
+        facets = establish_facets('cat', 'None', '')
+        self.assertEqual(facets['species'], {'cat': 3, 'dog': 1, 'other': 1})
+        self.assertEqual(facets['age'], {'young': 2, 'adult': 0, 'senior': 1})
+
+        facets = establish_facets('other', None, None)
+        self.assertEqual(facets['age'], {'young': 1, 'adult': 0, 'senior': 0})
+
+    def test_age_filter_narrows_species_counts(self):
+        """
+            Confirm that selecting an age group narrows the species counts but not the age counts.
+        """
+
+        facets = establish_facets(None, 'young', None)
+        self.assertEqual(facets['species'], {'cat': 2, 'dog': 0, 'other': 1})
+        self.assertEqual(facets['age'], {'young': 3, 'adult': 1, 'senior': 1})
+
+    def test_search_text_narrows_all_counts(self):
+        """
+            Confirm that the search text applies to every count.
+        """
+
+        facets = establish_facets(None, None, 'kiwi')
+        self.assertEqual(facets['species'], {'cat': 1, 'dog': 0, 'other': 0})
+        self.assertEqual(facets['age'], {'young': 1, 'adult': 0, 'senior': 0})
+
+    def test_counts_come_from_one_query_and_are_cached(self):
+        """
+            Confirm that all counts come from a single query, and a repeated request is served from the cache.
+        """
+
+        with self.assertNumQueries(1):
+            establish_facets('cat', None, None)
+        with self.assertNumQueries(0):
+            establish_facets('cat', None, None)
+
+    def test_saving_an_animal_invalidates_counts(self):
+        """
+            Confirm that a new arrival shows up in the counts straight away.
+        """
+
+        self.assertEqual(establish_facets(None, None, None)['species']['cat'], 3)
+        Animal.objects.create(name='Daisy', age=datetime.date.today(), sex='F', description='This is the pet\'s description.', breed=self.breed, color=self.color, species=self.cat, staff=self.staff, arrival_date='2019-03-18')
+        self.assertEqual(establish_facets(None, None, None)['species']['cat'], 4)
+
+    def test_counts_shown_on_filter_buttons(self):
+        """
+            Confirm that the available pets page shows the counts on its filter buttons.
+        """
+
+        response = self.client.get(reverse('app:pets'))
+        self.assertIn(b'Cat (3)', response.content)
+        self.assertIn(b'Young (3)', response.content)
@@ -0,0 +1,328 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+from app.tests.base import SequenceResetTestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, ImageJob, Species
+# derived image sizes
+from app.images import DERIVATIVE_SIZES, derivative_name, render_derivative, _upright
+# background jobs
+from app.jobs import enqueue_image_job, retry_failed_image_jobs, run_image_jobs
+from app.utils import get_catalog_cache
+# tools
+import base64
+import io
+import shutil
+import tempfile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+# uploads land in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(width, height, exif=None):
+    """Returns the bytes of a solid color JPEG of the given size"""
+
+    output = io.BytesIO()
+    image = Image.new('RGB', (width, height), (200, 120, 40))
+    if exif is not None:
+        image.save(output, 'JPEG', exif=exif)
+    else:
+        image.save(output, 'JPEG')
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageDerivativeTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Templates:
+            animal_detail.html
+            available_animals.html
+        Views:
+            new_arrival.py
+            available_animals.py
+        Methods:
+            setUpClass
+            tearDownClass
+            setUp
+            post_new_arrival
+            test_new_arrival_queues_a_job
+            test_new_arrival_generates_every_size
+            test_derivatives_never_upscale
+            test_templates_serve_derived_sizes
+            test_edit_replaces_derived_sizes
+            test_placeholder_is_served_as_is
+            test_sideways_photo_is_turned_upright
+            test_failed_job_is_retried_then_marked_failed
+            test_worker_stores_placeholder
+            test_cards_lazy_load_over_placeholder
+            test_backfill_fills_missing_placeholders
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(ImageDerivativeTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+        cls.breed = Breed.objects.create(breed='domestic longhair')
+        cls.color = Color.objects.create(color='black')
+        cls.species = Species.objects.create(species='cat')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(ImageDerivativeTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client.login(email='test_admin@test.com', password='secret')
+
+    def post_new_arrival(self, image_bytes, name='test_animal', run_jobs=True):
+        """Posts the new arrival form with an uploaded photo, lets the image worker run (unless run_jobs is False), and returns the new animal"""
+
+        form_data = {
+            'name': name,
+            'age': '2018-03-18',
+            'sex': 'F',
+            'description': 'This is the pet\'s description.',
+            'breed': self.breed.id,
+            'color': self.color.id,
+            'species': self.species.id,
+            'staff': self.staff.id,
+            'arrival_date': '2019-03-18',
+            'image': SimpleUploadedFile('photo.jpg', image_bytes, content_type='image/jpeg'),
+        }
+        response = self.client.post(reverse('app:new_arrival'), form_data)
+        self.assertEqual(response.status_code, 302)
+        if run_jobs:
+            run_image_jobs()
+        return Animal.objects.get(name=name)
+
+    def test_new_arrival_queues_a_job(self):
+        """
+            Confirm that the new arrival form only queues the image work, and that the placeholder is served until the worker has run.
+        """
+
+        animal = self.post_new_arrival(make_jpeg(1200, 1200), run_jobs=False)
+        self.assertFalse(animal.derivatives_ready)
+        self.assertEqual(ImageJob.objects.filter(animal=animal, status='pending').count(), 1)
+        self.assertFalse(default_storage.exists(derivative_name(animal.image.name, 'card')))
+
+        response = self.client.get(reverse('app:pets'))
+        self.assertIn("src='/media/placeholder.jpg'".encode(), response.content)
+
+        self.assertEqual(run_image_jobs(), (1, 1))
+        self.assertTrue(Animal.objects.get(pk=animal.id).derivatives_ready)
+        self.assertEqual(ImageJob.objects.get(animal=animal).status, 'done')
+
+    def test_new_arrival_generates_every_size(self):
+        """
+            Confirm that uploading a photo writes every derived size, each fitting its longest edge.
+        """
+
+        animal = self.post_new_arrival(make_jpeg(3000, 2000))
+        self.assertTrue(animal.derivatives_ready)
+
+        for size, longest_edge in DERIVATIVE_SIZES.items():
+            with default_storage.open(derivative_name(animal.image.name, size)) as derived:
+                self.assertEqual(Image.open(derived).size, (longest_edge, longest_edge * 2 // 3))
+
+    def test_derivatives_never_upscale(self):
+        """
+            Confirm that a photo smaller than a derived size keeps its own dimensions.
+        """
+
+        self.assertEqual(Image.open(io.BytesIO(render_derivative(Image.new('RGB', (300, 200)), 800))).size, (300, 200))
+
+    def test_templates_serve_derived_sizes(self):
+        """
+            Confirm that the available pets grid and the detail page link the derived sizes with a srcset.
+        """
+
+        animal = self.post_new_arrival(make_jpeg(1200, 1200))
+
+        response = self.client.get(reverse('app:pets'))
+        self.assertIn(f"src='{animal.card_image_url}'".encode(), response.content)
+        self.assertIn(f"srcset='{animal.image_srcset}'".encode(), response.content)
+        self.assertNotIn(f"src='{animal.image.url}'".encode(), response.content)
+
+        response = self.client.get(reverse('app:animal_detail', args=(animal.id,)))
+        self.assertIn(f"src='{animal.detail_image_url}'".encode(), response.content)
+        self.assertIn(' 800w'.encode(), response.content)
+
+    def test_edit_replaces_derived_sizes(self):
+        """
+            Confirm that uploading a new photo on the edit form writes derived sizes for it (the old files are released once the edit commits, see test_storage.py).
+        """
+
+        animal = self.post_new_arrival(make_jpeg(1200, 600))
+        old_image = animal.image.name
+
+        form_data = {
+            'name': 'test_animal',
+            'age': '2018-03-18',
+            'sex': 'F',
+            'description': 'This is the pet\'s description.',
+            'breed': self.breed.id,
+            'color': self.color.id,
+            'species': self.species.id,
+            'staff': self.staff.id,
+            'arrival_date': '2019-03-18',
+            'image': SimpleUploadedFile('another.jpg', make_jpeg(600, 1200), content_type='image/jpeg'),
+        }
+        response = self.client.post(reverse('app:animal_edit', args=(animal.id,)), form_data)
+        self.assertEqual(response.status_code, 302)
+        run_image_jobs()
+
+        animal = Animal.objects.get(pk=animal.id)
+        self.assertTrue(animal.derivatives_ready)
+        self.assertNotEqual(animal.image.name, old_image)
+        with default_storage.open(derivative_name(animal.image.name, 'card')) as derived:
+            self.assertEqual(Image.open(derived).size, (200, 400))
+
+    def test_placeholder_is_served_as_is(self):
+        """
+            Confirm that an animal without a photo serves the small placeholder without a srcset.
+        """
+
+        animal = Animal.objects.create(name='no_photo', age='2018-03-18', sex='M', description='No photo yet.', breed=self.breed, color=self.color, species=self.species, staff=self.staff, arrival_date='2019-03-18')
+        self.assertEqual(animal.card_image_url, animal.image.url)
+        self.assertEqual(animal.image_srcset, '')
+
+    def test_sideways_photo_is_turned_upright(self):
+        """
+            Confirm that a photo with a 'rotate 90' EXIF orientation is rotated before it is scaled.
+        """
+
+        # minimal little-endian EXIF block holding only Orientation = 6
+        exif = b'Exif\x00\x00II*\x00\x08\x00\x00\x00\x01\x00\x12\x01\x03\x00\x01\x00\x00\x00\x06\x00\x00\x00\x00\x00\x00\x00'
+        photo = Image.open(io.BytesIO(make_jpeg(400, 200, exif=exif)))
+        self.assertEqual(_upright(photo).size, (200, 400))
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        """
+            Confirm that a job whose image can't be read goes back in the queue with a delay, is marked failed after its last attempt, and can be re-queued.
+        """
+
+        animal = Animal.objects.create(name='lost_photo', age='2018-03-18', sex='M', description='The upload went missing.', image='media/missing.jpg', breed=self.breed, color=self.color, species=self.species, staff=self.staff, arrival_date='2019-03-18')
+        enqueue_image_job(animal)
+
+        self.assertEqual(run_image_jobs(max_attempts=2), (1, 0))
+        job = ImageJob.objects.get(animal=animal)
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('FileNotFoundError', job.last_error)
+        # the retry isn't due yet
+        self.assertEqual(run_image_jobs(max_attempts=2), (0, 0))
+
+        ImageJob.objects.filter(pk=job.id).update(run_after=job.created)
+        self.assertEqual(run_image_jobs(max_attempts=2), (1, 0))
+        self.assertEqual(ImageJob.objects.get(pk=job.id).status, 'failed')
+
+        self.assertEqual(retry_failed_image_jobs(), 1)
+        self.assertEqual(ImageJob.objects.get(pk=job.id).attempts, 0)
+
+    def test_worker_stores_placeholder(self):
+        """
+            Confirm that the image worker stores the photo's dominant color and a 16px preview as a data URI.
+        """
+
+        animal = self.post_new_arrival(make_jpeg(1200, 800))
+
+        red, green, blue = (int(animal.placeholder_color[i:i + 2], 16) for i in (1, 3, 5))
+        self.assertTrue(all(abs(actual - expected) <= 8 for actual, expected in zip((red, green, blue), (200, 120, 40))))
+
+        self.assertTrue(animal.placeholder_preview.startswith('data:image/jpeg;base64,'))
+        preview = Image.open(io.BytesIO(base64.b64decode(animal.placeholder_preview.split(',', 1)[1])))
+        self.assertEqual(max(preview.size), 16)
+
+    def test_cards_lazy_load_over_placeholder(self):
+        """
+            Confirm that available pets cards are lazy-loaded and show the placeholder inline, and that an image still waiting for the worker gets no placeholder.
+        """
+
+        waiting = self.post_new_arrival(make_jpeg(400, 400), name='waiting_animal', run_jobs=False)
+        self.assertEqual(waiting.placeholder_style, '')
+
+        run_image_jobs()
+        animal = Animal.objects.get(pk=waiting.id)
+        response = self.client.get(reverse('app:pets'))
+
+        self.assertIn(f"loading='lazy' style='{animal.placeholder_style}'".encode(), response.content)
+        self.assertIn(f'background: {animal.placeholder_color} url(data:image/jpeg;base64,'.encode(), response.content)
+
+    def test_backfill_fills_missing_placeholders(self):
+        """
+            Confirm that the backfill command stores placeholders for processed images that have none, and leaves the others alone.
+        """
+
+        animal = self.post_new_arrival(make_jpeg(400, 400))
+        other = self.post_new_arrival(make_jpeg(400, 400), name='other_animal')
+        Animal.objects.filter(pk=animal.id).update(placeholder_color='', placeholder_preview='')
+        Animal.objects.filter(pk=other.id).update(placeholder_color='#000000')
+
+        call_command('backfill_image_placeholders', stdout=io.StringIO())
+
+        self.assertEqual(Animal.objects.get(pk=animal.id).placeholder_color, other.placeholder_color)
+        self.assertTrue(Animal.objects.get(pk=animal.id).placeholder_preview)
+        self.assertEqual(Animal.objects.get(pk=other.id).placeholder_color, '#000000')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageWorkerTests(SequenceResetTestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            ImageJob
+            Species
+        Methods:
+            setUp
+            test_worker_pool_processes_queue
+    """
+
+    def setUp(self):
+        """Creates animals with uploaded photos and queues their image jobs"""
+
+        staff = CustomUser.objects.create(first_name='Test_firstname', last_name='Test_lastname', email='test_admin@test.com', is_staff=True)
+        breed = Breed.objects.create(breed='domestic longhair')
+        color = Color.objects.create(color='black')
+        species = Species.objects.create(species='cat')
+
+        for number in range(6):
+            animal = Animal(name=f'animal{number}', age='2018-03-18', sex='F', description='This is the pet\'s description.', breed=breed, color=color, species=species, staff=staff, arrival_date='2019-03-18')
+            animal.image = SimpleUploadedFile(f'photo{number}.jpg', make_jpeg(900, 600), content_type='image/jpeg')
+            animal.save()
+            enqueue_image_job(animal)
+
+    def test_worker_pool_processes_queue(self):
+        """
+            Confirm that the worker command drains the queue on a thread pool and marks every animal's derived images ready.
+        """
+
+        output = io.StringIO()
+        call_command('run_image_worker', '--once', '--workers', '3', '--pool', 'thread', stdout=output)
+
+        self.assertIn('Ran 6 image jobs (6 succeeded', output.getvalue())
+        self.assertEqual(ImageJob.objects.filter(status='done').count(), 6)
+        self.assertEqual(Animal.objects.filter(derivatives_ready=True).count(), 6)
@@ -0,0 +1,131 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# lookup tables
+from app.lookups import breed_lookup, color_lookup, species_lookup
+# tools
+from app.utils import establish_query
+
+
+class LookupRegistryTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Views:
+            available_animals.py
+        Methods:
+            setUpClass
+            test_repeated_lookups_make_no_queries
+            test_saved_row_is_visible_after_reload
+            test_missing_row_raises_does_not_exist
+            test_unknown_species_filter_finds_nothing
+            test_other_species_filter_makes_no_species_queries
+            test_animal_edit_uses_registry
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(LookupRegistryTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        cls.breed = Breed.objects.create(breed='domestic longhair')
+        cls.color = Color.objects.create(color='black')
+        cls.cat = Species.objects.create(species='cat')
+        cls.dog = Species.objects.create(species='dog')
+
+        cls.animal = Animal.objects.create(name='Kiwi', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=cls.breed, color=cls.color, species=cls.cat, staff=cls.staff, arrival_date='2019-03-18')
+
+    def test_repeated_lookups_make_no_queries(self):
+        """
+            Confirm that lookups after the first load come from memory.
+        """
+
+        species_lookup.get_by_name('cat')
+        breed_lookup.all()
+        color_lookup.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(species_lookup.get_by_name('cat'), self.cat)
+            self.assertEqual(species_lookup.get(str(self.dog.id)), self.dog)
+            self.assertEqual(breed_lookup.get(self.breed.id), self.breed)
+            self.assertEqual(color_lookup.get_by_name('black'), self.color)
+
+    def test_saved_row_is_visible_after_reload(self):
+        """
+            Confirm that saving a row makes the registry reload it, including renames.
+        """
+
+        color_lookup.all()
+        orange = Color.objects.create(color='orange')
+        self.assertEqual(color_lookup.get_by_name('orange'), orange)
+
+        orange.color = 'ginger'
+        orange.save()
+        self.assertEqual(color_lookup.get(orange.id).color, 'ginger')
+
+    def test_missing_row_raises_does_not_exist(self):
+        """
+            Confirm that an unknown name raises the model's DoesNotExist, as objects.get would, and that asking again doesn't reload the table.
+        """
+
+        with self.assertRaises(Species.DoesNotExist):
+            species_lookup.get_by_name('sea turtle')
+        with self.assertNumQueries(0):
+            with self.assertRaises(Species.DoesNotExist):
+                species_lookup.get_by_name('sea turtle')
+
+    def test_unknown_species_filter_finds_nothing(self):
+        """
+            Confirm that searching for a species that doesn't exist shows no animals rather than failing.
+        """
+
+        response = self.client.get(reverse('app:search_pets'), {'animal_species': 'fish', 'animal_age': 'None', 'name_query': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['animals']), [])
+
+    def test_other_species_filter_makes_no_species_queries(self):
+        """
+            Confirm that building the 'other' species filter doesn't query the species table.
+        """
+
+        species_lookup.all()
+        with self.assertNumQueries(0):
+            queryset = establish_query('other', None, None)
+        self.assertEqual(list(queryset), [])
+
+    def test_animal_edit_uses_registry(self):
+        """
+            Confirm that editing an animal still assigns the posted species, breed, and color.
+        """
+
+        self.client.login(email='test_admin@test.com', password='secret')
+        form_data = {
+            'name': 'Kiwi',
+            'age': '2018-03-17',
+            'sex': 'F',
+            'description': 'This is the pet\'s description.',
+            'breed': self.breed.id,
+            'color': self.color.id,
+            'species': self.dog.id,
+            'staff': self.staff.id,
+            'arrival_date': '2019-03-18',
+        }
+        response = self.client.post(reverse('app:animal_edit', args=(self.animal.id,)), form_data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Animal.objects.get(pk=self.animal.id).species, self.dog)
@@ -0,0 +1,157 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# tools
+import os
+import shutil
+import tempfile
+from django.utils.http import http_date
+
+# served files live in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# 1000 bytes with a recognisable position in every byte
+CONTENT = bytes(range(250)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaServingTests(TestCase):
+    """
+        Views:
+            media.py
+        Methods:
+            setUpClass
+            tearDownClass
+            test_file_is_streamed_with_validators
+            test_matching_etag_returns_not_modified
+            test_unchanged_file_since_date_returns_not_modified
+            test_byte_range_returns_partial_content
+            test_suffix_range_returns_end_of_file
+            test_unsatisfiable_range_is_refused
+            test_stale_if_range_returns_whole_file
+            test_missing_and_outside_files_are_not_found
+            test_transfer_can_be_handed_to_front_end_server
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Writes the file served by every test in this class"""
+
+        super(MediaServingTests, cls).setUpClass()
+
+        os.makedirs(os.path.join(MEDIA_ROOT, 'media'), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, 'media', 'kiwi.jpg'), 'wb') as media_file:
+            media_file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super(MediaServingTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_file_is_streamed_with_validators(self):
+        """
+            Confirm that a file is streamed whole with its length, type, ETag, and Last-Modified date.
+        """
+
+        response = self.client.get('/media/kiwi.jpg')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_matching_etag_returns_not_modified(self):
+        """
+            Confirm that revalidating with the current ETag returns a 304 without a body.
+        """
+
+        etag = self.client.get('/media/kiwi.jpg')['ETag']
+        response = self.client.get('/media/kiwi.jpg', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unchanged_file_since_date_returns_not_modified(self):
+        """
+            Confirm that If-Modified-Since returns a 304 for an unchanged file and the file once it has changed.
+        """
+
+        last_modified = self.client.get('/media/kiwi.jpg')['Last-Modified']
+        self.assertEqual(self.client.get('/media/kiwi.jpg', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get('/media/kiwi.jpg', HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
+
+    def test_byte_range_returns_partial_content(self):
+        """
+            Confirm that a byte range returns 206 with only the requested bytes.
+        """
+
+        response = self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1000')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_suffix_range_returns_end_of_file(self):
+        """
+            Confirm that 'bytes=-N' returns the last N bytes and an open range runs to the end of the file.
+        """
+
+        response = self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+        self.assertEqual(response['Content-Range'], 'bytes 995-999/1000')
+
+        response = self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=998-')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[998:])
+
+    def test_unsatisfiable_range_is_refused(self):
+        """
+            Confirm that a range starting past the end of the file returns 416 with the file size.
+        """
+
+        response = self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=1000-1100')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1000')
+
+    def test_stale_if_range_returns_whole_file(self):
+        """
+            Confirm that a range is ignored when If-Range names another version of the file.
+        """
+
+        response = self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '1000')
+
+        etag = self.client.get('/media/kiwi.jpg')['ETag']
+        self.assertEqual(self.client.get('/media/kiwi.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+
+    def test_missing_and_outside_files_are_not_found(self):
+        """
+            Confirm that missing files, directories, and paths outside MEDIA_ROOT return 404, and that only GET and HEAD are allowed.
+        """
+
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/').status_code, 404)
+        self.assertEqual(self.client.get('/media/../../etc/passwd').status_code, 404)
+        self.assertEqual(self.client.post('/media/kiwi.jpg').status_code, 405)
+
+    def test_transfer_can_be_handed_to_front_end_server(self):
+        """
+            Confirm that with MEDIA_SENDFILE set the response carries the hand-off header and no body.
+        """
+
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/kiwi.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/media/kiwi.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        with self.settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/kiwi.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(MEDIA_ROOT, 'media', 'kiwi.jpg'))
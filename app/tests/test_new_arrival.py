@@ -1,14 +1,21 @@
 # unittest
 import unittest
-from django.test import TestCase
+from django.test import TestCase, override_settings
 # HTTP
 from django.urls import reverse
 # models
 from app.models import Animal, Breed, Color, CustomUser, Species
 # forms
 from app.forms import AnimalForm
+# tools
+import shutil
+import tempfile
 
+# uploads land in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
 
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class NewArrivalTests(TestCase):
     """
         Models:
@@ -23,6 +30,7 @@ class NewArrivalTests(TestCase):
             new_arrival.py
         Methods:
             setUpclass
+            tearDownClass
             test_non_admin_cannot_access_form
             test_add_new_arrival
             test_add_image
@@ -65,6 +73,11 @@ class NewArrivalTests(TestCase):
             is_staff=False,
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        super(NewArrivalTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
     def test_non_admin_cannot_access_form(self):
 
         # log user (not an administrator) in
@@ -143,6 +156,5 @@ class NewArrivalTests(TestCase):
             new_animal = Animal.objects.get(pk=1)
             # confirm new_animal was posted via name check
             self.assertEqual(new_animal.name, 'test_animal')
-            # confirm name of test media file shows in instance (e.g. media/test_7x1jLfb.jpg)
-            self.assertIn('media/test', str(new_animal.image))
-            new_animal.image.delete()
+            # confirm the test media file is stored under its content hash (e.g. media/3f/a2/3fa2...e9.jpg)
+            self.assertRegex(str(new_animal.image), r'^media/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
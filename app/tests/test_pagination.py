@@ -0,0 +1,134 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# tools
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app.utils import ANIMALS_PER_PAGE, decode_cursor, encode_cursor, get_catalog_cache
+
+
+class AvailableAnimalsPaginationTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Templates:
+            available_animals.html
+        Views:
+            available_animals.py
+        Methods:
+            setUpClass
+            setUp
+            test_first_page_is_limited
+            test_next_page_continues_after_last_animal
+            test_search_pages_keep_filters
+            test_later_pages_cost_the_same_queries
+            test_invalid_cursor_shows_first_page
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(AvailableAnimalsPaginationTests, cls).setUpClass()
+
+        staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        breed = Breed.objects.create(breed='domestic longhair')
+        color = Color.objects.create(color='black')
+        cat = Species.objects.create(species='cat')
+
+        # create one more page worth of animals (names share a prefix so they all match the same search)
+        for number in range(ANIMALS_PER_PAGE + 6):
+            Animal.objects.create(
+                name=f'Pet{number:03d}',
+                age='2018-03-17',
+                sex='F',
+                description='This is the pet\'s description.',
+                breed=breed,
+                color=color,
+                species=cat,
+                staff=staff,
+                arrival_date='2019-03-18',
+            )
+
+    def setUp(self):
+        # cached pages can outlive the rolled-back data of an earlier test
+        get_catalog_cache().clear()
+
+    def test_first_page_is_limited(self):
+        """
+            Confirm that the first page holds one page of animals and links to the next page.
+        """
+
+        response = self.client.get(reverse('app:pets'))
+        self.assertEqual(len(response.context['animals']), ANIMALS_PER_PAGE)
+        self.assertIsNotNone(response.context['next_page_url'])
+
+    def test_next_page_continues_after_last_animal(self):
+        """
+            Confirm that following the next page link shows the remaining animals without repeats.
+        """
+
+        first_page = self.client.get(reverse('app:pets'))
+        second_page = self.client.get(first_page.context['next_page_url'])
+
+        first_names = [animal.name for animal in first_page.context['animals']]
+        second_names = [animal.name for animal in second_page.context['animals']]
+
+        self.assertEqual(len(second_names), 6)
+        self.assertEqual(first_names + second_names, sorted(first_names + second_names))
+        self.assertEqual(len(set(first_names) & set(second_names)), 0)
+        self.assertIsNone(second_page.context['next_page_url'])
+
+    def test_search_pages_keep_filters(self):
+        """
+            Confirm that the next page link of a search keeps the species filter and search text.
+        """
+
+        response = self.client.get(reverse('app:search_pets'), {'cat': '', 'animal_species': 'None', 'animal_age': 'None', 'name_query': 'pet'})
+        next_page_url = response.context['next_page_url']
+        self.assertIn('animal_species=cat', next_page_url)
+        self.assertIn('name_query=pet', next_page_url)
+
+        second_page = self.client.get(next_page_url)
+        self.assertEqual(second_page.context['animal_species'], 'cat')
+        self.assertEqual(len(second_page.context['animals']), 6)
+
+    def test_later_pages_cost_the_same_queries(self):
+        """
+            Confirm that a later page runs the same number of queries as the first page.
+        """
+
+        with CaptureQueriesContext(connection) as first_page_queries:
+            first_page = self.client.get(reverse('app:pets'))
+        # start the second page from a cold cache as well
+        get_catalog_cache().clear()
+        with CaptureQueriesContext(connection) as second_page_queries:
+            self.client.get(first_page.context['next_page_url'])
+
+        self.assertEqual(len(first_page_queries), len(second_page_queries))
+
+    def test_invalid_cursor_shows_first_page(self):
+        """
+            Confirm that a tampered 'after' token falls back to the first page.
+        """
+
+        self.assertEqual(decode_cursor(encode_cursor('pet005', 6)), ('pet005', 6))
+        self.assertIsNone(decode_cursor('not-a-token'))
+
+        response = self.client.get(reverse('app:pets'), {'after': 'not-a-token'})
+        self.assertEqual(response.context['animals'][0].name, 'Pet000')
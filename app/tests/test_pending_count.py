@@ -0,0 +1,157 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Application, Breed, Color, CustomUser, Species
+# tools
+import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+from app.seeding import seed_scale
+from app.utils import adjust_pending_app_count, get_catalog_cache, get_pending_app_count, PENDING_APP_COUNT_KEY
+
+
+class PendingApplicationCountTests(TestCase):
+    """
+        Models:
+            Animal
+            Application
+            Breed
+            Color
+            CustomUser
+            Species
+        Templates:
+            navbar.html
+        Methods:
+            setUpClass
+            setUp
+            test_count_is_cached_after_first_read
+            test_cached_count_expires
+            test_bulk_insert_drops_count
+            test_new_application_updates_count
+            test_decided_application_leaves_count
+            test_deleted_application_leaves_count
+            test_adjustment_inside_transaction_recounts
+            test_staff_navbar_makes_no_count_query
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(PendingApplicationCountTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        cls.auth_user = CustomUser.objects.create_user(
+            first_name='Test_firstname2',
+            last_name='Test_lastname2',
+            email='test_auth@test.com',
+            password='secret2',
+            is_staff=False,
+        )
+
+        breed = Breed.objects.create(breed='domestic longhair')
+        color = Color.objects.create(color='black')
+        species = Species.objects.create(species='cat')
+
+        cls.animal = Animal.objects.create(name='Kiwi', age='2018-03-17', sex='F', description='This is the pet\'s description.', breed=breed, color=color, species=species, staff=cls.staff, arrival_date='2019-03-18')
+
+        # two pending applications and one rejected application
+        for approved in (None, None, False):
+            Application.objects.create(text='I want to adopt this animal.', animal=cls.animal, user=cls.auth_user, approved=approved, date_submitted=make_aware(datetime.datetime.now()))
+
+    def setUp(self):
+        # a cached count can outlive the rolled-back data of an earlier test
+        get_catalog_cache().delete(PENDING_APP_COUNT_KEY)
+
+    def test_count_is_cached_after_first_read(self):
+        """
+            Confirm that the count is read from the database once and then served from the cache.
+        """
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_pending_app_count(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_pending_app_count(), 2)
+
+    def test_cached_count_expires(self):
+        """
+            Confirm that the cached count has an expiry, so a worker whose copy drifted recounts.
+        """
+
+        get_pending_app_count()
+        cache = get_catalog_cache()
+        # LocMemCache keeps each key's expiry time next to the value
+        self.assertIsNotNone(cache._expire_info[cache.make_key(PENDING_APP_COUNT_KEY)])
+
+    def test_bulk_insert_drops_count(self):
+        """
+            Confirm that applications inserted with bulk_create are counted.
+        """
+
+        get_pending_app_count()
+        seed_scale(users=5, animals=5, applications=10, activities=1)
+        self.assertEqual(get_pending_app_count(), Application.objects.filter(approved=None).count())
+        self.assertNotEqual(get_pending_app_count(), 2)
+
+    def test_new_application_updates_count(self):
+        """
+            Confirm that a new application is counted.
+        """
+
+        get_pending_app_count()
+        Application.objects.create(text='Me too!', animal=self.animal, user=self.staff, date_submitted=make_aware(datetime.datetime.now()))
+        self.assertEqual(get_pending_app_count(), 3)
+
+    def test_decided_application_leaves_count(self):
+        """
+            Confirm that rejecting a pending application removes it from the count.
+        """
+
+        get_pending_app_count()
+        application = Application.objects.filter(approved=None).first()
+        application.approved = False
+        application.save()
+        self.assertEqual(get_pending_app_count(), 1)
+
+    def test_deleted_application_leaves_count(self):
+        """
+            Confirm that deleting a pending application removes it from the count.
+        """
+
+        get_pending_app_count()
+        Application.objects.filter(approved=None).first().delete()
+        self.assertEqual(get_pending_app_count(), 1)
+
+    def test_adjustment_inside_transaction_recounts(self):
+        """
+            Confirm that a change made inside a transaction drops the cached count rather than trusting a delta that could be rolled back.
+        """
+
+        get_catalog_cache().set(PENDING_APP_COUNT_KEY, 5)
+        # TestCase wraps every test in a transaction
+        adjust_pending_app_count(1)
+        self.assertEqual(get_pending_app_count(), 2)
+
+    def test_staff_navbar_makes_no_count_query(self):
+        """
+            Confirm that once the count is cached, rendering a staff page doesn't count applications.
+        """
+
+        self.client.login(email='test_admin@test.com', password='secret')
+        response = self.client.get(reverse('app:list_volunteering'))
+        self.assertEqual(response.context['pending_app_count'], 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('app:list_volunteering'))
+        self.assertFalse(any('app_application' in query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,68 @@
+# unittest
+import unittest
+from django.test import TestCase
+# query counts
+from app.query_counts import QUERY_COUNT_SIZES, compare_query_counts, load_query_baseline, measure_query_counts, route_names
+
+
+class QueryCountTests(TestCase):
+    """
+        Requests every named route in app/urls.py as an anonymous user, a volunteer, and a staff member, with 10 and with 1,000 rows in each table, and checks the number of queries against app/tests/query_baseline.json. After a change that adds or removes queries on purpose, regenerate the baseline with: python manage.py update_query_baseline
+
+        Methods:
+            setUpTestData
+            test_baseline_covers_every_route
+            test_query_counts_stay_constant_as_rows_grow
+            test_query_counts_match_baseline
+            test_differences_point_at_repeated_queries
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Measures every route once at each size (the seeded rows are rolled back after each)"""
+
+        cls.counts = dict()
+        cls.sent = dict()
+        for rows in QUERY_COUNT_SIZES:
+            cls.counts[rows], cls.sent[rows] = measure_query_counts(rows)
+
+    def test_baseline_covers_every_route(self):
+        """
+            Confirm that the baseline lists every named route, so a new route can't be added without its query count.
+        """
+
+        self.assertEqual(sorted(load_query_baseline()), route_names())
+
+    def test_query_counts_stay_constant_as_rows_grow(self):
+        """
+            Confirm that no route makes more queries with 1,000 rows than with 10 (a query per row or card would).
+        """
+
+        smallest, largest = QUERY_COUNT_SIZES[0], QUERY_COUNT_SIZES[-1]
+        differences = compare_query_counts(self.counts[smallest], self.counts[largest], self.sent[largest])
+
+        self.assertEqual(differences, [], f'{smallest} -> {largest} rows:\n' + '\n'.join(differences))
+
+    def test_query_counts_match_baseline(self):
+        """
+            Confirm that every route makes the number of queries recorded in the baseline.
+        """
+
+        largest = QUERY_COUNT_SIZES[-1]
+        differences = compare_query_counts(load_query_baseline(), self.counts[largest], self.sent[largest])
+
+        self.assertEqual(differences, [], 'baseline -> now (run python manage.py update_query_baseline if the change is intended):\n' + '\n'.join(differences))
+
+    def test_differences_point_at_repeated_queries(self):
+        """
+            Confirm that a route whose count changed is reported with the queries it repeated.
+        """
+
+        expected = {'app:pets': {'anonymous': {'status': 200, 'queries': 2}}}
+        actual = {'app:pets': {'anonymous': {'status': 200, 'queries': 3}}}
+        sent = {'app:pets': {'anonymous': ['SELECT 1', 'SELECT "name" FROM "breed" WHERE "id" = 1', 'SELECT "name" FROM "breed" WHERE "id" = 2']}}
+
+        differences = compare_query_counts(expected, actual, sent)
+
+        self.assertEqual(differences[0], "app:pets as anonymous: {'status': 200, 'queries': 2} -> {'status': 200, 'queries': 3}")
+        self.assertEqual(differences[1], '    2 x SELECT "name" FROM "breed" WHERE "id" = N')
@@ -0,0 +1,109 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Species
+# request metrics
+from app.instrumentation import QueryBudgetExceeded, RequestMetrics, query_signature
+# tools
+import json
+from django.db import connection
+
+
+class RequestMetricsTests(TestCase):
+    """
+        Templates:
+            available_animals.html
+            list_volunteering.html
+        Views:
+            available_animals.py
+            volunteering.py
+        Methods:
+            test_response_carries_server_timing
+            test_request_is_logged_as_json
+            test_repeated_queries_share_a_signature
+            test_nested_templates_are_timed_once
+            test_view_over_budget_raises
+            test_view_over_budget_is_logged_outside_tests
+    """
+
+    def test_response_carries_server_timing(self):
+        """
+            Confirm that a response reports its SQL, template, view, and total time in a Server-Timing header.
+        """
+
+        response = self.client.get(reverse('app:pets'))
+
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ queries, \d+ duplicates", template;dur=[\d.]+, view;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_request_is_logged_as_json(self):
+        """
+            Confirm that every request is logged as one JSON object with its view name, query count, and timings.
+        """
+
+        with self.assertLogs('app.request_metrics', 'INFO') as logs:
+            self.client.get(reverse('app:pets'))
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['view'], record['path'], record['status']), ('app:pets', '/pets', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        for key in ('sql_ms', 'view_ms', 'total_ms', 'duplicate_queries', 'duplicates'):
+            self.assertIn(key, record)
+
+    def test_repeated_queries_share_a_signature(self):
+        """
+            Confirm that the same query run with different values (an N+1 loop) is reported as one duplicated signature.
+        """
+
+        first = Species.objects.create(species='cat')
+        second = Species.objects.create(species='dog')
+        metrics = RequestMetrics()
+
+        with connection.execute_wrapper(metrics):
+            for pk in (first.pk, second.pk, first.pk):
+                Species.objects.get(pk=pk)
+            list(Species.objects.filter(pk__in=[first.pk, second.pk]))
+            list(Species.objects.filter(pk__in=[first.pk]))
+
+        self.assertEqual(metrics.queries, 5)
+        self.assertEqual([count for _, count in metrics.duplicates()], [3, 2])
+        self.assertEqual(query_signature("SELECT 1 WHERE name = 'kiwi' AND id IN (%s, %s) LIMIT 21"), 'SELECT N WHERE name = ? AND id IN (...) LIMIT N')
+
+    def test_nested_templates_are_timed_once(self):
+        """
+            Confirm that a template rendered inside another one isn't added to the template time a second time.
+        """
+
+        metrics = RequestMetrics()
+        with metrics.time_template():
+            with metrics.time_template():
+                pass
+            outer_only = metrics.template_seconds
+
+        self.assertEqual(outer_only, 0.0)
+        self.assertGreater(metrics.template_seconds, 0.0)
+
+    @override_settings(QUERY_BUDGETS={'app:list_volunteering': 0})
+    def test_view_over_budget_raises(self):
+        """
+            Confirm that a view making more queries than its budget fails the test that requested it.
+        """
+
+        with self.assertRaisesRegex(QueryBudgetExceeded, r'app:list_volunteering made \d+ queries \(budget 0\)'):
+            self.client.get(reverse('app:list_volunteering'))
+
+    @override_settings(QUERY_BUDGETS={'app:list_volunteering': 0}, QUERY_BUDGET_ACTION='log')
+    def test_view_over_budget_is_logged_outside_tests(self):
+        """
+            Confirm that outside the test suite a view over its budget is served, and the warning reaches the root logger's handlers rather than only the metrics file.
+        """
+
+        with self.assertLogs(level='WARNING') as logs:
+            response = self.client.get(reverse('app:list_volunteering'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(logs.records[-1].name, 'app.query_budget')
+        self.assertIn('app:list_volunteering made', logs.records[-1].getMessage())
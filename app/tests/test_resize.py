@@ -0,0 +1,194 @@
+# unittest
+import unittest
+from unittest import mock
+from django.test import TestCase, override_settings
+# resized images
+from app.resize_cache import ResizeCache, resize_cache
+from app.views import media
+# tools
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from PIL import Image
+
+# source images and the resize cache live in throwaway directories
+MEDIA_ROOT = tempfile.mkdtemp()
+RESIZE_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RESIZE_CACHE_DIR=RESIZE_CACHE_DIR, RESIZE_CACHE_MAX_BYTES=10 * 1024 * 1024)
+class ResizeEndpointTests(TestCase):
+    """
+        Views:
+            media.py
+        Methods:
+            setUpClass
+            tearDownClass
+            setUp
+            test_resize_fits_requested_box
+            test_height_zero_keeps_proportions
+            test_sizes_outside_allow_list_are_refused
+            test_missing_source_is_not_found
+            test_oversized_source_is_not_found
+            test_second_request_is_served_from_cache
+            test_concurrent_requests_render_once
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Writes a 1200x800 source photo"""
+
+        super(ResizeEndpointTests, cls).setUpClass()
+
+        os.makedirs(os.path.join(MEDIA_ROOT, 'media'), exist_ok=True)
+        Image.new('RGB', (1200, 800), (200, 120, 40)).save(os.path.join(MEDIA_ROOT, 'media', 'kiwi.jpg'), 'JPEG')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(ResizeEndpointTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(RESIZE_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        resize_cache.clear()
+
+    def get_image(self, url):
+        """Requests a resized image and returns (response, PIL image)"""
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_resize_fits_requested_box(self):
+        """
+            Confirm that the image is scaled down to fit within the requested width and height.
+        """
+
+        response, image = self.get_image('/media/resize/320x160/media/kiwi.jpg')
+        self.assertEqual(image.size, (240, 160))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_height_zero_keeps_proportions(self):
+        """
+            Confirm that a height of 0 only constrains the width.
+        """
+
+        _, image = self.get_image('/media/resize/480x0/media/kiwi.jpg')
+        self.assertEqual(image.size, (480, 320))
+
+    def test_sizes_outside_allow_list_are_refused(self):
+        """
+            Confirm that widths and heights that aren't in the allow-list return 404 without rendering anything.
+        """
+
+        self.assertEqual(self.client.get('/media/resize/321x0/media/kiwi.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/resize/320x7/media/kiwi.jpg').status_code, 404)
+        self.assertEqual(list(resize_cache._entries()), [])
+
+    def test_missing_source_is_not_found(self):
+        """
+            Confirm that resizing a missing file or a path outside MEDIA_ROOT returns 404.
+        """
+
+        self.assertEqual(self.client.get('/media/resize/320x0/media/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/resize/320x0/../../etc/passwd').status_code, 404)
+
+    def test_oversized_source_is_not_found(self):
+        """
+            Confirm that a source with more pixels than Pillow will decode returns 404 rather than a server error.
+        """
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            self.assertEqual(self.client.get('/media/resize/320x0/media/kiwi.jpg').status_code, 404)
+        self.assertEqual(list(resize_cache._entries()), [])
+
+    def test_second_request_is_served_from_cache(self):
+        """
+            Confirm that a size is rendered on the first request only.
+        """
+
+        with mock.patch.object(media, 'render_resized', wraps=media.render_resized) as render:
+            self.get_image('/media/resize/160x0/media/kiwi.jpg')
+            self.get_image('/media/resize/160x0/media/kiwi.jpg')
+
+        self.assertEqual(render.call_count, 1)
+
+    def test_concurrent_requests_render_once(self):
+        """
+            Confirm that simultaneous requests for the same uncached size wait for a single render.
+        """
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.2)
+            return original_render(*args, **kwargs)
+
+        original_render = media.render_resized
+        statuses = list()
+        start = threading.Barrier(8)
+
+        def request():
+            start.wait()
+            response = self.client_class().get('/media/resize/640x0/media/kiwi.jpg')
+            b''.join(response.streaming_content)
+            statuses.append(response.status_code)
+
+        with mock.patch.object(media, 'render_resized', side_effect=slow_render) as render:
+            threads = [threading.Thread(target=request) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(statuses, [200] * 8)
+        self.assertEqual(render.call_count, 1)
+
+
+class ResizeCacheTests(TestCase):
+    """
+        Methods:
+            setUp
+            tearDown
+            test_least_recently_used_entries_are_evicted
+            test_entry_being_written_survives_eviction
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+            Confirm that once the byte budget is exceeded, the entry read longest ago is deleted first.
+        """
+
+        cache = ResizeCache(self.directory, max_bytes=300)
+        for number, key in enumerate(('a', 'b', 'c')):
+            cache.put(key, b'x' * 100)
+            # give every entry a distinct, increasing modification time
+            os.utime(cache.path_for(key), (1000 + number, 1000 + number))
+
+        # reading 'a' makes 'b' the least recently used
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', b'x' * 100)
+
+        self.assertIsNone(cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertIsNotNone(cache.get(key))
+
+    def test_entry_being_written_survives_eviction(self):
+        """
+            Confirm that an entry larger than the whole budget is still kept long enough to be served.
+        """
+
+        cache = ResizeCache(self.directory, max_bytes=50)
+        cache.put('small', b'x' * 40)
+        path = cache.put('large', b'x' * 100)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertIsNone(cache.get('small'))
@@ -0,0 +1,170 @@
+# unittest
+import unittest
+from django.test import TestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# search index
+from app.search import index_animals_after, rebuild_search_index, search_animals
+from app.utils import establish_facets, establish_query, get_catalog_cache, paginate_animals
+# tools
+import datetime
+from django.utils.timezone import make_aware
+
+
+def search_animal_ids(search_text):
+    """Returns the ids of the animals matching the search text, best match first"""
+
+    return list(search_animals(Animal.objects.all(), search_text).order_by('search_rank', 'pk').values_list('pk', flat=True))
+
+
+class AnimalSearchTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Templates:
+            available_animals.html
+        Views:
+            available_animals.py
+        Methods:
+            setUpClass
+            setUp
+            test_search_matches_name_prefix
+            test_search_covers_breed_color_and_description
+            test_name_matches_rank_first
+            test_adopted_animal_leaves_index
+            test_renamed_breed_is_reindexed
+            test_deleted_animal_leaves_index
+            test_rebuild_search_index
+            test_search_page_uses_index
+            test_broad_search_is_not_capped
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(AnimalSearchTests, cls).setUpClass()
+
+        staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+
+        cls.tabby = Breed.objects.create(breed='tabby')
+        retriever = Breed.objects.create(breed='golden retriever')
+        orange = Color.objects.create(color='orange')
+        black = Color.objects.create(color='black')
+        cat = Species.objects.create(species='cat')
+        dog = Species.objects.create(species='dog')
+
+        # create animal instances
+        cls.kiwi = Animal.objects.create(name='Kiwi', age='2015-03-17', sex='F', description='Loves the sunny window.', breed=cls.tabby, color=orange, species=cat, staff=staff, arrival_date='2019-03-18')
+        cls.biscuit = Animal.objects.create(name='Biscuit', age='2016-03-17', sex='M', description='Best friends with Kiwi.', breed=retriever, color=black, species=dog, staff=staff, arrival_date='2019-03-18')
+        cls.rex = Animal.objects.create(name='Rex', age='2012-03-17', sex='M', description='A calm old dog.', breed=retriever, color=orange, species=dog, staff=staff, arrival_date='2019-03-18')
+
+    def setUp(self):
+        # cached pages can outlive the rolled-back data of an earlier test
+        get_catalog_cache().clear()
+
+    def test_search_matches_name_prefix(self):
+        """
+            Confirm that a partial name finds the animal.
+        """
+
+        self.assertEqual(search_animal_ids('kiw')[0], self.kiwi.id)
+        self.assertEqual(search_animal_ids('bisc'), [self.biscuit.id])
+
+    def test_search_covers_breed_color_and_description(self):
+        """
+            Confirm that breed, color, and description text are searchable.
+        """
+
+        self.assertEqual(search_animal_ids('tabby'), [self.kiwi.id])
+        self.assertEqual(set(search_animal_ids('orange')), {self.kiwi.id, self.rex.id})
+        self.assertEqual(search_animal_ids('calm'), [self.rex.id])
+        self.assertEqual(search_animal_ids('golden black'), [self.biscuit.id])
+
+    def test_name_matches_rank_first(self):
+        """
+            Confirm that an animal named in the search outranks one that only mentions the word in its description.
+        """
+
+        results = list(establish_query(None, None, 'kiwi'))
+        self.assertEqual(results, [self.kiwi, self.biscuit])
+
+    def test_adopted_animal_leaves_index(self):
+        """
+            Confirm that adopting an animal removes it from search results.
+        """
+
+        kiwi = Animal.objects.get(pk=self.kiwi.id)
+        kiwi.date_adopted = make_aware(datetime.datetime(2019, 3, 20))
+        kiwi.save()
+        self.assertEqual(search_animal_ids('kiwi'), [self.biscuit.id])
+
+    def test_renamed_breed_is_reindexed(self):
+        """
+            Confirm that renaming a breed updates the indexed animals.
+        """
+
+        tabby = Breed.objects.get(pk=self.tabby.id)
+        tabby.breed = 'calico'
+        tabby.save()
+        self.assertEqual(search_animal_ids('tabby'), [])
+        self.assertEqual(search_animal_ids('calico'), [self.kiwi.id])
+
+    def test_deleted_animal_leaves_index(self):
+        """
+            Confirm that deleting an animal removes it from the index.
+        """
+
+        Animal.objects.get(pk=self.rex.id).delete()
+        self.assertNotIn(self.rex.id, search_animal_ids('orange'))
+
+    def test_rebuild_search_index(self):
+        """
+            Confirm that a rebuild indexes every unadopted animal.
+        """
+
+        self.assertEqual(rebuild_search_index(), 3)
+        self.assertEqual(search_animal_ids('rex'), [self.rex.id])
+
+    def test_search_page_uses_index(self):
+        """
+            Confirm that the search page lists matches from the index.
+        """
+
+        response = self.client.get(reverse('app:search_pets'), {'animal_species': 'None', 'animal_age': 'None', 'name_query': 'retriever'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Biscuit', response.content)
+        self.assertIn(b'Rex', response.content)
+        self.assertNotIn(b'Kiwi</h5>', response.content)
+
+    def test_broad_search_is_not_capped(self):
+        """
+            Confirm that a search matching hundreds of animals pages through and counts every one of them.
+        """
+
+        kiwi = Animal.objects.get(pk=self.kiwi.id)
+        last_id = Animal.objects.order_by('-pk').values_list('pk', flat=True).first()
+        Animal.objects.bulk_create([Animal(name=f'Pepper {number}', age=kiwi.age, sex='F', breed=kiwi.breed, color=kiwi.color, species=kiwi.species, staff=kiwi.staff, arrival_date=kiwi.arrival_date) for number in range(600)])
+        index_animals_after(last_id)
+
+        seen = list()
+        animals, cursor = paginate_animals(establish_query(None, None, 'pepper'), page_size=100)
+        seen += animals
+        while cursor is not None:
+            animals, cursor = paginate_animals(establish_query(None, None, 'pepper'), cursor, page_size=100)
+            seen += animals
+
+        self.assertEqual(len({animal.pk for animal in seen}), 600)
+        self.assertEqual(establish_facets(None, None, 'pepper')['species']['cat'], 600)
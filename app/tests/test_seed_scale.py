@@ -0,0 +1,144 @@
+# unittest
+import unittest
+from django.test import TestCase
+# models
+from app.models import Activity, ActivityVolunteer, Animal, Application, CustomUser, Species, Volunteer, determine_age_group
+# synthetic data
+from app.seeding import seed_scale
+from app.search import search_animals
+# tools
+import datetime
+import io
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+SCALE = {'users': 20, 'animals': 30, 'applications': 90, 'activities': 6}
+
+TODAY = datetime.date(2019, 3, 18)
+
+
+def snapshot():
+    """Returns the generated rows with related rows named instead of numbered, so two runs can be compared"""
+
+    return (
+        list(CustomUser.objects.order_by('email').values_list('email', 'first_name', 'last_name', 'is_staff', 'date_joined')),
+        list(Animal.objects.order_by('pk').values_list('name', 'age', 'species__species', 'breed__breed', 'color__color', 'sex', 'description', 'arrival_date', 'date_adopted')),
+        list(Application.objects.order_by('pk').values_list('animal__name', 'user__email', 'approved', 'date_submitted', 'text')),
+        list(ActivityVolunteer.objects.order_by('pk').values_list('activity__activity', 'activity__date', 'volunteer__email')),
+    )
+
+
+class SeedScaleTests(TestCase):
+    """
+        Models:
+            Activity
+            ActivityVolunteer
+            Animal
+            Application
+            CustomUser
+            Species
+            Volunteer
+        Methods:
+            seeded_snapshot
+            test_rows_are_created_at_scale
+            test_same_seed_generates_same_data
+            test_generated_data_is_consistent
+            test_users_can_log_in
+            test_inserts_are_chunked
+            test_command_refuses_a_seed_twice
+    """
+
+    def seeded_snapshot(self, seed):
+        """Seeds with a seed, returns the snapshot, and rolls the rows back"""
+
+        with transaction.atomic():
+            seed_scale(seed=seed, today=TODAY, **SCALE)
+            rows = snapshot()
+            transaction.set_rollback(True)
+        return rows
+
+    def test_rows_are_created_at_scale(self):
+        """
+            Confirm that the requested number of rows is created in each table, with a volunteer record for every user.
+        """
+
+        created = seed_scale(today=TODAY, **SCALE)
+
+        self.assertEqual(created['CustomUser'], 20)
+        self.assertEqual(created['Animal'], 30)
+        self.assertEqual(created['Application'], 90)
+        self.assertEqual(created['Activity'], 6)
+        self.assertEqual(Volunteer.objects.count(), CustomUser.objects.count())
+        self.assertEqual(created['ActivityVolunteer'], ActivityVolunteer.objects.count())
+        self.assertEqual(CustomUser.objects.filter(is_staff=True).count(), 1)
+
+    def test_same_seed_generates_same_data(self):
+        """
+            Confirm that a seed always generates the same rows and another seed generates different ones.
+        """
+
+        first = self.seeded_snapshot(3)
+
+        self.assertEqual(self.seeded_snapshot(3), first)
+        self.assertNotEqual(self.seeded_snapshot(4)[1], first[1])
+
+    def test_generated_data_is_consistent(self):
+        """
+            Confirm that every adopted animal has at most one approved application, stored signup counts match the signups, age groups are set, and unadopted animals are searchable.
+        """
+
+        seed_scale(today=TODAY, **SCALE)
+
+        approved = Application.objects.filter(approved=True).values('animal').annotate(count=Count('pk'))
+        self.assertTrue(all(row['count'] == 1 for row in approved))
+        self.assertFalse(Application.objects.filter(approved=True, animal__date_adopted=None).exists())
+
+        for activity in Activity.objects.annotate(signups=Count('activityvolunteer')):
+            self.assertEqual(activity.signup_count, activity.signups)
+            self.assertLessEqual(activity.signup_count, activity.max_attendance)
+
+        animal = Animal.objects.filter(date_adopted=None).first()
+        self.assertEqual(animal.age_group, determine_age_group(animal.age, TODAY))
+        self.assertIn(animal, search_animals(Animal.objects.all(), animal.name))
+        self.assertEqual(Species.objects.filter(species='cat').count(), 1)
+
+    def test_users_can_log_in(self):
+        """
+            Confirm that generated users share the given password (hashed once).
+        """
+
+        seed_scale(today=TODAY, password='secret', **SCALE)
+
+        self.assertEqual(CustomUser.objects.values('password').distinct().count(), 1)
+        self.assertTrue(self.client.login(email='volunteer5@seed0.example.com', password='secret'))
+
+    def test_inserts_are_chunked(self):
+        """
+            Confirm that the number of queries grows with the number of chunks, not the number of rows (kept here under the 999 parameters SQLite takes per INSERT, past which Django splits a chunk further).
+        """
+
+        counts = list()
+        for rows in (10, 50):
+            with CaptureQueriesContext(connection) as queries:
+                with transaction.atomic():
+                    seed_scale(today=TODAY, users=rows, animals=rows, applications=2 * rows, activities=2)
+                    transaction.set_rollback(True)
+            counts.append(len(queries))
+        small, large = counts
+
+        self.assertEqual(large, small)
+
+    def test_command_refuses_a_seed_twice(self):
+        """
+            Confirm that the seed_scale command reports what it created and won't load the same seed again.
+        """
+
+        output = io.StringIO()
+        call_command('seed_scale', '--users', '5', '--animals', '5', '--applications', '5', '--activities', '1', '--seed', '9', stdout=output)
+
+        self.assertIn('Animal: 5 rows', output.getvalue())
+        with self.assertRaisesRegex(CommandError, 'Seed 9 has already been loaded'):
+            call_command('seed_scale', '--users', '5', '--seed', '9', stdout=io.StringIO())
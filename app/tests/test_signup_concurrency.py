@@ -0,0 +1,62 @@
+# unittest
+import unittest
+from app.tests.base import SequenceResetTestCase, run_concurrently
+# models
+from app.models import Activity, ActivityVolunteer, CustomUser
+# tools
+from app.utils import sign_up_volunteer, ACTIVITY_FULL, ALREADY_SIGNED_UP, SIGNED_UP
+
+
+class SignupConcurrencyTests(SequenceResetTestCase):
+    """
+        Models:
+            Activity
+            ActivityVolunteer
+            CustomUser
+        Methods:
+            setUp
+            test_concurrent_signups_never_exceed_capacity
+            test_repeat_signup_is_rejected
+    """
+
+    # number of users racing for the activity, and the activity's capacity
+    USERS = 200
+    CAPACITY = 25
+
+    def setUp(self):
+        """Creates a staff member, an upcoming activity, and USERS volunteers (bulk created, so no password hashing)"""
+
+        staff = CustomUser.objects.create(first_name='Test_firstname', last_name='Test_lastname', email='test_admin@test.com', is_staff=True)
+        self.activity = Activity.objects.create(activity='Test_activity_upcoming', description='Test description', staff=staff, max_attendance=self.CAPACITY, date='2050-03-20', start_time='10:00:00', end_time='11:00:00', activity_type='dogs', cancelled=None)
+        CustomUser.objects.bulk_create([
+            CustomUser(first_name=f'first{number}', last_name=f'last{number}', email=f'volunteer{number}@test.com')
+            for number in range(self.USERS)
+        ])
+        self.volunteers = list(CustomUser.objects.filter(is_staff=False))
+
+    def test_concurrent_signups_never_exceed_capacity(self):
+        """
+            Start every volunteer's signup at once (each user clicks twice) and confirm that the activity is filled exactly to capacity, with a join row for every counted spot.
+        """
+
+        def sign_up(volunteer):
+            return [sign_up_volunteer(volunteer, self.activity.id) for _ in range(2)]
+
+        results = [result for clicks in run_concurrently(sign_up, [(volunteer,) for volunteer in self.volunteers]) for result in clicks]
+
+        activity = Activity.objects.get(pk=self.activity.id)
+        self.assertEqual(activity.signup_count, self.CAPACITY)
+        self.assertEqual(ActivityVolunteer.objects.filter(activity=activity).count(), self.CAPACITY)
+        self.assertEqual(results.count(SIGNED_UP), self.CAPACITY)
+        self.assertEqual(len(results), self.USERS * 2)
+
+    def test_repeat_signup_is_rejected(self):
+        """
+            Confirm that signing up twice keeps a single join row and a single counted spot.
+        """
+
+        volunteer = self.volunteers[0]
+        self.assertEqual(sign_up_volunteer(volunteer, self.activity.id), SIGNED_UP)
+        self.assertEqual(sign_up_volunteer(volunteer, self.activity.id), ALREADY_SIGNED_UP)
+        self.assertEqual(Activity.objects.get(pk=self.activity.id).signup_count, 1)
+        self.assertEqual(ActivityVolunteer.objects.filter(volunteer=volunteer).count(), 1)
@@ -0,0 +1,114 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# database tuning
+from app.sqlite import checkpoint_and_optimize
+# tools
+import io
+import os
+import shutil
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+class SqlitePragmaTests(TestCase):
+    """
+        Methods:
+            setUp
+            tearDown
+            file_connection
+            pragma
+            test_new_connections_are_tuned
+            test_pragmas_come_from_settings
+            test_invalid_pragma_is_refused
+            test_checkpoint_empties_the_log
+            test_command_reports_checkpoint
+    """
+
+    def setUp(self):
+        """Creates a directory for a database file, so connections can be opened with settings other than the test database's"""
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def file_connection(self):
+        """Returns a new, connected database wrapper for a SQLite file in the temporary directory"""
+
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(self.directory, 'tuned.sqlite3')}, alias='tuned')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        """Returns the current value of a pragma"""
+
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        """
+            Confirm that a new connection is switched to WAL with a busy timeout, NORMAL syncing, a memory map, and a larger page cache.
+        """
+
+        wrapper = self.file_connection()
+
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        # 1 is NORMAL
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -65536)
+        self.assertGreater(self.pragma(wrapper, 'mmap_size'), 0)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 250, 'cache_size': -2000})
+    def test_pragmas_come_from_settings(self):
+        """
+            Confirm that only the pragmas in SQLITE_PRAGMAS are applied.
+        """
+
+        wrapper = self.file_connection()
+
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 250)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2000)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'wal; DROP TABLE app_animal'})
+    def test_invalid_pragma_is_refused(self):
+        """
+            Confirm that a pragma value that isn't a plain word or number is refused rather than run.
+        """
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.file_connection()
+
+    def test_checkpoint_empties_the_log(self):
+        """
+            Confirm that a truncating checkpoint copies the write-ahead log into the database file and empties it.
+        """
+
+        wrapper = self.file_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE kiwi (id INTEGER PRIMARY KEY, name TEXT)')
+            cursor.executemany('INSERT INTO kiwi (name) VALUES (%s)', [(f'kiwi {number}',) for number in range(500)])
+        self.assertGreater(os.path.getsize(os.path.join(self.directory, 'tuned.sqlite3-wal')), 0)
+
+        busy, _, _ = checkpoint_and_optimize(wrapper)
+
+        self.assertEqual(busy, 0)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, 'tuned.sqlite3-wal')), 0)
+
+    def test_command_reports_checkpoint(self):
+        """
+            Confirm that the sqlite_maintenance command checkpoints the test database's write-ahead log and refreshes the query planner statistics.
+        """
+
+        output = io.StringIO()
+        call_command('sqlite_maintenance', stdout=output)
+
+        self.assertRegex(output.getvalue(), r'Checkpointed \d+ of \d+ WAL pages')
+        self.assertIn('Refreshed query planner statistics', output.getvalue())
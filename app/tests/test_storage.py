@@ -0,0 +1,231 @@
+# unittest
+import unittest
+from django.test import RequestFactory, TestCase, override_settings
+from app.tests.base import SequenceResetTestCase
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# storage
+from app.images import derivative_name
+from app.jobs import enqueue_image_job, run_image_jobs
+from app.views import serve_media
+# tools
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+# uploads land in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(color, image_format='JPEG'):
+    """Returns the bytes of a small solid color image (a JPEG unless another format is given)"""
+
+    output = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(output, image_format)
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    """
+        Views:
+            media.py
+        Methods:
+            tearDownClass
+            test_name_is_sharded_content_hash
+            test_extension_follows_detected_format
+            test_identical_uploads_are_stored_once
+            test_derived_images_keep_their_name
+            test_content_addressed_file_is_cached_forever
+            test_other_files_are_revalidated
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super(ContentAddressedStorageTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_name_is_sharded_content_hash(self):
+        """
+            Confirm that an upload is named by the SHA-256 of its content, sharded into two directory levels, with the extension of its image format.
+        """
+
+        content = make_jpeg('yellow')
+        digest = hashlib.sha256(content).hexdigest()
+
+        name = default_storage.save('media/Kiwi Photo.JPEG', ContentFile(content))
+        self.assertEqual(name, f'media/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertTrue(default_storage.exists(name))
+
+    def test_extension_follows_detected_format(self):
+        """
+            Confirm that the client's extension doesn't split identical photos into two files, and that a mislabelled upload gets its real format's extension (content Pillow can't read keeps the lowercased client extension).
+        """
+
+        jpg = default_storage.save('media/kiwi.jpg', ContentFile(make_jpeg('teal')))
+        jpeg = default_storage.save('media/kiwi.JPEG', ContentFile(make_jpeg('teal')))
+        png = default_storage.save('media/kiwi.jpg', ContentFile(make_jpeg('teal', 'PNG')))
+        text = default_storage.save('media/notes.TXT', ContentFile(b'kiwi'))
+
+        self.assertEqual(jpg, jpeg)
+        self.assertTrue(png.endswith('.png'))
+        self.assertTrue(text.endswith('.txt'))
+
+    def test_identical_uploads_are_stored_once(self):
+        """
+            Confirm that saving the same content twice under different client names returns the same name and stores one file.
+        """
+
+        first = default_storage.save('media/kiwi.jpg', ContentFile(make_jpeg('red')))
+        second = default_storage.save('media/kiwi_again.jpg', ContentFile(make_jpeg('red')))
+        other = default_storage.save('media/kiwi.jpg', ContentFile(make_jpeg('blue')))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(os.listdir(os.path.dirname(default_storage.path(first)))), 1)
+
+    def test_derived_images_keep_their_name(self):
+        """
+            Confirm that derived images are stored under the name derived from their upload.
+        """
+
+        name = derivative_name('media/1a/5a/1a5afeda973d776e31d1d7266f184468f84d99bed311d88d3dcb67015934f9f9.jpg', 'card')
+        self.assertEqual(default_storage.save(name, ContentFile(b'card')), name)
+        self.assertTrue(default_storage.is_immutable(name))
+
+    def test_content_addressed_file_is_cached_forever(self):
+        """
+            Confirm that a content-addressed upload is served with a far-future immutable Cache-Control header.
+        """
+
+        name = default_storage.save('media/kiwi.jpg', ContentFile(make_jpeg('green')))
+        response = serve_media(RequestFactory().get(f'/{name}'), name)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_other_files_are_revalidated(self):
+        """
+            Confirm that a file whose name doesn't change with its content (e.g. the placeholder) must be revalidated.
+        """
+
+        default_storage.save('media/derived/placeholder.jpg', ContentFile(b'placeholder'))
+        response = serve_media(RequestFactory().get('/media/derived/placeholder.jpg'), 'media/derived/placeholder.jpg')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageGarbageCollectionTests(SequenceResetTestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Views:
+            available_animals.py
+        Methods:
+            setUp
+            edit_image
+            sweep
+            test_replaced_image_is_left_for_the_sweeper
+            test_shared_image_is_kept
+            test_reupload_of_replaced_image_is_served
+    """
+
+    def setUp(self):
+        """Creates a staff member and two animals that share one uploaded photo"""
+
+        self.staff = CustomUser.objects.create_user(first_name='Test_firstname', last_name='Test_lastname', email='test_admin@test.com', password='secret', is_staff=True)
+        breed = Breed.objects.create(breed='domestic longhair')
+        color = Color.objects.create(color='black')
+        species = Species.objects.create(species='cat')
+
+        self.animals = list()
+        for name in ('Kiwi', 'Rex'):
+            animal = Animal(name=name, age='2018-03-18', sex='F', description='This is the pet\'s description.', breed=breed, color=color, species=species, staff=self.staff, arrival_date='2019-03-18')
+            animal.image = SimpleUploadedFile('shared.jpg', make_jpeg('orange'), content_type='image/jpeg')
+            animal.save()
+            self.animals.append(animal)
+
+        self.shared_image = self.animals[0].image.name
+        self.client.login(email='test_admin@test.com', password='secret')
+
+    def edit_image(self, animal, color):
+        """Uploads a new photo for an animal through the edit form"""
+
+        animal = Animal.objects.get(pk=animal.id)
+        form_data = {
+            'name': animal.name,
+            'age': '2018-03-18',
+            'sex': 'F',
+            'description': animal.description,
+            'breed': animal.breed_id,
+            'color': animal.color_id,
+            'species': animal.species_id,
+            'staff': self.staff.id,
+            'arrival_date': '2019-03-18',
+            'image': SimpleUploadedFile('new.jpg', make_jpeg(color), content_type='image/jpeg'),
+        }
+        response = self.client.post(reverse('app:animal_edit', args=(animal.id,)), form_data)
+        self.assertEqual(response.status_code, 302)
+
+    def sweep(self):
+        """Runs sweep_orphaned_media with no grace period"""
+
+        call_command('sweep_orphaned_media', '--grace-hours', '0', stdout=io.StringIO())
+
+    def test_replaced_image_is_left_for_the_sweeper(self):
+        """
+            Confirm that replacing a photo leaves the file in place, and that the sweeper deletes it with its derived sizes once no animal uses it.
+        """
+
+        self.assertEqual(self.shared_image, self.animals[1].image.name)
+        enqueue_image_job(self.animals[0])
+        run_image_jobs()
+        self.assertTrue(default_storage.exists(derivative_name(self.shared_image, 'card')))
+
+        self.edit_image(self.animals[0], 'purple')
+        self.edit_image(self.animals[1], 'purple')
+        self.assertTrue(default_storage.exists(self.shared_image))
+
+        self.sweep()
+
+        self.assertFalse(default_storage.exists(self.shared_image))
+        self.assertFalse(default_storage.exists(derivative_name(self.shared_image, 'card')))
+        self.assertTrue(default_storage.exists(Animal.objects.get(pk=self.animals[0].id).image.name))
+
+    def test_shared_image_is_kept(self):
+        """
+            Confirm that the sweeper keeps a replaced photo another animal still uses.
+        """
+
+        self.edit_image(self.animals[0], 'purple')
+        self.sweep()
+
+        self.assertTrue(default_storage.exists(self.shared_image))
+        self.assertEqual(Animal.objects.get(pk=self.animals[1].id).image.name, self.shared_image)
+
+    def test_reupload_of_replaced_image_is_served(self):
+        """
+            Confirm that uploading a photo again right after every animal stopped using it reuses a file that is still there.
+        """
+
+        self.edit_image(self.animals[0], 'purple')
+        self.edit_image(self.animals[1], 'purple')
+        self.edit_image(self.animals[0], 'orange')
+
+        self.assertEqual(Animal.objects.get(pk=self.animals[0].id).image.name, self.shared_image)
+        self.assertTrue(default_storage.exists(self.shared_image))
@@ -0,0 +1,163 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# storage
+from app.images import derivative_name
+# tools
+import io
+import os
+import shutil
+import tempfile
+import time
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# the swept files live in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# two days ago, well outside the default grace period
+OLD = time.time() - 48 * 3600
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SweepOrphanedMediaTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Methods:
+            setUp
+            tearDown
+            tearDownClass
+            save_file
+            sweep
+            test_unreferenced_files_are_deleted
+            test_referenced_files_are_kept
+            test_recent_files_are_kept
+            test_dry_run_deletes_nothing
+            test_reupload_restarts_grace_period
+            test_derived_sizes_are_matched_by_exact_name
+    """
+
+    def setUp(self):
+        """Stores an animal's photo with its derived sizes, a photo no animal uses with its derived sizes, a legacy upload, and the placeholder, all two days old"""
+
+        staff = CustomUser.objects.create_user(first_name='Test_firstname', last_name='Test_lastname', email='test_admin@test.com', password='secret', is_staff=True)
+
+        self.kept = self.save_file('media/kiwi.jpg', b'kiwi')
+        self.orphan = self.save_file('media/rex.jpg', b'rex')
+        # written before uploads were content-addressed, under their client name
+        self.legacy_orphan = self.save_file('media/old_photo.png', b'old', raw=True)
+        self.placeholder = self.save_file('media/placeholder.jpg', b'placeholder', raw=True)
+        self.kept_derived = [self.save_file(derivative_name(self.kept, size), b'derived') for size in ('thumb', 'card')]
+        self.orphan_derived = [self.save_file(derivative_name(self.orphan, size), b'derived') for size in ('thumb', 'card')]
+        self.legacy_derived = self.save_file(derivative_name('media/old_photo.png', 'detail'), b'derived')
+
+        Animal.objects.create(name='Kiwi', age='2018-03-18', sex='F', description='This is the pet\'s description.', image=self.kept, breed=Breed.objects.create(breed='domestic longhair'), color=Color.objects.create(color='black'), species=Species.objects.create(species='cat'), staff=staff, arrival_date='2019-03-18')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'media'), ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super(SweepOrphanedMediaTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def save_file(self, name, content, modified=OLD, raw=False):
+        """Stores a file (through the storage, or with raw=True under exactly this name), backdates it, and returns its storage name"""
+
+        if raw:
+            os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+            with open(default_storage.path(name), 'wb') as raw_file:
+                raw_file.write(content)
+        else:
+            name = default_storage.save(name, ContentFile(content))
+        os.utime(default_storage.path(name), (modified, modified))
+        return name
+
+    def sweep(self, *args):
+        """Runs the command and returns its output"""
+
+        output = io.StringIO()
+        call_command('sweep_orphaned_media', *args, stdout=output)
+        return output.getvalue()
+
+    def test_unreferenced_files_are_deleted(self):
+        """
+            Confirm that uploads no animal uses are deleted along with their derived sizes, in batches smaller than the number of files.
+        """
+
+        output = self.sweep('--batch-size', '2')
+
+        for name in [self.orphan, self.legacy_orphan, self.legacy_derived, *self.orphan_derived]:
+            self.assertFalse(default_storage.exists(name), name)
+        self.assertIn('Deleted 5 orphaned files', output)
+
+    def test_referenced_files_are_kept(self):
+        """
+            Confirm that an animal's photo, its derived sizes, and the placeholder are never deleted.
+        """
+
+        self.sweep()
+
+        for name in [self.kept, self.placeholder, *self.kept_derived]:
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_recent_files_are_kept(self):
+        """
+            Confirm that an unreferenced file changed within the grace period is kept until the period is over.
+        """
+
+        recent = self.save_file('media/new_upload.jpg', b'new', modified=time.time() - 3600)
+
+        self.sweep()
+        self.assertTrue(default_storage.exists(recent))
+
+        self.sweep('--grace-hours', '0.5')
+        self.assertFalse(default_storage.exists(recent))
+
+    def test_dry_run_deletes_nothing(self):
+        """
+            Confirm that a dry run lists the orphaned files without deleting them.
+        """
+
+        output = self.sweep('--dry-run')
+
+        self.assertIn(self.orphan, output)
+        self.assertNotIn(self.kept, output)
+        self.assertIn('Found 5 orphaned files', output)
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_reupload_restarts_grace_period(self):
+        """
+            Confirm that uploading the content of an old orphaned file again touches it, so the sweep leaves it for its new animal.
+        """
+
+        self.assertEqual(default_storage.save('media/rex_again.jpg', ContentFile(b'rex')), self.orphan)
+
+        self.sweep()
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_derived_sizes_are_matched_by_exact_name(self):
+        """
+            Confirm that the derived sizes of a legacy upload with an upper-case extension are kept, and that their upload is looked up by exact name rather than a LIKE prefix SQLite can't use the index for.
+        """
+
+        legacy = self.save_file('media/kiwi_tree.JPG', b'tree', raw=True)
+        legacy_derived = self.save_file(derivative_name(legacy, 'card'), b'derived')
+        Animal.objects.filter(pk=Animal.objects.get(name='Kiwi').pk).update(image=legacy)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.sweep()
+
+        self.assertTrue(default_storage.exists(legacy_derived))
+        self.assertFalse(default_storage.exists(self.kept_derived[0]))
+        self.assertFalse(any('LIKE' in query['sql'] for query in queries.captured_queries))
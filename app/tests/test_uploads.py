@@ -0,0 +1,203 @@
+# unittest
+import unittest
+from django.test import TestCase, override_settings
+# HTTP
+from django.urls import reverse
+# models
+from app.models import Animal, Breed, Color, CustomUser, Species
+# uploads
+from app.forms import BoundedImageField
+from app.uploads import HashingFileUploadHandler
+# tools
+import hashlib
+import io
+import shutil
+import struct
+import tempfile
+import zlib
+from django import forms
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from PIL import Image
+
+# uploads land in a throwaway directory instead of the project's media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(width, height, mode='RGB'):
+    """Returns the bytes of a solid color JPEG of the given size"""
+
+    output = io.BytesIO()
+    Image.new(mode, (width, height), (200, 120, 40) if mode == 'RGB' else 128).save(output, 'JPEG')
+    return output.getvalue()
+
+
+def make_png_header(width, height):
+    """Returns a PNG whose header claims the given size but which holds no pixel data (enough for Image.open, which only reads the header)"""
+
+    def chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PhotoUploadTests(TestCase):
+    """
+        Models:
+            Animal
+            Breed
+            Color
+            CustomUser
+            Species
+        Views:
+            new_arrival.py
+        Methods:
+            setUpClass
+            tearDownClass
+            post_new_arrival
+            test_handler_streams_to_disk_and_hashes
+            test_storage_reuses_upload_hash
+            test_small_photo_is_stored_as_uploaded
+            test_large_photo_is_stored_as_downscaled_master
+            test_grayscale_photo_is_downscaled
+            test_too_many_pixels_is_refused_from_header
+            test_undecodable_size_is_refused
+            test_non_image_is_refused
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Creates instances of database objects before running each test in this class"""
+
+        super(PhotoUploadTests, cls).setUpClass()
+
+        cls.staff = CustomUser.objects.create_user(
+            first_name='Test_firstname',
+            last_name='Test_lastname',
+            email='test_admin@test.com',
+            password='secret',
+            is_staff=True,
+        )
+        cls.breed = Breed.objects.create(breed='domestic longhair')
+        cls.color = Color.objects.create(color='black')
+        cls.species = Species.objects.create(species='cat')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(PhotoUploadTests, cls).tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def post_new_arrival(self, image_bytes, filename='photo.jpg'):
+        """Posts the new arrival form with an uploaded photo as a staff user and returns the response"""
+
+        self.client.login(email='test_admin@test.com', password='secret')
+        form_data = {
+            'name': 'test_animal',
+            'age': '2018-03-18',
+            'sex': 'F',
+            'description': 'This is the pet\'s description.',
+            'breed': self.breed.id,
+            'color': self.color.id,
+            'species': self.species.id,
+            'staff': self.staff.id,
+            'arrival_date': '2019-03-18',
+            'image': SimpleUploadedFile(filename, image_bytes),
+        }
+        return self.client.post(reverse('app:new_arrival'), form_data)
+
+    def test_handler_streams_to_disk_and_hashes(self):
+        """
+            Confirm that the upload handler writes even a small upload to a temporary file and records its SHA-256.
+        """
+
+        content = make_jpeg(50, 50)
+        handler = HashingFileUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', len(content))
+        for start in range(0, len(content), 100):
+            handler.receive_data_chunk(content[start:start + 100], start)
+        uploaded_file = handler.file_complete(len(content))
+
+        self.assertIsInstance(uploaded_file, TemporaryUploadedFile)
+        self.assertEqual(uploaded_file.sha256, hashlib.sha256(content).hexdigest())
+        uploaded_file.close()
+
+    def test_storage_reuses_upload_hash(self):
+        """
+            Confirm that the storage names a file by the hash the upload handler computed instead of reading it again.
+        """
+
+        uploaded_file = SimpleUploadedFile('photo.jpg', b'kiwi')
+        uploaded_file.sha256 = 'ab' * 32
+
+        self.assertEqual(default_storage.save('media/photo.jpg', uploaded_file), 'media/ab/ab/' + 'ab' * 32 + '.jpg')
+
+    def test_small_photo_is_stored_as_uploaded(self):
+        """
+            Confirm that a photo within the master size is stored byte for byte, under the hash of the upload.
+        """
+
+        content = make_jpeg(1200, 800)
+        self.assertEqual(self.post_new_arrival(content).status_code, 302)
+
+        animal = Animal.objects.get(name='test_animal')
+        self.assertIn(hashlib.sha256(content).hexdigest(), animal.image.name)
+        with default_storage.open(animal.image.name) as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_large_photo_is_stored_as_downscaled_master(self):
+        """
+            Confirm that a photo larger than the master size is stored as a JPEG master that fits IMAGE_MASTER_MAX_EDGE.
+        """
+
+        self.assertEqual(self.post_new_arrival(make_jpeg(6000, 4000), filename='big.JPG').status_code, 302)
+
+        animal = Animal.objects.get(name='test_animal')
+        self.assertTrue(animal.image.name.endswith('.jpg'))
+        with default_storage.open(animal.image.name) as stored:
+            self.assertEqual(Image.open(stored).size, (2048, 1365))
+
+    def test_grayscale_photo_is_downscaled(self):
+        """
+            Confirm that a grayscale JPEG is decoded at reduced scale and stored as an RGB master.
+        """
+
+        field = BoundedImageField()
+        master = field.clean(SimpleUploadedFile('gray.jpg', make_jpeg(4096, 4096, mode='L')))
+
+        image = Image.open(master)
+        self.assertEqual((image.size, image.mode), ((2048, 2048), 'RGB'))
+
+    def test_too_many_pixels_is_refused_from_header(self):
+        """
+            Confirm that a photo with more pixels than IMAGE_UPLOAD_MAX_PIXELS is refused, without decoding it, and no animal is saved.
+        """
+
+        field = BoundedImageField()
+        with self.assertRaises(forms.ValidationError) as error:
+            field.clean(SimpleUploadedFile('huge.png', make_png_header(10000, 8000)))
+        self.assertEqual(error.exception.code, 'too_many_pixels')
+
+        self.assertEqual(self.post_new_arrival(make_png_header(10000, 8000), filename='huge.png').status_code, 200)
+        self.assertFalse(Animal.objects.filter(name='test_animal').exists())
+
+    def test_undecodable_size_is_refused(self):
+        """
+            Confirm that a large photo in a format that can't be decoded at reduced scale is refused when it would exceed IMAGE_UPLOAD_MAX_DECODED_PIXELS.
+        """
+
+        field = BoundedImageField()
+        with self.assertRaises(forms.ValidationError) as error:
+            field.clean(SimpleUploadedFile('wide.png', make_png_header(6000, 4000)))
+        self.assertEqual(error.exception.code, 'too_large_to_decode')
+
+    def test_non_image_is_refused(self):
+        """
+            Confirm that a file that isn't an image is refused as invalid.
+        """
+
+        field = BoundedImageField()
+        with self.assertRaises(forms.ValidationError) as error:
+            field.clean(SimpleUploadedFile('notes.jpg', b'not an image'))
+        self.assertEqual(error.exception.code, 'invalid_image')
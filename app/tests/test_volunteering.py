@@ -5,6 +5,10 @@ from django.test import TestCase
 from django.urls import reverse
 # models
 from app.models import Activity, ActivityVolunteer, CustomUser, Volunteer
+# tools
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app.utils import sign_up_volunteer
 
 
 class VolunteeringTests(TestCase):
@@ -24,6 +28,7 @@ class VolunteeringTests(TestCase):
             test_unauth_user_can_view_list_activities
             test_auth_user_can_view_list_activities
             test_staff_user_can_view_list_activities
+            test_list_activities_query_count_is_constant
             test_unauth_user_can_view_upcoming_activity_details
             test_auth_user_can_view_upcoming_activity_details
             test_staff_user_can_view_upcoming_activity_details
@@ -160,6 +165,35 @@ class VolunteeringTests(TestCase):
         response = self.client.get(reverse('app:list_volunteering'))
         self.assertEqual(response.status_code, 200)
 
+    def test_list_activities_query_count_is_constant(self):
+        """
+            Validate that the list of activities makes the same number of queries no matter how many activities and signups there are, and still shows signups and open spots.
+        """
+
+        self.client.login(email='test_auth@test.com', password='secret2')
+        auth_user = CustomUser.objects.get(email='test_auth@test.com')
+        staff = CustomUser.objects.get(email='test_admin@test.com')
+
+        with CaptureQueriesContext(connection) as queries_before:
+            self.client.get(reverse('app:list_volunteering'))
+
+        # add more upcoming activities, each with signups from both users
+        for number in range(5):
+            activity = Activity.objects.create(activity=f'Test_activity_{number}', description='Test description', staff=staff, max_attendance=5, date='2050-04-20', start_time='10:00:00', end_time='11:00:00', activity_type='cats', cancelled=None)
+            sign_up_volunteer(staff, activity.id)
+            if number % 2 == 0:
+                sign_up_volunteer(auth_user, activity.id)
+
+        with CaptureQueriesContext(connection) as queries_after:
+            response = self.client.get(reverse('app:list_volunteering'))
+
+        self.assertEqual(len(queries_before), len(queries_after))
+        # activities 0, 2, and 4 show the signed up badge, activities 1 and 3 show their open spots
+        self.assertEqual(response.content.count("You're signed up!".encode()), 3)
+        self.assertEqual(response.content.count('Volunteers still needed: 4'.encode()), 2)
+        # 2050-04-20 is a Wednesday
+        self.assertIn('Date: Wed, April 20, 2050'.encode(), response.content)
+
     def test_unauth_user_can_view_upcoming_activity_details(self):
         """
             Validate that an unauthorized user can see list view of all upcoming volunteering activities.
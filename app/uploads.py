@@ -0,0 +1,28 @@
+# uploads
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+# tools
+import hashlib
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+        Streams every uploaded file to a temporary file on disk, whatever its size, so an upload is never held in memory. Each chunk is hashed on its way through, and the SHA-256 digest is kept on the uploaded file (uploaded_file.sha256) so ContentAddressedStorage can name it without reading it again.
+
+        Methods:
+            new_file
+            receive_data_chunk
+            file_complete
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.digest.hexdigest()
+        return uploaded_file
@@ -27,6 +27,8 @@ urlpatterns = [
     path("pets/details/<int:animal_id>", views.animal_detail, name='animal_detail'),
     # ex. /new_arrival
     path("new_arrival", views.new_arrival, name='new_arrival'),
+    # ex. /new_arrival/bulk
+    path("new_arrival/bulk", views.bulk_intake, name='bulk_intake'),
     # ex. /pets/adopt/1
     path("pets/adopt/<int:animal_id>", views.adoption_app, name='adopt'),
     # ex. /adoptions/all
@@ -1,9 +1,26 @@
 # models
 from .models import *
+# lookup tables and search index
+from .lookups import species_lookup
+from .search import search_animals, unindex_animal
 # tools
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction, DEFAULT_DB_ALIAS, IntegrityError
+from django.db.models import Count, F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
 from dateutil.relativedelta import relativedelta
+import base64
 import datetime
+import hashlib
+import json
+
+# number of animal cards shown per page on /pets and /pets/search
+ANIMALS_PER_PAGE = getattr(settings, 'ANIMALS_PER_PAGE', 24)
+
+# cache alias holding search results, facet counts, and the catalog version
+CATALOG_CACHE = getattr(settings, 'CATALOG_CACHE', 'default')
 
 def establish_query(animal_species, animal_age, search_text):
     """
@@ -11,7 +28,7 @@ def establish_query(animal_species, animal_age, search_text):
 
         args: animal_species, animal_age, search_text
 
-        returns: complete queryset matching filters
+        returns: complete queryset matching filters, annotated with the 'sort_key' used by paginate_animals
     """
 
     # special query variables used with 'other' query
@@ -23,24 +40,25 @@ def establish_query(animal_species, animal_age, search_text):
         species_Q = None
     elif animal_species == 'other':
         species_Q = None
-        # need individual instances of cat and dog to provide main query below
-        cat_Q = ~Q(species=Species.objects.get(species='cat'))
-        dog_Q = ~Q(species=Species.objects.get(species='dog'))
+        # need individual instances of cat and dog to provide main query below (served from memory by the lookup registry)
+        cat_Q = ~Q(species=species_lookup.get_by_name('cat'))
+        dog_Q = ~Q(species=species_lookup.get_by_name('dog'))
     else:
-        species_Q = Q(species=Species.objects.get(species=animal_species))
-
-    # animal_age
-    two_yrs_ago = datetime.datetime.now() - relativedelta(years=2)
-    eight_yrs_ago = datetime.datetime.now() - relativedelta(years=8)
+        try:
+            species_Q = Q(species=species_lookup.get_by_name(animal_species))
+        except Species.DoesNotExist:
+            # an unknown species (e.g. an edited querystring) matches no animals
+            species_Q = Q(pk__in=[])
 
+    # animal_age (age_group is kept current on save and by the daily update_age_groups command)
     if animal_age is None or animal_age == 'None' or animal_age == '':
         age_Q = None
     elif animal_age == 'young':
-        age_Q = Q(age__gte=two_yrs_ago)
+        age_Q = Q(age_group='young')
     elif animal_age == 'adult':
-        age_Q = Q(age__gt=eight_yrs_ago, age__lt=two_yrs_ago)
+        age_Q = Q(age_group='adult')
     else:
-        age_Q = Q(age__lte=eight_yrs_ago)
+        age_Q = Q(age_group='senior')
 
     # search_text
     if search_text is None or search_text == 'None' or search_text == '':
@@ -53,10 +71,312 @@ def establish_query(animal_species, animal_age, search_text):
     # get only unadopted animals
     unadopted = Q(date_adopted=None)
 
-    # filter(species).filter(ignore cat and dog species if 'other' selected).filter(age).filter(name).filter(unadopted animals)
-    filter_results = Animal.objects.filter(species_Q if species_Q is not None else _).filter(cat_Q if cat_Q is not None else _).filter(dog_Q if dog_Q is not None else _).filter(age_Q if age_Q is not None else _).filter(search_Q if search_Q is not None else _).filter(unadopted).order_by('name')
+    # filter(species).filter(ignore cat and dog species if 'other' selected).filter(age).filter(unadopted animals)
+    filter_results = Animal.objects.filter(species_Q if species_Q is not None else _).filter(cat_Q if cat_Q is not None else _).filter(dog_Q if dog_Q is not None else _).filter(age_Q if age_Q is not None else _).filter(unadopted)
+
+    # text searches are matched and ranked by the full-text index in the same query; without the index, fall back to scanning names
+    searched = search_animals(filter_results, search_text) if search_Q is not None else None
+
+    if searched is not None:
+        return searched.annotate(sort_key=F('search_rank')).order_by('sort_key', 'pk')
+
+    # everything else is ordered by name
+    return filter_results.filter(search_Q if search_Q is not None else _).annotate(sort_key=Lower('name')).order_by('sort_key', 'pk')
+
+def update_age_groups(today=None):
+    """
+        This function moves unadopted animals whose birthday has crossed an age group boundary into their new group. Each group is corrected with a single UPDATE, so only animals that changed are written.
+
+        args: today (defaults to the current date)
+
+        returns: number of animals moved to a new age group
+    """
+
+    today = today or datetime.date.today()
+    two_yrs_ago = today - relativedelta(years=2)
+    eight_yrs_ago = today - relativedelta(years=8)
+
+    unadopted = Animal.objects.filter(date_adopted=None, age__isnull=False)
+    moved = unadopted.filter(age__gte=two_yrs_ago).exclude(age_group='young').update(age_group='young')
+    moved += unadopted.filter(age__gt=eight_yrs_ago, age__lt=two_yrs_ago).exclude(age_group='adult').update(age_group='adult')
+    moved += unadopted.filter(age__lte=eight_yrs_ago).exclude(age_group='senior').update(age_group='senior')
+
+    # update() skips save signals, so invalidate cached results here
+    if moved > 0:
+        bump_catalog_version()
+
+    return moved
+
+# Catalog version (cached search results) ------------------------------------------
+
+# cache key of the counter that is bumped whenever the animal catalog changes
+CATALOG_VERSION_KEY = 'animal_catalog_version'
+
+def get_catalog_cache():
+    """
+        This helper function returns the cache used for catalog results (settings.CATALOG_CACHE). Point that alias at a shared backend such as memcached when running several workers, so they share results and the version counter.
+    """
+
+    return caches[CATALOG_CACHE]
+
+def get_catalog_version():
+    """
+        This helper function returns the current catalog version. Cache keys for search results include this number, so bumping it invalidates every cached result at once without scanning keys.
+
+        returns: int
+    """
+
+    cache = get_catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+
+    if version is None:
+        # start from the clock so a counter that was evicted never repeats an earlier version
+        cache.add(CATALOG_VERSION_KEY, int(datetime.datetime.now().timestamp() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+
+    return version
+
+def _increment_catalog_version():
+    try:
+        get_catalog_cache().incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # counter is missing (evicted or never read); starting a new one is enough to invalidate
+        get_catalog_version()
+
+def bump_catalog_version(using=DEFAULT_DB_ALIAS):
+    """
+        This function invalidates cached search results after the catalog changes. Inside a transaction the version is bumped again once the transaction commits, so a request that read the old rows in the meantime can't leave them cached under the new version.
+
+        args: using (database alias)
+    """
+
+    _increment_catalog_version()
+
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(_increment_catalog_version, using=using)
+
+def catalog_cache_key(prefix, *parts):
+    """
+        This helper function builds a cache key from a prefix, the current catalog version, and normalized filter values. The filter values are hashed so that any search text makes a valid key for every cache backend.
+
+        returns: string
+    """
+
+    digest = hashlib.md5(json.dumps(parts).encode()).hexdigest()
+    return f'{prefix}:{get_catalog_version()}:{digest}'
+
+def normalize_filter(value):
+    """
+        This helper function maps the different ways a cleared filter arrives from the search form (None, 'None', '') to None.
+    """
+
+    if value is None or value == 'None' or value == '':
+        return None
+    return value
+
+def cached_query(animal_species, animal_age, search_text, cursor=None, page_size=ANIMALS_PER_PAGE):
+    """
+        This function is a read-through cache around establish_query and paginate_animals. Pages are cached under the normalized filters, the page token, and the catalog version, so identical searches skip the database until an animal or species changes.
+
+        args: animal_species, animal_age, search_text, cursor ('after' token or None), page_size
+
+        returns: (list of animals on the page, 'after' token for the next page or None on the last page)
+    """
+
+    animal_species = normalize_filter(animal_species)
+    animal_age = normalize_filter(animal_age)
+    search_text = normalize_filter(search_text)
+    cursor = normalize_filter(cursor)
+
+    cache = get_catalog_cache()
+    key = catalog_cache_key('animal_page', animal_species, animal_age, search_text, cursor, page_size)
+    page = cache.get(key)
+
+    if page is None:
+        page = paginate_animals(establish_query(animal_species, animal_age, search_text), cursor, page_size)
+        cache.set(key, page)
+
+    return page
+
+# Facet counts (available_animals.py) ----------------------------------------------
+
+SPECIES_FACETS = ('cat', 'dog', 'other')
+AGE_FACETS = ('young', 'adult', 'senior')
+
+def establish_facets(animal_species, animal_age, search_text):
+    """
+        This function counts the animals behind each species and age filter button under the current filters. Species counts respect the selected age group (and vice versa), and both respect the search text. Every count comes from a single grouped query, and results are cached per filter combination until the catalog changes.
+
+        args: animal_species, animal_age, search_text
+
+        returns: dictionary in this format --> {'species': {'cat': 4, 'dog': 2, 'other': 0}, 'age': {'young': 1, 'adult': 3, 'senior': 2}}
+    """
+
+    animal_species = normalize_filter(animal_species)
+    animal_age = normalize_filter(animal_age)
+    search_text = normalize_filter(search_text)
+
+    cache = get_catalog_cache()
+    key = catalog_cache_key('animal_facets', animal_species, animal_age, search_text)
+    facets = cache.get(key)
+
+    if facets is not None:
+        return facets
 
-    return filter_results
+    # one row per (species, age group) among unadopted animals matching the search text
+    rows = establish_query(None, None, search_text).order_by().values_list('species__species', 'age_group').annotate(count=Count('pk'))
+
+    facets = {
+        'species': dict.fromkeys(SPECIES_FACETS, 0),
+        'age': dict.fromkeys(AGE_FACETS, 0),
+    }
+
+    for species, age_group, count in rows:
+        species_facet = species if species in ('cat', 'dog') else 'other'
+        if animal_age is None or age_group == animal_age:
+            facets['species'][species_facet] += count
+        if age_group in facets['age'] and (animal_species is None or species_facet == animal_species):
+            facets['age'][age_group] += count
+
+    cache.set(key, facets)
+    return facets
+
+# Pagination (available_animals.py) -------------------------------------------------
+
+def encode_cursor(sort_key, pk):
+    """
+        This helper function packs the position of the last animal on a page into an opaque, url-safe 'after' token.
+
+        args: sort_key, pk
+
+        returns: string token
+    """
+
+    payload = json.dumps([sort_key, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+        This helper function unpacks an 'after' token created by encode_cursor. Tokens that have been tampered with are ignored.
+
+        args: cursor (string or None)
+
+        returns: (sort_key, pk) tuple, or None to start from the first page
+    """
+
+    if cursor is None or cursor == '' or cursor == 'None':
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_key, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+
+    # sort keys are lowercased names, or bm25 ranks for text searches
+    if not isinstance(pk, int) or not isinstance(sort_key, (str, int, float)):
+        return None
+
+    return sort_key, pk
+
+def paginate_animals(queryset, cursor=None, page_size=ANIMALS_PER_PAGE):
+    """
+        This function returns one page of animals using keyset pagination on (sort_key, id). Rather than counting past an OFFSET, each page starts directly after the last animal of the previous page, so every page costs the same as the first.
+
+        args: queryset (annotated with 'sort_key', e.g. from establish_query), cursor ('after' token or None), page_size
+
+        returns: (list of animals on the page, 'after' token for the next page or None on the last page)
+    """
+
+    queryset = queryset.order_by('sort_key', 'pk')
+    position = decode_cursor(cursor)
+
+    if position is not None:
+        sort_key, pk = position
+        # (sort_key > x OR (sort_key = x AND id > y)), with the leading 'sort_key >= x' letting the database seek straight to the page instead of scanning
+        queryset = queryset.filter(Q(sort_key__gte=sort_key), Q(sort_key__gt=sort_key) | Q(pk__gt=pk))
+
+    # fetch one extra row to find out whether there is a next page
+    animals = list(queryset.select_related('breed')[:page_size + 1])
+    next_cursor = None
+
+    if len(animals) > page_size:
+        animals = animals[:page_size]
+        next_cursor = encode_cursor(animals[-1].sort_key, animals[-1].pk)
+
+    return animals, next_cursor
+
+def ensure_available_name_index(using=DEFAULT_DB_ALIAS):
+    """
+        This function creates a partial expression index on (lower(name), id) for unadopted animals, which serves the name-ordered pages of /pets and /pets/search. Django model indexes can't express this, so it is created after migrations run (see signals.py).
+
+        args: using (database alias)
+    """
+
+    connection = connections[using]
+
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS app_animal_available_name_idx ON {Animal._meta.db_table} (lower(name), id) WHERE date_adopted IS NULL'
+        )
+
+# Pending application count (context_processors.py) --------------------------------
+
+# cache key of the number of applications awaiting a decision (shown in the staff navbar)
+PENDING_APP_COUNT_KEY = 'pending_application_count'
+
+# seconds a cached pending count is trusted. Each worker adjusts its own copy in a per-process cache, and a write that lands while the count is being read can be missed, so the count is recounted at least this often
+PENDING_APP_COUNT_TIMEOUT = getattr(settings, 'PENDING_APP_COUNT_TIMEOUT', 60)
+
+def get_pending_app_count():
+    """
+        This function returns the number of pending adoption applications. The number is held in the catalog cache for PENDING_APP_COUNT_TIMEOUT seconds and kept current by Application signals in the meantime, so it is only counted in the database (with a single COUNT query) when the cached count is missing or has expired.
+
+        returns: int
+    """
+
+    cache = get_catalog_cache()
+    count = cache.get(PENDING_APP_COUNT_KEY)
+
+    if count is None:
+        count = Application.objects.filter(approved=None).count()
+        cache.add(PENDING_APP_COUNT_KEY, count, timeout=PENDING_APP_COUNT_TIMEOUT)
+
+    return count
+
+def adjust_pending_app_count(delta, using=DEFAULT_DB_ALIAS):
+    """
+        This function applies a change (e.g. +1 for a new application) to the cached pending count. Inside a transaction the count is dropped instead, and dropped again on commit, so a rollback can't leave it wrong; the next read recounts.
+
+        args: delta (int), using (database alias)
+    """
+
+    if transaction.get_connection(using).in_atomic_block:
+        invalidate_pending_app_count(using)
+        return
+
+    try:
+        get_catalog_cache().incr(PENDING_APP_COUNT_KEY, delta)
+    except ValueError:
+        # nothing cached yet; the next read counts from the database
+        pass
+
+def invalidate_pending_app_count(using=DEFAULT_DB_ALIAS):
+    """
+        This function drops the cached pending count. Call it after queryset.update() or bulk_create() on Application rows, which skip the signals that keep the count current.
+
+        args: using (database alias)
+    """
+
+    def drop():
+        get_catalog_cache().delete(PENDING_APP_COUNT_KEY)
+
+    drop()
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(drop, using=using)
 
 # Volunteering.py ------------------------------------------------------------------
 
@@ -98,6 +418,125 @@ def check_if_user_is_signed_up(current_user, activity):
     else:
         return False
 
+def get_signed_up_activity_ids(current_user):
+    """
+        This helper function collects the ids of every volunteering activity the current user is signed up for with a single query, so a list view can check each activity in memory.
+
+        args: current_user
+
+        returns: set of activity ids (empty for an anonymous user)
+    """
+
+    if not current_user.is_authenticated:
+        return set()
+
+    return set(ActivityVolunteer.objects.filter(volunteer=current_user).values_list('activity_id', flat=True))
+
+# possible outcomes of sign_up_volunteer
+SIGNED_UP = 'signed_up'
+ALREADY_SIGNED_UP = 'already_signed_up'
+ACTIVITY_FULL = 'full'
+
+def sign_up_volunteer(current_user, activity_id):
+    """
+        This function signs a user up for a volunteering activity without ever exceeding max_attendance, even when many users click at once. In one transaction it claims a spot with a conditional UPDATE (signup_count < max_attendance) and then inserts the join table row. A second signup by the same user hits the unique (activity, volunteer) constraint, which rolls the claimed spot back.
+
+        args: current_user, activity_id
+
+        returns: SIGNED_UP, ALREADY_SIGNED_UP, or ACTIVITY_FULL
+    """
+
+    try:
+        with transaction.atomic():
+            claimed = Activity.objects.filter(pk=activity_id, signup_count__lt=F('max_attendance')).update(signup_count=F('signup_count') + 1)
+
+            if claimed == 0:
+                # the activity is full, unless this user already holds one of the spots
+                if ActivityVolunteer.objects.filter(activity_id=activity_id, volunteer=current_user).exists():
+                    return ALREADY_SIGNED_UP
+                return ACTIVITY_FULL
+
+            ActivityVolunteer.objects.create(activity_id=activity_id, volunteer=current_user)
+    except IntegrityError:
+        return ALREADY_SIGNED_UP
+
+    return SIGNED_UP
+
+def cancel_volunteer_signup(current_user, activity_id):
+    """
+        This function removes a user's signup for a volunteering activity and releases their spot in the same transaction.
+
+        args: current_user, activity_id
+
+        returns: True if the user was signed up, else False
+    """
+
+    with transaction.atomic():
+        deleted, _ = ActivityVolunteer.objects.filter(activity_id=activity_id, volunteer=current_user).delete()
+
+        if deleted > 0:
+            Activity.objects.filter(pk=activity_id).update(signup_count=F('signup_count') - deleted)
+
+    return deleted > 0
+
+def recount_signups():
+    """
+        This function resets every activity's stored signup_count from the join table (used after loading fixtures, which skip the signup path).
+
+        returns: number of activities updated
+    """
+
+    with transaction.atomic():
+        counts = dict(ActivityVolunteer.objects.values_list('activity_id').annotate(count=Count('pk')).order_by())
+        updated = 0
+        for activity in Activity.objects.only('pk', 'signup_count'):
+            count = counts.get(activity.pk, 0)
+            if activity.signup_count != count:
+                Activity.objects.filter(pk=activity.pk).update(signup_count=count)
+                updated += 1
+
+    return updated
+
+# Adoptions.py ---------------------------------------------------------------------
+
+# possible outcomes of finalize_adoption
+ADOPTION_APPROVED = 'approved'
+ANIMAL_ALREADY_ADOPTED = 'already_adopted'
+APPLICATION_MISSING = 'application_missing'
+
+# reason recorded on every competing application when an adoption is approved
+COMPETING_APPLICATION_REASON = 'A suitable owner was selected from an earlier application. Thank you for your interest, and please consider adopting another animal!'
+
+def finalize_adoption(animal_id, application_id, staff_user):
+    """
+        This function approves one application for an animal, marks the animal adopted, and rejects every competing application as a single transaction. The transaction starts by updating the animal only while date_adopted is still empty, so when two staff members approve at the same moment exactly one of them wins, and the other waits for the write lock (busy_timeout on SQLite) rather than failing the way a transaction that reads first does. Competing applications are rejected with one UPDATE no matter how many there are.
+
+        args: animal_id, application_id, staff_user
+
+        returns: tuple (ADOPTION_APPROVED, ANIMAL_ALREADY_ADOPTED, or APPLICATION_MISSING; number of competing applications rejected)
+    """
+
+    with transaction.atomic():
+        if Animal.objects.filter(pk=animal_id, date_adopted__isnull=True).update(date_adopted=timezone.now()) == 0:
+            return ANIMAL_ALREADY_ADOPTED, 0
+
+        approved = Application.objects.filter(pk=application_id, animal_id=animal_id).update(approved=True, staff=staff_user)
+
+        if approved == 0:
+            # undo the adoption above
+            transaction.set_rollback(True)
+            return APPLICATION_MISSING, 0
+
+        # applications that were already rejected keep their original reason
+        rejected = Application.objects.filter(animal_id=animal_id).exclude(pk=application_id).exclude(approved=False).update(approved=False, staff=staff_user, reason=COMPETING_APPLICATION_REASON)
+
+    # update() skips the save signals that keep the search index and caches current
+    unindex_animal(animal_id)
+    bump_catalog_version()
+    invalidate_pending_app_count()
+
+    return ADOPTION_APPROVED, rejected
+
 # general helper used to apply a try/except for single animal instance ---------------
 
 def check_for_unadopted_animal(animal_id):
@@ -3,6 +3,8 @@ from .index_views import *
 from .profile import *
 from .available_animals import *
 from .new_arrival import *
+from .bulk_intake import *
 from .adoption_app import *
 from .adoptions import *
-from .volunteering import *
\ No newline at end of file
+from .volunteering import *
+from .media import *
\ No newline at end of file
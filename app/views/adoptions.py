@@ -8,37 +8,39 @@ from django.template import RequestContext
 from django.urls import reverse
 # models
 from app.models import Application, Animal, CustomUser
+from django.db.models import Count, Q
 # messages
 from django.contrib import messages
 # forms
 from app.forms import RejectionForm
 # tools
 import datetime
-from app.utils import check_for_unadopted_animal, check_for_existing_adoption_application
+from app.utils import check_for_unadopted_animal, check_for_existing_adoption_application, finalize_adoption, ANIMAL_ALREADY_ADOPTED, APPLICATION_MISSING
 
 @staff_member_required
 def list_animals(request):
     """
-        This function gets all unadopted animals that have pending adoption applications and provides the list_animals template with a list of animals and a dictionary that contains animal ID's  as keys and number of apps as values
+        This function gets all unadopted animals, each annotated with its number of pending adoption applications, and provides them to the list_animals template. The counts come from the same query as the animals. Add ?sort=pending to list animals with the most pending applications first.
 
         args: request
     """
 
-    unadopted_animals = Animal.objects.filter(date_adopted=None).order_by('name')
-    num_pending_applications = dict()
+    unadopted_animals = Animal.objects.filter(date_adopted=None).annotate(
+        pending_count=Count('application', filter=Q(application__approved__isnull=True))
+    ).select_related('breed')
 
-    # count the number of pending applications for each animal
-    for animal in unadopted_animals:
-        applications = Application.objects.filter(animal=animal).filter(approved=None)
-        if len(applications) == 0:
-            num_pending_applications[animal.id] = 0
-        else:
-            num_pending_applications[animal.id] = len(applications)
+    sort = request.GET.get('sort')
+    if sort == 'pending':
+        unadopted_animals = unadopted_animals.order_by('-pending_count', 'name')
+    else:
+        unadopted_animals = unadopted_animals.order_by('name')
+
+    animals = list(unadopted_animals)
 
     context = {
-        'animals': unadopted_animals,
-        'num_animals': len(unadopted_animals) if not None else 0,
-        'num_pending_applications': num_pending_applications,
+        'animals': animals,
+        'num_animals': len(animals),
+        'sort': sort,
     }
 
     return render(request, 'app/list_animals.html', context)
@@ -57,8 +59,9 @@ def list_specific_applications(request, animal_id):
         messages.error(request, "Either the animal you're looking for was adopted or doesn't exist, or the application you're lookingfor isn't there.")
         return HttpResponseRedirect(reverse('app:list_applications'))
 
-    applications = Application.objects.filter(animal=animal).filter(approved=None).order_by('date_submitted')
-    rejections = Application.objects.filter(animal=animal).filter(approved=False).order_by('date_submitted')
+    # each application shows its applicant's contact details (and a rejection its staff member), fetched in the same query
+    applications = Application.objects.filter(animal=animal).filter(approved=None).select_related('user__volunteer').order_by('date_submitted')
+    rejections = Application.objects.filter(animal=animal).filter(approved=False).select_related('user__volunteer', 'staff').order_by('date_submitted')
 
     context = {
         'animal': animal,
@@ -93,22 +96,16 @@ def final_decision(request, animal_id, application_id):
         return render(request, 'app/final_decision.html', context)
 
     if request.method == 'POST':
-        # mark approved as true
-        application.approved = True
-        # assign staff memeber who approved the application
-        application.staff = request.user
-        application.save()
+        # approve this application, adopt the animal, and reject the competing applications in one transaction
+        outcome, _ = finalize_adoption(animal_id, application_id, request.user)
 
-        animal.date_adopted = datetime.datetime.now()
-        animal.save()
+        if outcome == ANIMAL_ALREADY_ADOPTED:
+            messages.error(request, f'{animal.name} was adopted by another application before your approval was saved.')
+            return HttpResponseRedirect(reverse('app:list_applications'))
 
-        # "reject" all remaining applications that were not already rejected.
-        other_applications = Application.objects.filter(animal=animal).exclude(pk=application_id).exclude(approved=False)
-        for app in other_applications:
-            app.reason = 'A suitable owner was selected from an earlier application. Thank you for your interest, and please consider adopting another animal!'
-            app.staff = request.user
-            app.approved = False
-            app.save()
+        if outcome == APPLICATION_MISSING:
+            messages.error(request, "The application you're looking for isn't there.")
+            return HttpResponseRedirect(reverse('app:list_specific_applications', args=(animal_id,)))
 
         messages.success(request, f'You\'ve approved the adoption of {animal.name} by {application.user.first_name}     {application.user.last_name}!')
         return HttpResponseRedirect(reverse('app:list_applications'))
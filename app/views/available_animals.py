@@ -1,7 +1,7 @@
 # authentication
 from django.contrib.admin.views.decorators import staff_member_required
 # HTTP
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import render
 from django.template import RequestContext
 from django.urls import reverse
@@ -11,22 +11,31 @@ from django.contrib import messages
 from app.models import Animal, Application, Species, Breed, Color, CustomUser
 # forms
 from app.forms import AnimalForm
+# background jobs
+from app.jobs import enqueue_image_job
+# lookup tables
+from app.lookups import breed_lookup, color_lookup, species_lookup
 # util functions
-from app.utils import establish_query, check_for_unadopted_animal
-from django.db.models.functions import Lower
+from app.utils import cached_query, establish_facets, check_for_unadopted_animal
+from urllib.parse import urlencode
 
 def available_animals(request):
     """
-        This view function retrieves all unadopted animals from the animal table and renders a grid-based template to display bootstrap cards.
+        This view function retrieves one page of unadopted animals from the animal table and renders a grid-based template to display bootstrap cards. The 'after' querystring token selects the next page.
 
         args: request
     """
 
-    animals = Animal.objects.filter(date_adopted=None).order_by(Lower('name'))
+    animals, next_cursor = cached_query(None, None, None, request.GET.get('after'))
+
     context = {
         'animals': animals,
         'animal_species': None,
-        'animal_age': None
+        'animal_age': None,
+        'facets': establish_facets(None, None, None),
+        'is_first_page': request.GET.get('after') is None,
+        'first_page_url': reverse('app:pets'),
+        'next_page_url': f"{reverse('app:pets')}?{urlencode({'after': next_cursor})}" if next_cursor is not None else None,
     }
     return render(request, 'app/available_animals.html', context)
 
@@ -92,14 +101,26 @@ def available_animals_search(request):
     if (animal_species == None or animal_species == 'None') and (animal_age == None or animal_age == '' or animal_age == 'None') and(search_text == None or search_text == ''):
         return HttpResponseRedirect(reverse('app:pets'))
 
-    filter_results = establish_query(animal_species, animal_age, search_text)
+    animals, next_cursor = cached_query(animal_species, animal_age, search_text, form.get('after'))
+
+    # page links carry the resolved filters rather than the raw querystring, since a filter button name in the querystring would toggle its filter again
+    filters = {
+        'animal_species': animal_species,
+        'animal_age': animal_age,
+        'name_query': search_text if search_text is not None else '',
+    }
+    search_url = reverse('app:search_pets')
 
     context = {
-        'animals': filter_results,
-        'animal_count': len(filter_results) if filter_results is not None else 0,
+        'animals': animals,
+        'animal_count': len(animals),
         'animal_species': animal_species,
         'animal_age': animal_age,
-        'search_text': search_text
+        'search_text': search_text,
+        'facets': establish_facets(animal_species, animal_age, search_text),
+        'is_first_page': form.get('after') is None,
+        'first_page_url': f'{search_url}?{urlencode(filters)}',
+        'next_page_url': f"{search_url}?{urlencode(dict(filters, after=next_cursor))}" if next_cursor is not None else None,
     }
     return render(request, 'app/available_animals.html', context)
 
@@ -163,15 +184,23 @@ def animal_edit(request, animal_id):
             animal.age = request.POST['age']
             animal.sex = request.POST['sex']
             animal.description = request.POST['description']
-            animal.breed = Breed.objects.get(pk=request.POST['breed'])
-            animal.color = Color.objects.get(pk=request.POST['color'])
-            animal.species = Species.objects.get(pk=request.POST['species'])
+            try:
+                animal.breed = breed_lookup.get(request.POST['breed'])
+                animal.color = color_lookup.get(request.POST['color'])
+                animal.species = species_lookup.get(request.POST['species'])
+            except (Breed.DoesNotExist, Color.DoesNotExist, Species.DoesNotExist):
+                # deleted after the form was validated
+                raise Http404('The selected breed, color, or species does not exist.')
             animal.staff = CustomUser.objects.get(pk=request.POST['staff'])
             animal.arrival_date = request.POST['arrival_date']
+            # the replaced photo is left for sweep_orphaned_media: an upload of the same photo elsewhere may be about to reuse the file
             if 'image' in request.FILES:
-                animal.image.delete()
-                animal.image = request.FILES['image']
+                # the form's copy of the upload (downscaled if it was larger than the stored master)
+                animal.image = animal_form.cleaned_data['image']
+                animal.derivatives_ready = False
             animal.save()
+            if not animal.derivatives_ready:
+                enqueue_image_job(animal)
 
             messages.success(request, f'{animal.name} was updated successfully.')
             return HttpResponseRedirect(reverse('app:animal_detail', args=(animal_id,)))
@@ -0,0 +1,55 @@
+# authentication
+from django.contrib.admin.views.decorators import staff_member_required
+# HTTP
+from django.shortcuts import render
+# forms
+from app.forms import BulkIntakeForm
+# bulk intake
+from app.intake import INTAKE_COLUMNS, import_animals
+# messages
+from django.contrib import messages
+# tools
+import io
+import zipfile
+
+@staff_member_required
+def bulk_intake(request):
+    """
+        This view function renders a form for an administrator to admit many animals at once from a CSV file (and a zip file of their photos). On POST, every valid row is added to the Animal table and the rows that couldn't be imported are listed.
+
+        args: request
+    """
+
+    context = {
+        'intake_form': BulkIntakeForm(),
+        'columns': INTAKE_COLUMNS,
+    }
+
+    if request.method == 'POST':
+        intake_form = BulkIntakeForm(request.POST, request.FILES)
+
+        if not intake_form.is_valid():
+            context['intake_form'] = intake_form
+            messages.error(request, 'Please choose a CSV file (and optionally a zip file of photos).')
+            return render(request, 'app/bulk_intake.html', context)
+
+        # the uploads arrive as temporary files and are read a chunk of rows at a time
+        csv_file = io.TextIOWrapper(intake_form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+
+        try:
+            created, names_created, errors = import_animals(csv_file, request.user, images=intake_form.cleaned_data['images'])
+        except (UnicodeDecodeError, zipfile.BadZipFile):
+            messages.error(request, 'The CSV file must be UTF-8 text and the photos a zip file.')
+            return render(request, 'app/bulk_intake.html', context)
+        finally:
+            csv_file.detach()
+
+        context.update({
+            'created': created,
+            'names_created': names_created,
+            'errors': errors,
+        })
+        if created:
+            messages.success(request, f'{created} animals were admitted successfully!')
+
+    return render(request, 'app/bulk_intake.html', context)
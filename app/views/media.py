@@ -0,0 +1,219 @@
+# HTTP
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+# resized images
+from app.images import load_image, render_resized
+from app.resize_cache import resize_cache
+from PIL import Image
+# tools
+import mimetypes
+import os
+import re
+import stat
+
+# content-addressed files never change under their name
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# anything else (e.g. the placeholder) is revalidated against its ETag / Last-Modified date
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+# bytes read per chunk while streaming a file
+MEDIA_CHUNK_SIZE = getattr(settings, 'MEDIA_CHUNK_SIZE', 64 * 1024)
+
+# widths and heights the resize endpoint accepts (RESIZE_DIMENSIONS in settings overrides this)
+RESIZE_DIMENSIONS = (80, 160, 240, 320, 480, 640, 800, 960, 1280)
+# a height of 0 means 'keep the proportions', i.e. fit within this height
+MAX_RESIZE_DIMENSION = 10000
+
+# a single byte range, e.g. 'bytes=0-1023', 'bytes=1024-' or 'bytes=-500' (multiple ranges are answered with the whole file)
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_range(header, size):
+    """
+        This function reads a Range request header for a file of the given size.
+
+        args: header (value of the Range header or None), size (bytes)
+
+        returns: tuple (start, end) with an inclusive end, None to send the whole file, or False if the range can't be satisfied
+    """
+
+    match = RANGE_HEADER.match(header.replace(' ', '')) if header else None
+
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+
+    if start == '':
+        # suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = size - 1 if end == '' else min(int(end), size - 1)
+
+    if start >= size or end < start:
+        return False
+
+    return start, end
+
+def file_iterator(path, start, length, chunk_size=MEDIA_CHUNK_SIZE):
+    """
+        This generator yields `length` bytes of a file from `start` in chunks, so a large photo is never read into memory at once.
+    """
+
+    with open(path, 'rb') as media_file:
+        media_file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = media_file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def serve_file(request, full_path, cache_control, accel_path=None):
+    """
+        This function builds the response for a file on disk: streamed in chunks, a single byte range answered with 206 Partial Content, and ETag / Last-Modified validators so browsers can revalidate with a 304. With MEDIA_SENDFILE set, the transfer is handed to the front-end server instead.
+
+        args: request, full_path, cache_control (Cache-Control header value), accel_path (path below MEDIA_ACCEL_PREFIX for X-Accel-Redirect, or None to stream it from Django)
+
+        returns: response (raises Http404 if the file doesn't exist)
+    """
+
+    try:
+        file_stat = os.stat(full_path)
+    except (ValueError, OSError):
+        raise Http404('The requested file does not exist.')
+
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404('The requested file does not exist.')
+
+    size = file_stat.st_size
+    last_modified = int(file_stat.st_mtime)
+    etag = quote_etag(f'{file_stat.st_mtime_ns:x}-{size:x}')
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+
+    # 304 Not Modified (or 412 for a failed If-Match / If-Unmodified-Since)
+    conditional_response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional_response is not None:
+        for header, value in headers.items():
+            conditional_response[header] = value
+        return conditional_response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    # None (stream from Django), 'x-accel-redirect' (nginx), or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+
+    if sendfile == 'x-sendfile' or (sendfile == 'x-accel-redirect' and accel_path is not None):
+        # the front-end server reads the file and handles ranges itself
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + accel_path
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+        # If-Range: only send part of the file if it's still the version the client has part of
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if byte_range and if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size > 0 else 0
+
+        response = StreamingHttpResponse(file_iterator(full_path, start, length) if request.method == 'GET' else iter(()), content_type=content_type)
+        response['Content-Length'] = str(length)
+
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    for header, value in headers.items():
+        response[header] = value
+
+    return response
+
+def media_cache_control(path):
+    """
+        This helper function picks the Cache-Control header for a stored file: content-addressed files (see app/storage.py) never change under their name, so they can be cached forever.
+    """
+
+    is_immutable = getattr(default_storage, 'is_immutable', None)
+    return IMMUTABLE_CACHE_CONTROL if is_immutable is not None and is_immutable(path) else REVALIDATE_CACHE_CONTROL
+
+@require_safe
+def serve_media(request, path):
+    """
+        This view function serves an uploaded (or derived) image from MEDIA_ROOT in any environment (see serve_file for streaming, ranges, and revalidation).
+
+        Files named by their content hash (see app/storage.py) are sent with far-future Cache-Control headers, since a changed photo always gets a new URL.
+
+        args: request, path (e.g. 'media/3f/a2/3fa2...e9.jpg')
+    """
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('The requested file does not exist.')
+
+    return serve_file(request, full_path, media_cache_control(path), accel_path=path)
+
+@require_safe
+def serve_resized(request, width, height, path):
+    """
+        This view function serves a stored image scaled down to fit width x height (a height of 0 keeps the proportions). Each size is rendered once and kept in the resize cache (see app/resize_cache.py). Only the dimensions in RESIZE_DIMENSIONS are accepted, so the cache can't be filled with arbitrary sizes.
+
+        args: request, width, height, path (e.g. 'media/3f/a2/3fa2...e9.jpg')
+    """
+
+    allowed = getattr(settings, 'RESIZE_DIMENSIONS', RESIZE_DIMENSIONS)
+
+    if width not in allowed or (height != 0 and height not in allowed):
+        raise Http404('That image size is not available.')
+
+    try:
+        source_path = safe_join(settings.MEDIA_ROOT, path)
+        source_stat = os.stat(source_path)
+    except (SuspiciousFileOperation, ValueError, OSError):
+        raise Http404('The requested file does not exist.')
+
+    # the modification time keeps a replaced file (with a name that isn't content-addressed) from serving a stale size
+    key = f'{width}x{height}/{path}@{source_stat.st_mtime_ns}'
+
+    def render():
+        return render_resized(load_image(default_storage, path), width, height or MAX_RESIZE_DIMENSION)
+
+    try:
+        cached_path = resize_cache.get_or_create(key, render)
+    except OSError:
+        raise Http404('The requested file is not an image.')
+    # more pixels than Pillow's MAX_IMAGE_PIXELS allows decoding
+    except Image.DecompressionBombError:
+        raise Http404('The requested image is too large to resize.')
+
+    return serve_file(request, cached_path, media_cache_control(path))
@@ -9,6 +9,8 @@ from django.urls import reverse
 from app.models import Animal
 # forms
 from app.forms import AnimalForm
+# background jobs
+from app.jobs import enqueue_image_job
 # messages
 from django.contrib import messages
 
@@ -30,10 +32,12 @@ def new_arrival(request):
         animal = AnimalForm(request.POST, request.FILES)
         if animal.is_valid():
             # Save the animal's form data to the database.
-            animal.save()
+            new_animal = animal.save()
+            # the image worker writes the thumb/card/detail sizes of the upload (the placeholder is shown until then)
+            enqueue_image_job(new_animal)
             messages.success(request, 'New arrival saved successfully!')
             return HttpResponseRedirect(reverse("app:pets"))
         else:
-            context = {'animal_form': animal_form}
+            context = {'animal_form': animal}
             return render(request, 'app/animal_form.html', context)
             # TODO: check else logic for errors
\ No newline at end of file
@@ -26,7 +26,8 @@ def profile(request):
 
     if request.method == 'GET':
         user = request.user
-        applications = Application.objects.filter(user=request.user)
+        # the template shows each application's animal and breed, so fetch them in the same query
+        applications = Application.objects.filter(user=request.user).select_related('animal__breed')
         context = {
             'user': user,
             'applications': applications
@@ -14,7 +14,8 @@ from app.forms import ActivityForm
 from django.contrib import messages
 # tools
 import datetime
-from app.utils import determine_thumbnail, check_if_user_is_signed_up, check_for_existing_volunteering_activity
+from app.utils import determine_thumbnail, check_if_user_is_signed_up, check_for_existing_volunteering_activity, get_signed_up_activity_ids
+from app.utils import sign_up_volunteer, cancel_volunteer_signup, SIGNED_UP, ACTIVITY_FULL
 
 def list_volunteering(request):
     """
@@ -24,22 +25,22 @@ def list_volunteering(request):
     """
 
     now = datetime.datetime.now()
-    activities = Activity.objects.filter(date__gte=now).order_by('date')
+    # spots_remaining reads the stored signup_count, so it doesn't query per activity
+    activities = list(Activity.objects.filter(date__gte=now).order_by('date'))
 
     # identify which thumbnail to use and pass in dictionary to template
     thumbnails = determine_thumbnail(activities)
 
-    # use single loop to get day of week for each event and determine which events user is signed up for
-    signed_up = list()
+    # identify which events the current user (if there is one) is signed up for with one query
+    signed_up = get_signed_up_activity_ids(request.user)
+
+    # get day of week for each event for use with date listing
     day_of_week = dict()
     for activity in activities:
-        # get day of week for use with date listing
-        day = datetime.datetime.strptime(str(activity.date), '%Y-%m-%d').strftime('%a')
-        day_of_week[activity.id] = day
-        # identify which events the current user (if there is one) is signed up for
-        if request.user.is_authenticated:
-            if check_if_user_is_signed_up(request.user, activity) == True:
-                signed_up.append(activity.id)
+        day_of_week[activity.id] = activity.date.strftime('%a')
+        # set on the activity too, so the template doesn't search both dictionaries for every row
+        activity.thumbnail = thumbnails[activity.id]
+        activity.day_of_week = day_of_week[activity.id]
 
     if request.method == 'GET':
         context = {
@@ -69,10 +70,10 @@ def volunteering_details(request, activity_id):
     thumbnail_url = thumbnail[activity_id]
 
     # get day of week for use with date listing
-    day_of_week = datetime.datetime.strptime(str(activity.date), '%Y-%m-%d').strftime('%a')
+    day_of_week = activity.date.strftime('%a')
 
     # get list of volunteers signed up for this activity using join table instances
-    activity_volunteer_instances = activity.activityvolunteer_set.all()
+    activity_volunteer_instances = activity.activityvolunteer_set.select_related('volunteer__volunteer')
     volunteer_list = list()
 
     if len(activity_volunteer_instances) is not None:
@@ -157,7 +158,8 @@ def edit_volunteering(request, activity_id):
             activity.end_time = request.POST['end_time']
             activity.activity_type = request.POST['activity_type']
             activity.max_attendance = request.POST['max_attendance']
-            activity.save()
+            # leave signup_count alone; signups may have changed it since the activity was loaded
+            activity.save(update_fields=['staff', 'activity', 'date', 'description', 'start_time', 'end_time', 'activity_type', 'max_attendance'])
 
             messages.success(request, 'You successfully edited this volunteering activity.')
             return HttpResponseRedirect(reverse('app:volunteering_details', args=(activity_id,)))
@@ -179,27 +181,25 @@ def volunteering_signup(request, activity_id):
         return HttpResponseRedirect(reverse('app:list_volunteering'))
 
     if request.method == 'GET':
-        # if user is not signed up, then sign them up.
-        if check_if_user_is_signed_up(request.user, activity) == False:
-            join_table = ActivityVolunteer()
-            join_table.activity = activity
-            join_table.volunteer = request.user
-            join_table.save()
+        # claim a spot and sign the user up in one step (the activity may have filled up since the page loaded)
+        result = sign_up_volunteer(request.user, activity.id)
 
+        if result == SIGNED_UP:
             messages.success(request, f'Thanks for signing up to volunteer with us! We\'ll see you at {activity.activity}!')
             return HttpResponseRedirect(reverse('app:list_volunteering'))
 
+        elif result == ACTIVITY_FULL:
+            messages.error(request, f'Sorry, {activity.activity} is full! Please check out our other volunteering opportunities.')
+            return HttpResponseRedirect(reverse('app:volunteering_details', args=(activity_id,)))
+
         # if user is already signed up, give them a reminder message
         else:
             messages.success(request, 'You\'ve already signed up for this activity. Thank you!')
             return HttpResponseRedirect(reverse('app:volunteering_details', args=(activity_id,)))
 
     if request.method == 'POST':
-        # if user is signed up, then delete join table.
-        if check_if_user_is_signed_up(request.user, activity) == True:
-            join_table = ActivityVolunteer.objects.get(activity=activity, volunteer=request.user)
-            join_table.delete()
-
+        # if user is signed up, then delete join table and release their spot.
+        if cancel_volunteer_signup(request.user, activity.id) == True:
             messages.error(request, f'Sorry you can\'t make it to {activity.activity}! We hope you\'ll volunteer with us again soon!')
             return HttpResponseRedirect(reverse('app:list_volunteering'))
 
@@ -227,7 +227,7 @@ def cancel_volunteering(request, activity_id):
         thumbnail_url = thumbnail[activity_id]
 
         # get day of week for use with date listing
-        day_of_week = datetime.datetime.strptime(str(activity.date), '%Y-%m-%d').strftime('%a')
+        day_of_week = activity.date.strftime('%a')
 
         context = {
             'activity': activity,
@@ -238,6 +238,6 @@ def cancel_volunteering(request, activity_id):
 
     if request.method == 'POST':
         activity.cancelled = True
-        activity.save()
+        activity.save(update_fields=['cancelled'])
         messages.success(request, f'You successfully cancelled {activity.activity}.')
         return HttpResponseRedirect(reverse('app:list_volunteering'))
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+    Benchmarks for the app's hot paths. Each module builds its own scratch test database (db.sqlite3 is never touched), times an operation, and prints the results.
+
+    Usage: python -m benchmarks.<module>   e.g. python -m benchmarks.finalize_adoption
+"""
+
+# tools
+import os
+import time
+import django
+
+
+def setup_scratch_database(path=None):
+    """
+        This function configures Django and creates an empty test database with every table (and the search index) in place. It lives in memory unless a file path is given (e.g. to measure journaling).
+
+        returns: name of the original database, for teardown_scratch_database
+    """
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+    django.setup()
+
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST']['NAME'] = path
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return old_name
+
+
+def teardown_scratch_database(old_name):
+    """
+        This function destroys the scratch database created by setup_scratch_database.
+
+        args: old_name
+    """
+
+    from django.db import connection
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def timed(function, *args, **kwargs):
+    """
+        This function runs a callable once and measures it.
+
+        returns: tuple (return value, elapsed seconds, number of queries)
+    """
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+
+    return result, elapsed, len(queries)
+
+
+def report(label, elapsed, queries):
+    """Prints one benchmark result line"""
+
+    print(f'{label:<40} {elapsed * 1000:>10.1f} ms {queries:>8} queries')
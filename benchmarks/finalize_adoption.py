@@ -0,0 +1,74 @@
+"""
+    Approves one of 500 competing applications for a single animal, first with the old row-by-row loop and then with finalize_adoption.
+
+    Usage: python -m benchmarks.finalize_adoption [number of applications]
+"""
+
+# tools
+import sys
+from . import report, setup_scratch_database, teardown_scratch_database, timed
+
+APPLICATIONS = 500
+
+
+def build_animal(applications):
+    """Creates an unadopted animal with the given number of pending applications and returns (animal, staff, first application)"""
+
+    from django.utils import timezone
+    from app.models import Animal, Application, Breed, Color, CustomUser, Species
+
+    staff = CustomUser.objects.create(first_name='Bench', last_name='Staff', email=f'staff{Animal.objects.count()}@bench.com', is_staff=True)
+    animal = Animal.objects.create(name='Benchmark', age='2018-03-17', sex='F', description='A well-loved animal.', breed=Breed.objects.get_or_create(breed='tabby')[0], color=Color.objects.get_or_create(color='orange')[0], species=Species.objects.get_or_create(species='cat')[0], staff=staff, arrival_date='2019-03-18')
+
+    first_user = CustomUser.objects.order_by('-pk').values_list('pk', flat=True).first()
+    CustomUser.objects.bulk_create([
+        CustomUser(first_name=f'first{number}', last_name=f'last{number}', email=f'applicant{first_user}-{number}@bench.com')
+        for number in range(applications)
+    ])
+    users = CustomUser.objects.filter(pk__gt=first_user, is_staff=False)
+    Application.objects.bulk_create([
+        Application(text='I want to adopt this animal.', animal=animal, user=user, date_submitted=timezone.now())
+        for user in users
+    ])
+
+    return animal, staff, Application.objects.filter(animal=animal).order_by('pk').first()
+
+
+def legacy_finalize(animal, application, staff_user):
+    """The approval as final_decision used to do it: separate saves and one save per competing application"""
+
+    import datetime
+    from app.models import Application
+
+    application.approved = True
+    application.staff = staff_user
+    application.save()
+
+    animal.date_adopted = datetime.datetime.now()
+    animal.save()
+
+    for app in Application.objects.filter(animal=animal).exclude(pk=application.pk).exclude(approved=False):
+        app.reason = 'A suitable owner was selected from an earlier application. Thank you for your interest, and please consider adopting another animal!'
+        app.staff = staff_user
+        app.approved = False
+        app.save()
+
+
+def main(applications):
+    from app.utils import finalize_adoption
+
+    animal, staff, application = build_animal(applications)
+    _, elapsed, queries = timed(legacy_finalize, animal, application, staff)
+    report(f'row-by-row loop ({applications} applications)', elapsed, queries)
+
+    animal, staff, application = build_animal(applications)
+    (outcome, rejected), elapsed, queries = timed(finalize_adoption, animal.pk, application.pk, staff)
+    report(f'finalize_adoption ({rejected} rejected)', elapsed, queries)
+
+
+if __name__ == '__main__':
+    old_name = setup_scratch_database()
+    try:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else APPLICATIONS)
+    finally:
+        teardown_scratch_database(old_name)
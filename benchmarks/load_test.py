@@ -0,0 +1,300 @@
+"""
+    Drives the WSGI application in main.wsgi in-process (no server, no network) with a reproducible mix of traffic: anonymous browsing of /pets, searches, the volunteering list, a volunteer looking at their applications, and staff reviewing applications. Reports p50/p95/p99 latency and requests per second per route, saves the results as JSON, and flags routes that got slower than a stored baseline.
+
+    The scratch database is filled with seed_scale, and the same --seed always sends the same requests. Timings depend on the machine, so save a baseline on the machine you compare on (--save-baseline) rather than checking one in.
+
+    Usage: python -m benchmarks.load_test [--requests 2000] [--concurrency 4] [--mix pets=35,search=25,volunteering=15,applications=15,review=10] [--seed 0]
+                                          [--users 500] [--animals 2000] [--applications 20000] [--activities 200]
+                                          [--output results.json] [--baseline benchmarks/results/load_test_baseline.json] [--save-baseline] [--tolerance 0.2]
+"""
+
+# tools
+import argparse
+import collections
+import datetime
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+from . import setup_scratch_database, teardown_scratch_database
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIRECTORY, 'load_test_baseline.json')
+
+# share of the requests sent by each scenario
+MIX = {'pets': 35, 'search': 25, 'volunteering': 15, 'applications': 15, 'review': 10}
+
+# untimed requests sent first, so caches and lookup tables are warm as they would be in production
+WARMUP_REQUESTS = 50
+
+# a route is flagged when its p95 latency grows, or its throughput drops, by more than this share of the baseline
+TOLERANCE = 0.2
+
+
+def pets(rng, data):
+    return 'anonymous', '/pets'
+
+
+def search(rng, data):
+    from urllib.parse import urlencode
+
+    query = rng.choice((
+        {'name_query': rng.choice(data['names'])},
+        {'animal_species': rng.choice(('cat', 'dog', 'other'))},
+        {'animal_species': rng.choice(('cat', 'dog')), 'animal_age': rng.choice(('young', 'adult', 'senior'))},
+    ))
+    return 'anonymous', f'/pets/search?{urlencode(query)}'
+
+
+def volunteering(rng, data):
+    return 'anonymous', '/volunteering/all'
+
+
+def applications(rng, data):
+    from django.urls import reverse
+
+    if rng.random() < 0.5:
+        return 'volunteer', reverse('app:profile')
+    return 'volunteer', reverse('app:adopt', args=(rng.choice(data['unadopted']),))
+
+
+def review(rng, data):
+    from django.urls import reverse
+
+    if rng.random() < 0.5:
+        return 'staff', reverse('app:list_applications')
+    return 'staff', reverse('app:list_specific_applications', args=(rng.choice(data['applied_for']),))
+
+
+SCENARIOS = {
+    'pets': pets,
+    'search': search,
+    'volunteering': volunteering,
+    'applications': applications,
+    'review': review,
+}
+
+
+def parse_mix(text):
+    """Turns 'pets=35,search=25' into {'pets': 35, 'search': 25}"""
+
+    mix = dict()
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'unknown scenario {name.strip()!r} (choose from {", ".join(SCENARIOS)})')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def build_data(options):
+    """Seeds the scratch database and returns the ids and names the scenarios pick from, with a session cookie for each role"""
+
+    from django.conf import settings
+    from django.test import Client
+    from app.models import Animal, Application, CustomUser
+    from app.seeding import seed_scale
+
+    seed_scale(users=options.users, animals=options.animals, applications=options.applications, activities=options.activities, seed=options.seed)
+
+    data = {
+        'names': sorted(set(Animal.objects.filter(date_adopted=None).values_list('name', flat=True))),
+        'unadopted': list(Animal.objects.filter(date_adopted=None).order_by('pk').values_list('pk', flat=True)),
+        'applied_for': sorted(set(Application.objects.filter(animal__date_adopted=None).values_list('animal_id', flat=True))),
+        'cookies': {'anonymous': None},
+    }
+
+    users = {
+        'volunteer': CustomUser.objects.get(pk=Application.objects.filter(user__is_staff=False).order_by('pk').values_list('user_id', flat=True).first()),
+        'staff': CustomUser.objects.filter(is_staff=True).order_by('pk').first(),
+    }
+    for role, user in users.items():
+        client = Client()
+        client.force_login(user)
+        data['cookies'][role] = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    return data
+
+
+def plan_requests(rng, data, mix, count):
+    """Returns the list of (role, path) to send, drawn from the scenarios by weight"""
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    return [SCENARIOS[name](rng, data) for name in rng.choices(names, weights=weights, k=count)]
+
+
+def send(application, path, cookie):
+    """Calls the WSGI application with a GET request, reads the whole response, and returns (status code, seconds)"""
+
+    path, _, query = path.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'localhost', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr}
+    if cookie:
+        environ['HTTP_COOKIE'] = cookie
+    setup_testing_defaults(environ)
+
+    statuses = list()
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    started = time.perf_counter()
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+    return int(statuses[0].split()[0]), time.perf_counter() - started
+
+
+def percentile(sorted_values, percent):
+    """Returns the nearest-rank percentile of an already sorted list"""
+
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Turns a list of (seconds, status) into latency percentiles (ms), requests per second, and error count"""
+
+    latencies = sorted(seconds for seconds, _ in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status in samples if status >= 500),
+        'rps': round(len(samples) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run(plan, data, concurrency, warmup):
+    """Sends the warmup requests, then the planned ones from `concurrency` threads, and returns (results by route, overall result)"""
+
+    from django.db import connection
+    from django.urls import resolve
+    from main.wsgi import application
+
+    for role, path in plan[:warmup]:
+        send(application, path, data['cookies'][role])
+
+    def worker(requests):
+        samples = list()
+        try:
+            for role, path in requests:
+                status, seconds = send(application, path, data['cookies'][role])
+                samples.append((resolve(path.partition('?')[0]).view_name, seconds, status))
+        finally:
+            connection.close()
+        return samples
+
+    timed_plan = plan[warmup:]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        batches = list(executor.map(worker, [timed_plan[thread::concurrency] for thread in range(concurrency)]))
+    elapsed = time.perf_counter() - started
+
+    by_route = collections.defaultdict(list)
+    for route, seconds, status in (sample for batch in batches for sample in batch):
+        by_route[route].append((seconds, status))
+
+    return {route: summarize(samples, elapsed) for route, samples in sorted(by_route.items())}, summarize([sample for samples in by_route.values() for sample in samples], elapsed)
+
+
+def compare(baseline, results, tolerance):
+    """Returns a message for every route whose p95 latency or throughput is worse than the baseline by more than `tolerance`, or that returned errors"""
+
+    regressions = list()
+    for route, current in results['routes'].items():
+        if current['errors']:
+            regressions.append(f'{route}: {current["errors"]} server errors')
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{route}: p95 {before["p95_ms"]} ms -> {current["p95_ms"]} ms')
+        if current['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f'{route}: {before["rps"]} -> {current["rps"]} requests/s')
+    return regressions
+
+
+def print_results(results):
+    print(f'{"route":<36} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>6}')
+    for route, result in [*results['routes'].items(), ('total', results['total'])]:
+        print(f'{route:<36} {result["requests"]:>8} {result["rps"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8} {result["errors"]:>6}')
+
+
+def main(options):
+    from django.test import override_settings
+
+    data = build_data(options)
+    plan = plan_requests(random.Random(options.seed), data, options.mix, options.warmup + options.requests)
+
+    # measured as in production: without DEBUG's per-query logging
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']):
+        routes, total = run(plan, data, options.concurrency, options.warmup)
+
+    results = {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'options': {name: value for name, value in vars(options).items() if name not in ('output', 'baseline', 'save_baseline', 'tolerance')},
+        'routes': routes,
+        'total': total,
+    }
+    print_results(results)
+
+    os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+    output = options.output or os.path.join(RESULTS_DIRECTORY, f'load_test_{results["time"].replace(":", "")}.json')
+    for path in [output] + ([options.baseline] if options.save_baseline else []):
+        with open(path, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+        print(f'saved {path}')
+
+    if options.save_baseline or not os.path.exists(options.baseline):
+        return 0
+
+    with open(options.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['options'] != results['options']:
+        print(f'note: the baseline was run with different options: {baseline["options"]}')
+
+    regressions = compare(baseline, results, options.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    print(f'{len(regressions)} regressions against {options.baseline} (tolerance {options.tolerance:.0%})')
+    return 1 if regressions else 0
+
+
+def parse_options(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_test', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='timed requests (default 2000)')
+    parser.add_argument('--warmup', type=int, default=WARMUP_REQUESTS, help=f'untimed requests sent first (default {WARMUP_REQUESTS})')
+    parser.add_argument('--concurrency', type=int, default=4, help='threads sending requests (default 4)')
+    parser.add_argument('--mix', type=parse_mix, default=MIX, help='scenario weights, e.g. pets=35,search=25,volunteering=15,applications=15,review=10')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the data and of the request sequence (default 0)')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--animals', type=int, default=2000)
+    parser.add_argument('--applications', type=int, default=20000)
+    parser.add_argument('--activities', type=int, default=200)
+    parser.add_argument('--output', help='results file (default benchmarks/results/load_test_<time>.json)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='results to compare against (default benchmarks/results/load_test_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='also save these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help=f'share a route may get slower before it is flagged (default {TOLERANCE})')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_options(sys.argv[1:])
+    old_name = setup_scratch_database()
+    try:
+        status = main(options)
+    finally:
+        teardown_scratch_database(old_name)
+    sys.exit(status)
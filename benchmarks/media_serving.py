@@ -0,0 +1,89 @@
+"""
+    Serves a 2 MB photo under concurrent load, first with django.views.static.serve (what static() routes to) and then with app.views.serve_media: whole downloads, revalidations with the ETag a browser would send, and 64 KB range requests.
+
+    Usage: python -m benchmarks.media_serving [threads] [requests per thread]
+"""
+
+# tools
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+THREADS = 16
+REQUESTS_PER_THREAD = 50
+FILE_SIZE = 2 * 1024 * 1024
+
+
+def load(view, headers, threads, requests_per_thread):
+    """Calls the view from every thread, reading each response to the end, and returns (seconds, bytes read, status codes)"""
+
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+
+    def client(_):
+        sent = 0
+        statuses = set()
+        for _ in range(requests_per_thread):
+            response = view(factory.get('/media/photo.jpg', **headers), path='media/photo.jpg')
+            content = response.streaming_content if response.streaming else [response.content]
+            sent += sum(len(chunk) for chunk in content)
+            if hasattr(response, 'close'):
+                response.close()
+            statuses.add(response.status_code)
+        return sent, statuses
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(client, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    return elapsed, sum(sent for sent, _ in results), set.union(*(statuses for _, statuses in results))
+
+
+def main(threads, requests_per_thread):
+    from django.conf import settings
+    from django.test import override_settings, RequestFactory
+    from django.views.static import serve
+    from app.views import serve_media
+
+    media_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(media_root, 'media'))
+    with open(os.path.join(media_root, 'media', 'photo.jpg'), 'wb') as photo:
+        photo.write(os.urandom(FILE_SIZE))
+
+    def static_view(request, path):
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    try:
+        with override_settings(MEDIA_ROOT=media_root, DEBUG=False):
+            etag = serve_media(RequestFactory().get('/media/photo.jpg'), path='media/photo.jpg')['ETag']
+            last_modified = static_view(RequestFactory().get('/media/photo.jpg'), path='media/photo.jpg')['Last-Modified']
+
+            scenarios = [
+                ('whole file', dict(), dict()),
+                ('revalidation (If-None-Match)', dict(HTTP_IF_NONE_MATCH=etag), dict(HTTP_IF_NONE_MATCH=etag)),
+                ('revalidation (If-Modified-Since)', dict(HTTP_IF_MODIFIED_SINCE=last_modified), dict(HTTP_IF_MODIFIED_SINCE=last_modified)),
+                ('64 KB range', dict(HTTP_RANGE='bytes=0-65535'), dict(HTTP_RANGE='bytes=0-65535')),
+            ]
+
+            total = threads * requests_per_thread
+            print(f'{total} requests per run ({threads} threads), {FILE_SIZE // 1024} KB file')
+            print(f'{"scenario":<34} {"view":<12} {"req/s":>8} {"MB sent":>9}  status')
+
+            for label, static_headers, media_headers in scenarios:
+                for name, view, headers in (('static()', static_view, static_headers), ('serve_media', serve_media, media_headers)):
+                    elapsed, sent, statuses = load(view, headers, threads, requests_per_thread)
+                    print(f'{label:<34} {name:<12} {total / elapsed:>8.0f} {sent / 1024 / 1024:>9.1f}  {sorted(statuses)}')
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+    import django
+    django.setup()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else THREADS, int(sys.argv[2]) if len(sys.argv) > 2 else REQUESTS_PER_THREAD)
@@ -0,0 +1,92 @@
+"""
+    Measures the peak memory (max RSS) of taking in one large photo, each path in a fresh process: Django's ImageField followed by the image worker decoding the full-size upload (what the new arrival form used to store), and BoundedImageField followed by the worker decoding the downscaled master.
+
+    Usage: python -m benchmarks.photo_upload [megapixels]
+"""
+
+# tools
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+MEGAPIXELS = 50
+
+
+def max_rss_mb():
+    """Returns the peak resident memory of this process so far, in MB (ru_maxrss is in KB on Linux)"""
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def take_in(path, bounded, results):
+    """Runs in a child process: validates the photo as an upload, then decodes what would be stored, and reports (peak RSS before, peak RSS after, seconds, stored size)"""
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+    import django
+    django.setup()
+
+    from django import forms
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+    from app.forms import BoundedImageField
+    from app.images import load_image
+    from django.core.files.storage import FileSystemStorage
+
+    before = max_rss_mb()
+    started = time.perf_counter()
+
+    # what the upload handlers leave behind: the photo in a temporary file
+    upload = TemporaryUploadedFile('photo.jpg', 'image/jpeg', os.path.getsize(path), None)
+    with open(path, 'rb') as photo:
+        shutil.copyfileobj(photo, upload)
+    upload.seek(0)
+
+    stored = (BoundedImageField() if bounded else forms.ImageField()).clean(upload)
+
+    # the image worker then decodes the stored file to write the derived sizes
+    directory = tempfile.mkdtemp()
+    try:
+        storage = FileSystemStorage(location=directory)
+        stored.seek(0)
+        name = storage.save('photo.jpg', stored)
+        size = load_image(storage, name).size
+    finally:
+        # the storage moved the temporary file away, which TemporaryUploadedFile.close() tolerates
+        upload.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results.put((before, max_rss_mb(), time.perf_counter() - started, size))
+
+
+def main(megapixels):
+    from PIL import Image
+
+    width = int((megapixels * 1000000 * 3 / 2) ** 0.5)
+    height = width * 2 // 3
+
+    path = os.path.join(tempfile.mkdtemp(), 'photo.jpg')
+    # written by a child process, so this one never holds the full bitmap
+    writer = multiprocessing.Process(target=lambda: Image.new('RGB', (width, height), (200, 120, 40)).save(path, 'JPEG', quality=90))
+    writer.start()
+    writer.join()
+
+    print(f'{width} x {height} photo ({width * height / 1000000:.1f} MP, {os.path.getsize(path) / 1024 / 1024:.1f} MB JPEG)')
+    print(f'{"path":<44} {"peak RSS":>10} {"added":>10} {"seconds":>8}  stored size')
+
+    try:
+        for label, bounded in (('forms.ImageField + full-size decode', False), ('BoundedImageField + master decode', True)):
+            results = multiprocessing.Queue()
+            child = multiprocessing.Process(target=take_in, args=(path, bounded, results))
+            child.start()
+            before, after, elapsed, size = results.get()
+            child.join()
+            print(f'{label:<44} {after:>7.0f} MB {after - before:>7.0f} MB {elapsed:>8.2f}  {size[0]} x {size[1]}')
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else MEGAPIXELS)
@@ -0,0 +1,140 @@
+"""
+    Runs a mixed read/write workload against an on-disk SQLite database, first with SQLite's defaults (rollback journal, synchronous=FULL) and then with the SQLITE_PRAGMAS from settings (WAL, busy_timeout, synchronous=NORMAL, mmap, larger cache). Reader threads list available animals, a volunteer's applications, and upcoming activities, while writer threads submit adoption applications and sign up for (and cancel) volunteering activities. Reports reads and writes per second and the writes that failed with "database is locked".
+
+    Usage: python -m benchmarks.sqlite_tuning [seconds per run] [reader threads] [writer threads]
+"""
+
+# tools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import django
+from . import setup_scratch_database, teardown_scratch_database
+
+SECONDS = 5
+READERS = 4
+WRITERS = 2
+
+
+def read(rng, data):
+    """One page view's worth of reads"""
+
+    from app.models import Activity, Animal, Application
+
+    choice = rng.random()
+    if choice < 0.5:
+        list(Animal.objects.filter(date_adopted=None).select_related('breed').order_by('name')[:24])
+    elif choice < 0.8:
+        list(Application.objects.filter(user_id=rng.choice(data['users'])).select_related('animal__breed'))
+    else:
+        list(Activity.objects.filter(date__gte=data['today']).order_by('date'))
+
+
+def write(rng, data):
+    """An adoption application, or a volunteering signup and its cancellation"""
+
+    from django.utils import timezone
+    from app.models import Application, CustomUser
+    from app.utils import cancel_volunteer_signup, sign_up_volunteer
+
+    user = CustomUser(pk=rng.choice(data['users']))
+    if rng.random() < 0.5:
+        Application.objects.create(text='We have a big yard.', animal_id=rng.choice(data['animals']), user=user, date_submitted=timezone.now())
+    else:
+        activity_id = rng.choice(data['activities'])
+        sign_up_volunteer(user, activity_id)
+        cancel_volunteer_signup(user, activity_id)
+
+
+def load(work, data, threads, seconds):
+    """Runs `work` in a loop from every thread for `seconds`, and returns (operations, 'database is locked' errors)"""
+
+    import random
+    from django.db import connection, OperationalError
+
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    totals = {'operations': 0, 'locked': 0}
+
+    def worker(number):
+        rng = random.Random(number)
+        operations = locked = 0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    work(rng, data)
+                    operations += 1
+                except OperationalError as error:
+                    if 'locked' not in str(error):
+                        raise
+                    locked += 1
+        finally:
+            connection.close()
+        with lock:
+            totals['operations'] += operations
+            totals['locked'] += locked
+
+    return worker, totals
+
+
+def run(label, pragmas, seconds, readers, writers):
+    """Builds a fresh database file, seeds it, and runs the readers and writers side by side under the given SQLITE_PRAGMAS"""
+
+    import datetime
+    from django.db import connection
+    from django.test import override_settings
+
+    directory = tempfile.mkdtemp()
+    # in place before the database is created, since the journal mode is stored in the file
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        old_name = setup_scratch_database(os.path.join(directory, 'benchmark.sqlite3'))
+        try:
+            from app.models import Activity, Animal, CustomUser
+            from app.seeding import seed_scale
+            seed_scale(users=200, animals=2000, applications=5000, activities=50)
+            data = {
+                'today': datetime.date.today(),
+                'users': list(CustomUser.objects.filter(is_staff=False).values_list('pk', flat=True)),
+                'animals': list(Animal.objects.filter(date_adopted=None).values_list('pk', flat=True)),
+                'activities': list(Activity.objects.values_list('pk', flat=True)),
+            }
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            connection.close()
+
+            read_worker, reads = load(read, data, readers, seconds)
+            write_worker, writes = load(write, data, writers, seconds)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=readers + writers) as executor:
+                futures = [executor.submit(read_worker, number) for number in range(readers)]
+                futures += [executor.submit(write_worker, readers + number) for number in range(writers)]
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - started
+
+            print(f'{label:<20} {journal_mode:<8} {reads["operations"] / elapsed:>10.1f} reads/s {writes["operations"] / elapsed:>10.1f} writes/s {writes["locked"] + reads["locked"]:>8} locked')
+        finally:
+            teardown_scratch_database(old_name)
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(seconds, readers, writers):
+    # set up first, so each run's SQLITE_PRAGMAS can be in place before its database exists
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+    django.setup()
+
+    from django.conf import settings
+
+    print(f'{readers} readers and {writers} writers for {seconds}s each')
+    run('SQLite defaults', dict(), seconds, readers, writers)
+    run('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS, seconds, readers, writers)
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:4]]
+    main(*arguments, *[SECONDS, READERS, WRITERS][len(arguments):])
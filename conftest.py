@@ -0,0 +1,11 @@
+# testing
+import pytest
+from django.test import override_settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def raise_over_query_budget():
+    """Makes a view that goes over its query budget fail the test that triggered it, as app.runners.QueryBudgetTestRunner does for `python manage.py test`"""
+
+    with override_settings(QUERY_BUDGET_ACTION='raise'):
+        yield
@@ -7,4 +7,8 @@ find ./$1/migrations/ -type f -name "*.pyc" -delete; #deletes all of the .pyc fi
 rm db.sqlite3; #deletes the database file.
 python manage.py makemigrations $1; #creates the migration.
 python manage.py migrate; #runs the migration.
-python manage.py loaddata $2 #runs the file we created above to seed the new db
\ No newline at end of file
+python manage.py loaddata $2; #runs the file we created above to seed the new db
+python manage.py rebuild_search_index #indexes the seeded animals for the available pets search
+python manage.py update_age_groups #assigns age groups (young/adult/senior) to the seeded animals
+python manage.py recount_signups #sets each activity's signup count from the seeded signups
+python manage.py generate_image_derivatives #writes the thumb/card/detail sizes of the seeded animal images
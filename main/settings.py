@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so the session and user lookups of every request are counted too
+    'app.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +57,8 @@ ROOT_URLCONF = 'main.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # the regular Django backend, timing each render for RequestMetricsMiddleware
+        'BACKEND': 'app.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,9 +83,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # keep connections (with their page cache and memory map) for a minute instead of reconnecting on every request
+        'CONN_MAX_AGE': 60,
+        # the tests run on a file too (not the default in-memory database), so threads in the concurrency tests wait for each other's writes (busy_timeout) as they do in production
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
     }
 }
 
+# Pragmas applied to every new SQLite connection (app/sqlite.py).
+# WAL lets readers carry on while a writer commits, and busy_timeout makes a writer wait (ms) for the lock instead of failing with "database is locked".
+# synchronous=NORMAL is durable with WAL except for the last commits before a power loss. mmap_size is in bytes; a negative cache_size is in KiB.
+# Run `python manage.py sqlite_maintenance` on a schedule to checkpoint the WAL file and refresh the query planner's statistics.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'busy_timeout': 5000,
+    'synchronous': 'normal',
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'critter',
+    },
+    # search result pages and facet counts (size-bounded, least-recently-used entries are culled first).
+    # With several workers, switch to a shared backend, e.g. 'django.core.cache.backends.memcached.PyLibMCCache'
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'critter-catalog',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+}
+
+CATALOG_CACHE = 'catalog'
+
+# seconds a worker trusts its cached count of pending applications (staff navbar) before recounting
+PENDING_APP_COUNT_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -128,6 +173,66 @@ MEDIA_URL = '/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# uploads are named by their content hash (deduplicated, and safe to cache forever)
+DEFAULT_FILE_STORAGE = 'app.storage.ContentAddressedStorage'
+
+# uploads always stream to a temporary file (never into memory) and are hashed on the way in
+FILE_UPLOAD_HANDLERS = ['app.uploads.HashingFileUploadHandler']
+
+# Animal photos (images.py): uploads over IMAGE_UPLOAD_MAX_PIXELS are refused from their header alone, and larger ones are downscaled to a master with this longest edge
+IMAGE_UPLOAD_MAX_PIXELS = 64 * 1000 * 1000
+IMAGE_UPLOAD_MAX_DECODED_PIXELS = 16 * 1000 * 1000
+IMAGE_MASTER_MAX_EDGE = 2048
+
+# Media serving (app/views/media.py): None streams files from Django; 'x-accel-redirect' (nginx, with an internal location at MEDIA_ACCEL_PREFIX aliasing MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd) hands the transfer to the front-end server
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# On-the-fly resized images (/media/resize/<w>x<h>/<path>) are kept here, outside MEDIA_ROOT, and the least recently used are deleted beyond this many bytes
+RESIZE_CACHE_DIR = os.path.join(BASE_DIR, 'resize_cache')
+RESIZE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 AUTH_USER_MODEL = 'app.CustomUser'
 
-CRISPY_TEMPLATE_PACK = 'bootstrap4'
\ No newline at end of file
+CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Number of animal cards per page on /pets and /pets/search (keyset pagination)
+ANIMALS_PER_PAGE = 24
+
+# Background image processing (run_image_worker): pool type ('thread' or 'process'), pool size, and attempts before a job is marked failed
+IMAGE_WORKER_POOL = 'thread'
+IMAGE_WORKERS = 2
+IMAGE_JOB_MAX_ATTEMPTS = 5
+
+# Request metrics (app/instrumentation.py): every request gets a Server-Timing header, and one JSON line per request is appended to REQUEST_METRICS_LOG when it is set.
+# Views over their query budget are warned about on 'app.query_budget', which propagates to the root logger (stderr unless the deployment configures root handlers)
+REQUEST_METRICS_LOG = os.environ.get('REQUEST_METRICS_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'request_metrics': {'class': 'logging.FileHandler', 'filename': REQUEST_METRICS_LOG, 'formatter': 'message', 'delay': True} if REQUEST_METRICS_LOG else {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'app.request_metrics': {'handlers': ['request_metrics'], 'level': 'INFO', 'propagate': False},
+        'app.query_budget': {'level': 'WARNING'},
+    },
+}
+
+# Most SQL queries each view may make per request (URL name -> queries). Going over is logged as a warning, or raises QueryBudgetExceeded when QUERY_BUDGET_ACTION is 'raise'.
+# The test runners (TEST_RUNNER below, and conftest.py under pytest) set 'raise', so a new query per card fails the test that caused it.
+QUERY_BUDGETS = {
+    'app:index': 6,
+    'app:pets': 6,
+    'app:search_pets': 6,
+    'app:animal_detail': 9,
+    'app:list_applications': 5,
+    'app:list_volunteering': 6,
+}
+QUERY_BUDGET_ACTION = 'log'
+
+TEST_RUNNER = 'app.runners.QueryBudgetTestRunner'
@@ -16,14 +16,16 @@ Including another URLconf
 from django.conf.urls import include, url
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
-from django.conf import settings
+from app.views import serve_media, serve_resized
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('app.urls')),
 ]
 
-# Used with photo upload
-if settings.DEBUG:
-   urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Used with photo upload (MEDIA_URL is '/', so uploads are served from /media/...). Served in every environment; set MEDIA_SENDFILE to let the front-end server do the transfer.
+urlpatterns += [
+    # ex. /media/resize/320x0/media/3f/a2/3fa2...e9.jpg
+    path('media/resize/<int:width>x<int:height>/<path:path>', serve_resized, name='resized_media'),
+    path('<path:path>', serve_media, name='media'),
+]
\ No newline at end of file